@@ -1,31 +1,20 @@
-from avalanche import benchmarks
-from avalanche import evaluation
-from avalanche import logging
-from avalanche import models
-from avalanche import training
-
-
-__version__ = "0.1.0a0"
-
-_dataset_add = None
-
-
-def _avdataset_radd(self, other, *args, **kwargs):
-    from avalanche.benchmarks.utils import AvalancheDataset
-
-    global _dataset_add
-    if isinstance(other, AvalancheDataset):
-        return NotImplemented
-
-    return _dataset_add(self, other, *args, **kwargs)
-
-
-def _avalanche_monkey_patches():
-    from torch.utils.data.dataset import Dataset
-
-    global _dataset_add
-    _dataset_add = Dataset.__add__
-    Dataset.__add__ = _avdataset_radd
-
-
-_avalanche_monkey_patches()
+import importlib
+
+__version__ = "0.1.0a0"
+
+# Submodules are imported on first access (PEP 562), so that "import
+# avalanche" doesn't load PyTorch and the other dependencies of the
+# submodules that are not used.
+_SUBMODULES = ["benchmarks", "evaluation", "logging", "models", "training"]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name)
+    )
+
+
+def __dir__():
+    return sorted(list(globals()) + _SUBMODULES)
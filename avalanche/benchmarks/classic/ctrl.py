@@ -17,7 +17,6 @@ import torchvision.transforms.functional as F
 from torchvision import transforms
 from tqdm import tqdm
 
-import ctrl
 from avalanche.benchmarks import dataset_benchmark
 from avalanche.benchmarks.datasets import default_dataset_location
 from avalanche.benchmarks.utils import (
@@ -62,6 +61,9 @@ def CTrL(
     elif stream_name == "s_long" and n_tasks is None:
         n_tasks = 100
 
+    # Imported here, as ctrl (and its dependencies) are slow to import
+    import ctrl
+
     stream = ctrl.get_stream(stream_name, seed)
 
     if save_to_disk:
@@ -21,7 +21,6 @@ import csv
 from pathlib import Path
 from typing import Union
 
-import gdown
 import os
 from collections import OrderedDict
 from torchvision.datasets.folder import default_loader
@@ -109,6 +108,8 @@ class CUB200(PathsDataset, DownloadableDataset):
                     "will try GDrive."
                 )
 
+        import gdown
+
         filepath = self.root / self.filename
         gdown.download(self.gdrive_url, str(filepath), quiet=False)
         gdown.cached_download(self.gdrive_url, str(filepath), md5=self.tgz_md5)
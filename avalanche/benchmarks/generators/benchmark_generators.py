@@ -681,21 +681,23 @@ def class_balanced_split_strategy(
             f"{len(exp_dataset)}"
         )
 
-    exp_indices = list(range(len(exp_dataset)))
     exp_classes = experience.classes_in_this_experience
+    statistics = exp_dataset.statistics
 
-    # shuffle exp_indices
-    exp_indices = torch.as_tensor(exp_indices)[torch.randperm(len(exp_indices))]
-    # shuffle the targets as well
-    exp_targets = torch.as_tensor(experience.dataset.targets)[exp_indices]
+    # shuffle exp_indices (the position of each index in the shuffled order
+    # is used to shuffle the indices of each class)
+    exp_indices = torch.randperm(len(exp_dataset))
+    shuffled_positions = torch.empty_like(exp_indices)
+    shuffled_positions[exp_indices] = torch.arange(len(exp_indices))
 
     train_exp_indices = []
     valid_exp_indices = []
     for cid in exp_classes:  # split indices for each class separately.
-        c_indices = exp_indices[exp_targets == cid]
+        c_indices = statistics.class_patterns(cid).tensor()
+        c_indices = c_indices[torch.argsort(shuffled_positions[c_indices])]
         valid_n_instances = int(validation_size * len(c_indices))
-        valid_exp_indices.extend(c_indices[:valid_n_instances])
-        train_exp_indices.extend(c_indices[valid_n_instances:])
+        valid_exp_indices.extend(c_indices[:valid_n_instances].tolist())
+        train_exp_indices.extend(c_indices[valid_n_instances:].tolist())
 
     result_train_dataset = AvalancheSubset(
         exp_dataset, indices=train_exp_indices
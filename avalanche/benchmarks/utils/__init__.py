@@ -1,5 +1,7 @@
 from .adaptive_transform import *
 from .utils import *
+from .mmap_dataset import *
+from .sample_cache import *
 from .avalanche_dataset import *
 from .datasets_from_filelists import *
 from .torchvision_wrapper import *
@@ -1,5 +1,5 @@
 import warnings
-from typing import Callable, Sequence
+from typing import Callable, Sequence, Optional, List, Tuple
 from inspect import signature, Parameter
 
 
@@ -45,6 +45,11 @@ class Compose:
                 self.max_params = max(all_maxes)
             self.min_params = min([min_p for min_p, _ in self.param_def])
 
+        # A composition can be applied to whole batches only if all the
+        # composed transformations can.
+        self.supports_batch = len(transforms) > 0 and all(
+            is_batch_transform(tr) for tr in transforms)
+
     def __call__(self, *args, force_tuple_output=False):
         if len(self.transforms) > 0:
             for transform, (min_par, max_par) in zip(self.transforms,
@@ -71,6 +76,7 @@ class MultiParamTransform:
 
         self.min_params, self.max_params = \
             MultiParamTransform._detect_parameters(transform)
+        self.supports_batch = is_batch_transform(transform)
 
     def __call__(self, *args, force_tuple_output=False):
         args = MultiParamTransform._call_transform(
@@ -153,6 +159,126 @@ class MultiParamTransform:
         return 'torchvision.transforms' in tc_module
 
 
+class TransformPipeline:
+    """
+    A flat, pre-compiled sequence of transformations.
+
+    Nested :class:`Compose` and :class:`MultiParamTransform` wrappers are
+    unrolled and the parameters of each transformation are detected only once,
+    when the pipeline is created. The pipeline behaves like a
+    :class:`Compose` of the given transformations, but it is cheaper to call.
+    This makes it suitable for being applied to every pattern of a dataset.
+
+    None transformations are ignored.
+    """
+
+    def __init__(self, transforms: Sequence[Optional[Callable]]):
+        self.transforms: List[Callable] = []
+        self.param_def: List[Tuple[int, int]] = []
+
+        for transform in transforms:
+            self._add_transform(transform)
+
+        self.supports_batch = len(self.transforms) > 0 and all(
+            is_batch_transform(tr) for tr in self.transforms)
+
+        self._steps = [
+            (transform, max_par)
+            for transform, (_, max_par) in zip(self.transforms,
+                                               self.param_def)]
+
+    def __len__(self):
+        return len(self.transforms)
+
+    def __call__(self, *args, force_tuple_output=False):
+        args = list(args)
+        for transform, max_par in self._steps:
+            if max_par == 1 and len(args) > 0:
+                # Fast path for the most common case
+                transform_result = transform(args[0])
+                if isinstance(transform_result, tuple):
+                    args[:1] = transform_result
+                else:
+                    args[0] = transform_result
+            else:
+                args = MultiParamTransform._call_transform(
+                    transform, None, max_par, *args)
+
+        if len(args) == 1 and not force_tuple_output:
+            return args[0]  # Single return value (as an unwrapped value)
+        return args  # Multiple return values (as a list)
+
+    def __repr__(self):
+        format_string = self.__class__.__name__ + '('
+        for t in self.transforms:
+            format_string += '\n'
+            format_string += '    {0}'.format(t)
+        format_string += '\n)'
+        return format_string
+
+    def _add_transform(self, transform: Optional[Callable]):
+        if transform is None:
+            return
+
+        transform_type = type(transform)
+        if transform_type is Compose or transform_type is TransformPipeline:
+            for composed_transform in transform.transforms:
+                self._add_transform(composed_transform)
+        elif transform_type is MultiParamTransform:
+            self._add_transform(transform.transform)
+        else:
+            self.transforms.append(transform)
+            self.param_def.append(
+                MultiParamTransform._detect_parameters(transform))
+
+
+class BatchCapableTransform:
+    """
+    Marks a transformation as able to process a whole batch of values.
+
+    When multiple patterns are retrieved at once (for instance, when a
+    PyTorch DataLoader uses the batched fetching protocol, see
+    :meth:`AvalancheDataset.__getitems__`), batch-capable transformations
+    are called once with the stacked values of all the patterns (the first
+    dimension being the batch one) instead of once for each pattern.
+
+    The wrapped transformation must accept both single values and batches.
+    Tensor transformations from torchvision (such as `Normalize`) usually do.
+    Beware that random transformations will use the same random parameters
+    for the whole batch.
+
+    Alternatively, a transformation can be marked as batch-capable by
+    setting its `supports_batch` field to True.
+    """
+
+    supports_batch = True
+
+    def __init__(self, transform: Callable):
+        self.transform = transform
+        self.min_params, self.max_params = \
+            MultiParamTransform._detect_parameters(transform)
+
+    def __call__(self, *args):
+        return self.transform(*args)
+
+    def __repr__(self):
+        format_string = self.__class__.__name__ + '('
+        format_string += '\n'
+        format_string += '    {0}'.format(self.transform)
+        format_string += '\n)'
+        return format_string
+
+
+def is_batch_transform(transform_callable) -> bool:
+    """
+    Checks if a transformation can be applied to a whole batch of values.
+
+    :param transform_callable: The transformation.
+    :return: True if the transformation is marked as batch-capable.
+    """
+    return getattr(transform_callable, 'supports_batch', False) is True
+
+
 class ComposeMaxParamsWarning(Warning):
     def __init__(self, message):
         self.message = message
@@ -164,5 +290,8 @@ warnings.simplefilter("once", ComposeMaxParamsWarning)
 __all__ = [
     'Compose',
     'MultiParamTransform',
+    'TransformPipeline',
+    'BatchCapableTransform',
+    'is_batch_transform',
     'ComposeMaxParamsWarning'
 ]
@@ -21,13 +21,26 @@ import warnings
 from collections import OrderedDict, defaultdict, deque
 from enum import Enum, auto
 
+import numpy as np
 import torch
-from torch.utils.data.dataloader import default_collate
-from torch.utils.data.dataset import Dataset, Subset, ConcatDataset
+from torch.utils.data.dataloader import DataLoader, default_collate
+from torch.utils.data.dataset import (
+    Dataset,
+    Subset,
+    ConcatDataset,
+    TensorDataset,
+)
 
-from .adaptive_transform import Compose, MultiParamTransform
+from .adaptive_transform import (
+    Compose,
+    MultiParamTransform,
+    TransformPipeline,
+    is_batch_transform,
+)
 from .dataset_utils import (
     manage_advanced_indexing,
+    fetch_items,
+    as_index_list,
     SequenceDataset,
     ClassificationSubset,
     LazyConcatIntTargets,
@@ -38,7 +51,15 @@ from .dataset_utils import (
     SubSequence,
     LazyConcatTargets,
     TupleTLabel,
+    DatasetIndexPlan,
+    ArraySequence,
+    DatasetStatistics,
+    ClassMappingStep,
+    as_int_array,
+    share_sequence_memory,
 )
+from .mmap_dataset import MemoryMappedDataset, transforms_fingerprint
+from .sample_cache import SampleCache
 from .dataset_definitions import (
     ITensorDataset,
     ClassificationDataset,
@@ -301,6 +322,11 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
         self._optimize_task_labels()
         self._optimize_task_dict()
 
+        self._statistics: Optional[DatasetStatistics] = None
+        """
+        The (lazily computed) class and task label statistics.
+        """
+
         self.task_set = _TaskSubsetDict(self)
         """
         A dictionary that can be used to obtain the subset of patterns given
@@ -368,8 +394,68 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
         for group_name in self.transform_groups.keys():
             self._frozen_transforms[group_name] = (None, None)
 
+        self._compiled_transforms: Optional[
+            Tuple[Tuple, TransformPipeline, TransformPipeline]
+        ] = None
+        """
+        The transformations of the current group, compiled as flat pipelines.
+        """
+
+        self._compiled_batch_transforms: Dict[
+            str, Tuple[Tuple, TransformPipeline]
+        ] = dict()
+        """
+        The batch transformations of each group, compiled as flat pipelines.
+        """
+
         self._set_original_dataset_transform_group(self.current_transform_group)
 
+        self._use_index_plan: bool = any(
+            _get_inherited_attribute(d, "_use_index_plan", False)
+            for d in self._index_plan_children()
+        )
+        """
+        If True, patterns are retrieved using the flat index plan of the
+        dataset. Inherited from the wrapped datasets.
+        """
+
+        inherited_caches = [
+            _get_inherited_attribute(d, "_sample_cache", None)
+            for d in self._index_plan_children()
+        ]
+        self._sample_cache: Optional[SampleCache] = next(
+            (cache for cache in inherited_caches if cache is not None), None
+        )
+        """
+        The cache of the patterns loaded from the leaf datasets. Inherited
+        from the wrapped datasets.
+        """
+
+        self.batch_transform_groups: Dict[
+            str, Tuple[XTransform, YTransform]
+        ] = dict()
+        """
+        A dictionary containing the batch transform groups. Batch
+        transformations are applied to whole (collated) mini-batches instead
+        of single patterns. See :meth:`apply_batch_transforms`. Inherited
+        from the wrapped datasets.
+        """
+
+        self._frozen_batch_transforms: Dict[
+            str, Tuple[XTransform, YTransform]
+        ] = dict()
+        """
+        A dictionary containing the frozen batch transformations. Inherited
+        from the wrapped datasets.
+        """
+
+        self._inherit_batch_transforms()
+
+        self._index_plan: Optional[DatasetIndexPlan] = None
+        """
+        The (lazily built) flat index plan of the dataset.
+        """
+
         self._flatten_dataset()
 
     def __add__(self, other: Dataset) -> "AvalancheDataset":
@@ -381,13 +467,274 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
     def __getitem__(self, idx) -> Union[T_co, Sequence[T_co]]:
         return TupleTLabel(
             manage_advanced_indexing(
-                idx, self._get_single_item, len(self), self.collate_fn
+                idx,
+                self._get_single_item,
+                len(self),
+                self.collate_fn,
+                multi_element_getter=self._get_multiple_items,
             )
         )
 
+    def __getitems__(self, indices: Sequence[int]) -> List[T_co]:
+        """
+        Retrieves multiple patterns at once.
+
+        This is the batched counterpart of ``__getitem__``. Differently from
+        ``__getitem__``, the patterns are not collated together: the result is
+        a list containing an element for each of the given indices.
+
+        The indices are resolved through the wrapped subsets and
+        concatenations with a single pass, tensor-backed datasets are accessed
+        using a single fancy-indexing operation and batch-capable
+        transformations (see :class:`BatchCapableTransform`) are applied once
+        for the whole batch. Other transformations are applied pattern by
+        pattern.
+
+        This method is automatically used by PyTorch DataLoaders (starting
+        from PyTorch 2.0) when fetching mini-batches.
+
+        :param indices: The indices of the patterns to retrieve.
+        :return: The list of patterns.
+        """
+        return self._get_multiple_items(as_index_list(indices))
+
     def __len__(self):
         return len(self._dataset)
 
+    @property
+    def statistics(self) -> DatasetStatistics:
+        """
+        The class and task label statistics of this dataset.
+
+        Contains the indices of the patterns of each class and task, the
+        number of patterns of each class, the min and max class label, ...
+        (see :class:`DatasetStatistics`).
+
+        Statistics are computed on first access and then cached. They are
+        shared with the datasets obtained by changing the transformations.
+        Only datasets with int targets (such as classification ones) support
+        statistics.
+        """
+        if self._statistics is None:
+            self._statistics = self._make_statistics()
+        return self._statistics
+
+    @property
+    def index_plan(self) -> DatasetIndexPlan:
+        """
+        The flat index plan of this dataset.
+
+        The plan maps each pattern to its leaf dataset (the dataset actually
+        storing it) and to its index in that dataset, as contiguous int64
+        arrays. The plan is built on first access and rebuilt every time the
+        dataset is forked (that is, when transformations are changed).
+
+        Samplers can use the plan to find out where patterns are stored.
+        See :class:`DatasetIndexPlan` for more details.
+        """
+        if self._index_plan is None:
+            self._index_plan = DatasetIndexPlan.build(
+                self._index_plan_children()
+            )
+        return self._index_plan
+
+    @property
+    def sample_cache(self) -> Optional[SampleCache]:
+        """
+        The cache used to store the patterns loaded from the underlying
+        datasets (None if this dataset doesn't use a cache).
+
+        See :meth:`with_cache` for more details.
+        """
+        return self._sample_cache
+
+    def with_cache(
+        self: TAvalancheDataset, max_bytes: int, policy: str = "lru"
+    ) -> TAvalancheDataset:
+        """
+        Returns a new dataset that caches the patterns loaded from the
+        underlying datasets.
+
+        Patterns are cached as they are returned by the underlying (leaf)
+        datasets, that is before any transformation is applied. This means
+        that datasets obtained from the returned one (by changing the
+        transformations group, by creating subsets or concatenations, ...)
+        share the same cache. This is useful with datasets that load their
+        patterns from files, which will be decoded only once.
+
+        The cache is limited to the given amount of bytes. See
+        :class:`SampleCache` for more details on the eviction policies and
+        on using the cache with multiple DataLoader workers. Beware that
+        in-place transformations should not be used, as they would alter
+        the cached patterns.
+
+        The current dataset will not be affected.
+
+        :param max_bytes: The maximum size of the cached patterns, in bytes.
+        :param policy: The eviction policy, "lru" or "clock". Defaults to
+            "lru".
+        :return: A new dataset using a cache.
+        """
+        dataset_copy = self._fork_dataset()
+        dataset_copy._use_index_plan = True
+        dataset_copy._sample_cache = SampleCache(max_bytes, policy)
+        return dataset_copy
+
+    def compile_index_plan(self: TAvalancheDataset) -> TAvalancheDataset:
+        """
+        Returns a new dataset that retrieves patterns using a flat index plan.
+
+        Trees of nested subsets and concatenated datasets are flattened to a
+        pair of int64 arrays (leaf dataset id, index in the leaf dataset) and
+        the transformations found along the path to each leaf dataset are
+        collected once. This means that retrieving a pattern takes constant
+        time regardless of the depth of the tree.
+
+        Datasets created from a compiled dataset (subsets, concatenations,
+        datasets with different transformations, ...) will use a plan, too.
+        Their plan is built when the first pattern is retrieved.
+
+        The current dataset will not be affected.
+
+        :return: A new dataset using a flat index plan.
+        """
+        dataset_copy = self._fork_dataset()
+        dataset_copy._use_index_plan = True
+        dataset_copy.index_plan  # Build the plan
+        return dataset_copy
+
+    def share_memory(self: TAvalancheDataset) -> TAvalancheDataset:
+        """
+        Moves the content of this dataset to shared memory (in place).
+
+        The Tensors and NumPy arrays of the leaf datasets (such as the ones
+        of :class:`AvalancheTensorDataset` and of PyTorch TensorDatasets),
+        the indices of PyTorch subsets and the targets and task labels of
+        this dataset and of the wrapped ones are moved to shared memory.
+        When the dataset is sent to the workers of a DataLoader, only
+        handles to the shared memory are transferred. This reduces the memory
+        used by workers and their startup time, especially when using the
+        "spawn" start method.
+
+        Datasets storing their patterns in memory-mapped files (see
+        :meth:`materialize`) are always sent as a handle.
+
+        :return: This dataset.
+        """
+        _share_dataset_memory(self)
+        return self
+
+    def __getstate__(self):
+        # Data derived from the dataset content is not sent to other
+        # processes: it is rebuilt when needed.
+        state = dict(self.__dict__)
+        state["_compiled_transforms"] = None
+        state["_compiled_batch_transforms"] = dict()
+        state["_statistics"] = None
+        return state
+
+    def materialize(
+        self,
+        path: str,
+        dtype: Optional[torch.dtype] = None,
+        batch_size: int = 256,
+        num_workers: int = 0,
+        fingerprint: Optional[str] = None,
+    ) -> "AvalancheDataset":
+        """
+        Returns a new dataset whose patterns are computed once and stored in
+        a memory-mapped file.
+
+        The frozen transformations of the current group (including the ones
+        of the wrapped datasets) and the transformations of the wrapped
+        datasets that are not AvalancheDatasets are applied once to all the
+        patterns. The resulting X values, which must be Tensors of the same
+        shape, are stored in the `path` directory along with the resulting
+        targets and task labels. The returned dataset reads the X values
+        from the memory-mapped file without copying them. Only the
+        non-frozen transformations are applied on the fly.
+
+        A fingerprint of the source datasets and of the frozen
+        transformations is stored along with the patterns. If the directory
+        already contains patterns with the same fingerprint, they are re-used
+        instead of being computed again. The content of in-memory datasets
+        (PyTorch TensorDatasets and the sequences of
+        :class:`AvalancheTensorDataset`) is part of the fingerprint. Other
+        datasets are described by their `root` directory, if any. Beware
+        that the fingerprint doesn't consider the content of the files the
+        patterns are loaded from: delete the directory if those files
+        change. Datasets that have neither a known content nor a root
+        directory are never re-used, unless a `fingerprint` identifying
+        their content is given.
+
+        The returned dataset has the same transformation groups of this
+        dataset. The non-frozen transformations of the wrapped datasets are
+        applied before the ones of this dataset, but after all the frozen
+        transformations. Groups with frozen transformations different from
+        the ones of the current group will use the stored patterns anyway (a
+        warning is raised). Batch transformations are kept as they are.
+
+        The current dataset will not be affected.
+
+        :param path: The directory in which the patterns will be stored.
+        :param dtype: The dtype used to store the X values. Defaults to None,
+            which means that the dtype of the transformed X values will be
+            used.
+        :param batch_size: The number of patterns processed at once.
+            Defaults to 256.
+        :param num_workers: The number of processes used to apply the frozen
+            transformations. Defaults to 0, which means that the main process
+            is used.
+        :param fingerprint: A string identifying the content of the source
+            datasets. Defaults to None. If given, it's used in place of the
+            content of the datasets that can't be described otherwise.
+        :return: A new dataset reading patterns from the memory-mapped file.
+        """
+        group = self.current_transform_group
+        frozen_tree = self._get_frozen_transforms_tree(group)
+        for group_name in self.transform_groups:
+            if self._get_frozen_transforms_tree(group_name) != frozen_tree:
+                warnings.warn(
+                    "The frozen transformations of group {} differ from the "
+                    "ones of group {}, which will be used to materialize the "
+                    "dataset".format(group_name, group)
+                )
+
+        np_dtype = None
+        if dtype is not None:
+            np_dtype = torch.empty((), dtype=dtype).numpy().dtype
+
+        frozen_dataset = self.replace_transforms(None, None)
+        fingerprint = _materialization_fingerprint(
+            frozen_dataset, frozen_tree, np_dtype, fingerprint
+        )
+        metadata = MemoryMappedDataset.read_metadata(path)
+        if (
+            fingerprint is not None
+            and metadata is not None
+            and metadata["fingerprint"] == fingerprint
+            and metadata["length"] == len(self)
+        ):
+            stored_dataset = MemoryMappedDataset(path)
+        else:
+            loader = DataLoader(
+                frozen_dataset,
+                batch_size=batch_size,
+                num_workers=num_workers,
+                collate_fn=default_collate,
+            )
+            stored_dataset = MemoryMappedDataset.write(
+                path,
+                (_check_materialized_batch(batch) for batch in loader),
+                len(self),
+                dtype=np_dtype,
+                fingerprint=fingerprint,
+            )
+
+        return self._with_stored_patterns(
+            stored_dataset, self.targets, self.targets_task_labels
+        )
+
     def train(self):
         """
         Returns a new dataset with the transformations of the 'train' group
@@ -713,10 +1060,182 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
 
         return dataset_copy
 
+    def get_batch_transforms(
+        self, transforms_group: str = None
+    ) -> Tuple[Any, Any]:
+        """
+        Returns the batch transformations given a group.
+
+        Beware that this will not return the frozen batch transformations.
+
+        :param transforms_group: The transformations group. Defaults to None,
+            which means that the current group is returned.
+        :return: The batch transformation group, as a tuple
+            (transform, target_transform).
+        """
+        if transforms_group is None:
+            transforms_group = self.current_transform_group
+
+        return self.batch_transform_groups.get(transforms_group, (None, None))
+
+    def add_batch_transforms(
+        self: TAvalancheDataset,
+        transform: Callable[[Any], Any] = None,
+        target_transform: Callable[[Any], Any] = None,
+        group: str = None,
+    ) -> TAvalancheDataset:
+        """
+        Returns a new dataset with the given batch transformations added to
+        the existing ones.
+
+        Batch transformations are applied to whole mini-batches, after
+        patterns have been collated by the data loader (see
+        :meth:`apply_batch_transforms`). This means that vectorized
+        transformations (normalization, permutations, flips, ...) can be
+        applied to the whole batch of X values at once, possibly on the
+        GPU. As with per-pattern transformations, the X transformation may
+        also accept the batch of targets (and other values) and return all
+        of them.
+
+        The given transformations will be added "at the end" of previous
+        batch transformations of the given group. Other groups will not be
+        affected.
+
+        The current dataset will not be affected.
+
+        :param transform: A function/transform that takes a batch of X
+            values and returns a transformed version.
+        :param target_transform: A function/transform that takes a batch of
+            targets and transforms it.
+        :param group: The transforms group. Defaults to None, which means
+            that the current group will be used.
+        :return: A new dataset with the added batch transformations.
+        """
+        if group is None:
+            group = self.current_transform_group
+
+        dataset_copy = self._fork_dataset()
+        current_group = dataset_copy.get_batch_transforms(group)
+        dataset_copy.batch_transform_groups[group] = (
+            _compose_transforms_chain(
+                [current_group, (transform, target_transform)]
+            )
+        )
+        return dataset_copy
+
+    def replace_batch_transforms(
+        self: TAvalancheDataset,
+        transform: Callable[[Any], Any],
+        target_transform: Callable[[Any], Any],
+        group: str = None,
+    ) -> TAvalancheDataset:
+        """
+        Returns a new dataset with the existing batch transformations
+        replaced with the given ones.
+
+        Note that this function will not override frozen batch
+        transformations.
+
+        The current dataset will not be affected.
+
+        :param transform: A function/transform that takes a batch of X
+            values and returns a transformed version.
+        :param target_transform: A function/transform that takes a batch of
+            targets and transforms it.
+        :param group: The transforms group to replace. Defaults to None, which
+            means that the current group will be replaced.
+        :return: A new dataset with the new batch transformations.
+        """
+        if group is None:
+            group = self.current_transform_group
+
+        dataset_copy = self._fork_dataset()
+        dataset_copy.batch_transform_groups[group] = (
+            transform,
+            target_transform,
+        )
+        return dataset_copy
+
+    def freeze_batch_transforms(
+        self: TAvalancheDataset,
+    ) -> TAvalancheDataset:
+        """
+        Returns a new dataset where the current batch transformations of all
+        groups are frozen.
+
+        Frozen batch transformations can't be changed anymore by using
+        ``replace_batch_transforms``. They are applied before the non-frozen
+        ones.
+
+        The current dataset will not be affected.
+
+        :return: A new dataset with the batch transformations frozen.
+        """
+        dataset_copy = self._fork_dataset()
+        for group_name, group in self.batch_transform_groups.items():
+            frozen_group = self._frozen_batch_transforms.get(
+                group_name, (None, None)
+            )
+            dataset_copy._frozen_batch_transforms[group_name] = (
+                _compose_transforms_chain([frozen_group, group])
+            )
+            dataset_copy.batch_transform_groups[group_name] = (None, None)
+        return dataset_copy
+
+    def apply_batch_transforms(self, mbatch: Sequence[Any]) -> List[Any]:
+        """
+        Applies the (frozen and non-frozen) batch transformations of the
+        current group to a mini-batch.
+
+        The mini-batch must be a sequence of collated values in the form
+        <x, y, ..., t>. The task labels are never passed to the batch
+        transformations. Strategies apply batch transformations
+        automatically when unpacking mini-batches, after moving them to the
+        device.
+
+        :param mbatch: The collated mini-batch.
+        :return: The transformed mini-batch, as a list.
+        """
+        group = self.current_transform_group
+        frozen_group = self._frozen_batch_transforms.get(group, (None, None))
+        current_group = self.batch_transform_groups.get(group, (None, None))
+
+        mbatch = list(mbatch)
+        for target_transform in (frozen_group[1], current_group[1]):
+            if target_transform is not None:
+                mbatch[1] = target_transform(mbatch[1])
+
+        x_pipeline = self._get_batch_transforms_pipeline(
+            group, (frozen_group[0], current_group[0])
+        )
+        if len(x_pipeline) > 0:
+            mbatch = [*x_pipeline(*mbatch[:-1]), mbatch[-1]]
+        return mbatch
+
+    def _get_batch_transforms_pipeline(
+        self, group: str, pipeline_sources: Tuple
+    ) -> TransformPipeline:
+        # Returns the (frozen + current) batch transformations of the given
+        # group compiled as a flat pipeline. Pipelines are compiled once and
+        # then reused until the transformations change.
+        compiled = self._compiled_batch_transforms.get(group, None)
+        if compiled is None or compiled[0] != pipeline_sources:
+            compiled = (pipeline_sources, TransformPipeline(pipeline_sources))
+            self._compiled_batch_transforms[group] = compiled
+        return compiled[1]
+
     def _fork_dataset(self: TAvalancheDataset) -> TAvalancheDataset:
         dataset_copy = copy.copy(self)
         dataset_copy._frozen_transforms = dict(dataset_copy._frozen_transforms)
         dataset_copy.transform_groups = dict(dataset_copy.transform_groups)
+        dataset_copy._index_plan = None
+        dataset_copy.batch_transform_groups = dict(
+            dataset_copy.batch_transform_groups
+        )
+        dataset_copy._frozen_batch_transforms = dict(
+            dataset_copy._frozen_batch_transforms
+        )
+        dataset_copy._compiled_batch_transforms = dict()
 
         return dataset_copy
 
@@ -782,8 +1301,22 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
         dataset_copy._freeze_original_dataset(group_name)
 
     def _get_single_item(self, idx: int):
+        if self._use_index_plan:
+            return self._process_pattern(
+                self.index_plan.get_item(idx, self._sample_cache), idx
+            )
         return self._process_pattern(self._dataset[idx], idx)
 
+    def _get_multiple_items(self, indices: List[int]) -> List:
+        if self._use_index_plan:
+            return self._process_patterns(
+                self.index_plan.get_items(indices, self._sample_cache),
+                indices,
+            )
+        return self._process_patterns(
+            fetch_items(self._dataset, indices), indices
+        )
+
     def _process_pattern(self, element: Tuple, idx: int):
         has_task_label = isinstance(element, TupleTLabel)
         if has_task_label:
@@ -797,22 +1330,231 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
 
     def _apply_transforms(self, element: Sequence[Any]):
         element = list(element)
-        frozen_group = self._frozen_transforms[self.current_transform_group]
+        x_pipeline, y_pipeline = self._get_transforms_pipelines()
 
         # Target transform
-        if frozen_group[1] is not None:
-            element[1] = frozen_group[1](element[1])
+        for target_transform in y_pipeline.transforms:
+            element[1] = target_transform(element[1])
 
-        if self.target_transform is not None:
-            element[1] = self.target_transform(element[1])
+        if len(x_pipeline) > 0:
+            element = x_pipeline(*element)
 
-        if frozen_group[0] is not None:
-            element = MultiParamTransform(frozen_group[0])(*element)
+        return element
 
-        if self.transform is not None:
-            element = MultiParamTransform(self.transform)(*element)
+    def _get_transforms_pipelines(
+        self,
+    ) -> Tuple[TransformPipeline, TransformPipeline]:
+        # Returns the (frozen + current) transformations of the current group,
+        # compiled as flat pipelines. Pipelines are compiled once and then
+        # reused until the group or the transformations change.
+        frozen_group = self._frozen_transforms[self.current_transform_group]
+        pipeline_sources = (
+            frozen_group[0],
+            self.transform,
+            frozen_group[1],
+            self.target_transform,
+        )
 
-        return element
+        compiled = self._compiled_transforms
+        if compiled is None or compiled[0] != pipeline_sources:
+            compiled = (
+                pipeline_sources,
+                TransformPipeline(pipeline_sources[:2]),
+                TransformPipeline(pipeline_sources[2:]),
+            )
+            self._compiled_transforms = compiled
+
+        return compiled[1], compiled[2]
+
+    def _make_statistics(self) -> DatasetStatistics:
+        return DatasetStatistics(self.targets, self.targets_task_labels)
+
+    def _has_active_transforms(self) -> bool:
+        frozen_group = self._frozen_transforms[self.current_transform_group]
+        return (
+            frozen_group[0] is not None
+            or frozen_group[1] is not None
+            or self.transform is not None
+            or self.target_transform is not None
+        )
+
+    def _index_plan_children(self) -> List[Dataset]:
+        return [self._dataset]
+
+    def _avalanche_children(self) -> List[Optional["AvalancheDataset"]]:
+        # The wrapped datasets, with None in place of the datasets that are
+        # not AvalancheDatasets
+        children = []
+        for child in self._index_plan_children():
+            while isinstance(child, Subset):
+                child = child.dataset
+            if not isinstance(child, AvalancheDataset):
+                child = None
+            children.append(child)
+        return children
+
+    def _inherit_batch_transforms(self):
+        # Batch transformations are applied to mini-batches containing
+        # patterns from all the wrapped datasets: they must be the same
+        inherited = None
+        inherited_groups = None
+        for child in self._avalanche_children():
+            if child is None:
+                continue
+            child_transforms = (
+                child.batch_transform_groups,
+                child._frozen_batch_transforms,
+            )
+            child_groups = tuple(map(_non_empty_groups, child_transforms))
+            if inherited is None:
+                inherited = child_transforms
+                inherited_groups = child_groups
+            elif inherited_groups != child_groups:
+                raise ValueError(
+                    "Concatenated datasets must have the same batch "
+                    "transformations"
+                )
+
+        if inherited is not None:
+            self.batch_transform_groups = dict(inherited[0])
+            self._frozen_batch_transforms = dict(inherited[1])
+
+    def _with_stored_patterns(
+        self,
+        stored_dataset: Dataset,
+        targets: Sequence[TTargetType],
+        task_labels: Sequence[int],
+    ) -> "AvalancheDataset":
+        # A dataset reading the patterns, to which the frozen transformations
+        # of this dataset have already been applied, from stored_dataset.
+        # Only the non-frozen transformations are applied on the fly.
+        transform_groups = dict()
+        for group_name in self.transform_groups:
+            transform_groups[group_name] = _compose_transforms_chain(
+                self._get_transforms_chain(group_name)
+            )
+
+        collate_fn = None
+        if self.dataset_type == AvalancheDatasetType.UNDEFINED:
+            collate_fn = self.collate_fn
+
+        stored = AvalancheDataset(
+            stored_dataset,
+            transform_groups=transform_groups,
+            initial_transform_group=self.current_transform_group,
+            task_labels=task_labels,
+            targets=targets,
+            dataset_type=self.dataset_type,
+            collate_fn=collate_fn,
+        )
+        stored.batch_transform_groups = dict(self.batch_transform_groups)
+        stored._frozen_batch_transforms = dict(self._frozen_batch_transforms)
+        return stored
+
+    def _get_frozen_transforms_tree(self, group_name: str) -> Tuple:
+        # The frozen transformations of the given group found in this dataset
+        # and in the wrapped datasets, as nested tuples
+        children_trees = tuple(
+            None if child is None
+            else child._get_frozen_transforms_tree(group_name)
+            for child in self._avalanche_children()
+        )
+        frozen_group = self._frozen_transforms.get(group_name, (None, None))
+        return tuple(frozen_group), children_trees
+
+    def _get_transforms_chain(
+        self, group_name: str
+    ) -> List[Tuple[XTransform, YTransform]]:
+        # The non-frozen transformations of the given group found in the
+        # wrapped datasets and in this dataset, in the order in which they
+        # are applied
+        children_chains = [
+            [] if child is None else child._get_transforms_chain(group_name)
+            for child in self._avalanche_children()
+        ]
+
+        chain = []
+        if len(children_chains) > 0:
+            chain = children_chains[0]
+            for child_chain in children_chains[1:]:
+                if child_chain != chain:
+                    raise ValueError(
+                        "Concatenated datasets must have the same non-frozen "
+                        "transformations. Consider freezing them."
+                    )
+
+        if group_name == self.current_transform_group:
+            own_group = (self.transform, self.target_transform)
+        else:
+            own_group = self.transform_groups.get(group_name, (None, None))
+
+        if own_group[0] is not None or own_group[1] is not None:
+            chain = chain + [tuple(own_group)]
+        return chain
+
+    def _index_plan_node(self):
+        # Used by DatasetIndexPlan to traverse the tree of datasets.
+        # Datasets that customize the way patterns are retrieved are
+        # considered leaf datasets.
+        dataset_type = type(self)
+        if (
+            dataset_type._get_single_item not in _PLANNABLE_ITEM_GETTERS
+            or dataset_type._process_pattern
+            is not AvalancheDataset._process_pattern
+            or dataset_type._apply_transforms
+            is not AvalancheDataset._apply_transforms
+        ):
+            return None
+
+        step = None
+        if self._has_active_transforms():
+            step = _TransformsPlanStep(self)
+        return self._index_plan_children(), step
+
+    def _process_patterns(self, elements: List[Tuple], indices: List[int]):
+        # Batched version of _process_pattern
+        elements = [
+            element[:-1] if isinstance(element, TupleTLabel) else element
+            for element in elements
+        ]
+
+        elements = self._apply_transforms_batch(elements)
+
+        task_labels = self.targets_task_labels
+        return [
+            TupleTLabel((*element, task_labels[idx]))
+            for element, idx in zip(elements, indices)
+        ]
+
+    def _apply_transforms_batch(self, elements: List[Sequence[Any]]):
+        # Batched version of _apply_transforms: transformations are applied
+        # in the same order, batch-capable ones are applied once.
+        elements = [list(element) for element in elements]
+        if len(elements) == 0:
+            return elements
+
+        x_pipeline, y_pipeline = self._get_transforms_pipelines()
+
+        # Target transform
+        for target_transform in y_pipeline.transforms:
+            if not _apply_batch_transform(target_transform, elements, 1, 1):
+                for element in elements:
+                    element[1] = target_transform(element[1])
+
+        for transform, (_, max_params) in zip(
+            x_pipeline.transforms, x_pipeline.param_def
+        ):
+            if not _apply_batch_transform(
+                transform, elements, 0, max_params
+            ):
+                elements = [
+                    MultiParamTransform._call_transform(
+                        transform, None, max_params, *element
+                    )
+                    for element in elements
+                ]
+
+        return elements
 
     @staticmethod
     def _check_groups_dict_format(groups_dict):
@@ -969,6 +1711,10 @@ class AvalancheDataset(IDatasetWithTargets[T_co, TTargetType], Dataset[T_co]):
             # Shortcut :)
             return {task_labels[0]: range(len(task_labels))}
 
+        task_labels_array = as_int_array(task_labels)
+        if task_labels_array is not None:
+            return _group_indices_by_value(task_labels_array)
+
         result = dict()
         for i, x in enumerate(task_labels):
             if x not in result:
@@ -1291,6 +2037,11 @@ class AvalancheSubset(AvalancheDataset[T_co, TTargetType]):
                     " is neither CLASSIFICATION or UNDEFINED."
                 )
 
+        if indices is not None:
+            indices = optimize_sequence(indices)
+        if class_mapping is not None:
+            class_mapping = optimize_sequence(class_mapping)
+
         if class_mapping is not None:
             subset = ClassificationSubset(
                 dataset, indices=indices, class_mapping=class_mapping
@@ -1302,7 +2053,7 @@ class AvalancheSubset(AvalancheDataset[T_co, TTargetType]):
 
         self._original_dataset = dataset
         # self._indices and self._class_mapping currently not used apart from
-        # initialization procedures
+        # initialization procedures. Both are stored as compact int arrays.
         self._class_mapping = class_mapping
         self._indices = indices
 
@@ -1461,20 +2212,10 @@ class AvalancheSubset(AvalancheDataset[T_co, TTargetType]):
             forward_class_mapping = self._original_dataset._class_mapping
 
             if self._class_mapping is not None:
-
                 if forward_class_mapping is not None:
-
-                    new_class_mapping = []
-                    for mapped_class in forward_class_mapping:
-                        # -1 is sometimes used to mark unused classes
-                        # shouldn't be a problem (if it is, is not our fault)
-                        if mapped_class == -1:
-                            forward_mapped = -1
-                        else:
-                            # forward_mapped may be -1
-                            forward_mapped = self._class_mapping[mapped_class]
-
-                        new_class_mapping.append(forward_mapped)
+                    new_class_mapping = _compose_class_mappings(
+                        forward_class_mapping, self._class_mapping
+                    )
                 else:
                     new_class_mapping = self._class_mapping
             else:
@@ -1482,7 +2223,11 @@ class AvalancheSubset(AvalancheDataset[T_co, TTargetType]):
 
             if self._indices is not None:
                 if forward_indices is not None:
-                    new_indices = [forward_indices[x] for x in self._indices]
+                    new_indices = ArraySequence(
+                        as_int_array(forward_indices)[
+                            as_int_array(self._indices)
+                        ]
+                    )
                 else:
                     new_indices = self._indices
             else:
@@ -1855,6 +2600,11 @@ class AvalancheConcatDataset(AvalancheDataset[T_co, TTargetType]):
         return self._overall_length
 
     def _get_single_item(self, idx: int):
+        if self._use_index_plan:
+            return self._process_pattern(
+                self.index_plan.get_item(idx, self._sample_cache), idx
+            )
+
         dataset_idx, internal_idx = find_list_from_index(
             idx,
             self._datasets_lengths,
@@ -1866,6 +2616,55 @@ class AvalancheConcatDataset(AvalancheDataset[T_co, TTargetType]):
 
         return self._process_pattern(single_element, idx)
 
+    def _get_multiple_items(self, indices: List[int]) -> List:
+        if len(indices) == 0:
+            return []
+
+        if (
+            max(indices) >= self._overall_length
+            or min(indices) < -self._overall_length
+        ):
+            raise IndexError()
+
+        if self._use_index_plan:
+            return self._process_patterns(
+                self.index_plan.get_items(indices, self._sample_cache),
+                indices,
+            )
+
+        # Find the dataset of each pattern with a single searchsorted, then
+        # fetch the patterns of each concatenated dataset in one go
+        # negative indices count from the end of the concatenation
+        indices_tensor = torch.remainder(
+            torch.as_tensor(indices, dtype=torch.long), self._overall_length
+        )
+        cumulative_lengths = torch.as_tensor(
+            self._datasets_cumulative_lengths, dtype=torch.long
+        )
+        datasets_idxs = torch.searchsorted(
+            cumulative_lengths, indices_tensor, right=True
+        )
+        datasets_offsets = cumulative_lengths - torch.as_tensor(
+            self._datasets_lengths, dtype=torch.long
+        )
+        internal_idxs = indices_tensor - datasets_offsets[datasets_idxs]
+
+        elements = [None] * len(indices)
+        for dataset_idx in torch.unique(datasets_idxs).tolist():
+            positions = torch.nonzero(
+                datasets_idxs == dataset_idx, as_tuple=True
+            )[0]
+            dataset_elements = fetch_items(
+                self._dataset_list[dataset_idx],
+                internal_idxs[positions].tolist(),
+            )
+            for position, element in zip(
+                positions.tolist(), dataset_elements
+            ):
+                elements[position] = element
+
+        return self._process_patterns(elements, indices)
+
     def _fork_dataset(self: TAvalancheDataset) -> TAvalancheDataset:
         dataset_copy = super()._fork_dataset()
 
@@ -1874,6 +2673,29 @@ class AvalancheConcatDataset(AvalancheDataset[T_co, TTargetType]):
 
         return dataset_copy
 
+    def _index_plan_children(self) -> List[Dataset]:
+        return self._dataset_list
+
+    def _make_statistics(self) -> DatasetStatistics:
+        # Merge the statistics of the concatenated datasets, if available
+        # and consistent with the targets and task labels of the concat.
+        datasets_statistics = [
+            getattr(dataset, "_statistics", None)
+            for dataset in self._dataset_list
+        ]
+        if len(datasets_statistics) > 0 and all(
+            statistics is not None for statistics in datasets_statistics
+        ):
+            statistics = DatasetStatistics.concat(datasets_statistics)
+            if np.array_equal(
+                statistics.targets, as_int_array(self.targets)
+            ) and np.array_equal(
+                statistics.task_labels, as_int_array(self.targets_task_labels)
+            ):
+                return statistics
+
+        return super()._make_statistics()
+
     def _initialize_targets_sequence(
         self, dataset, targets, dataset_type, targets_adapter
     ) -> Sequence[TTargetType]:
@@ -2418,16 +3240,259 @@ def _traverse_supported_dataset(
     raise ValueError("Error: can't find the needed data in the given dataset")
 
 
+class _TransformsPlanStep:
+    # Index plan step that applies the transformations of an
+    # AvalancheDataset found in the middle of a tree of datasets.
+
+    def __init__(self, dataset: AvalancheDataset):
+        self.dataset = dataset
+
+    def __call__(self, element: List) -> List:
+        return [*self.dataset._apply_transforms(element)]
+
+    def apply_batch(self, elements: List[List]) -> List[List]:
+        return self.dataset._apply_transforms_batch(elements)
+
+
+def _share_dataset_memory(dataset):
+    if isinstance(dataset, AvalancheDataset):
+        shared_sequences = [dataset.targets, dataset.targets_task_labels]
+        shared_sequences.extend(dataset.tasks_pattern_indices.values())
+        for sequence in shared_sequences:
+            if isinstance(sequence, (ArraySequence, torch.Tensor)):
+                share_sequence_memory(sequence)
+        for child in dataset._index_plan_children():
+            _share_dataset_memory(child)
+    elif isinstance(dataset, Subset):
+        share_sequence_memory(dataset.indices)
+        _share_dataset_memory(dataset.dataset)
+    elif isinstance(dataset, ConcatDataset):
+        for child in dataset.datasets:
+            _share_dataset_memory(child)
+    elif isinstance(dataset, SequenceDataset):
+        dataset.share_memory()
+    elif isinstance(dataset, TensorDataset):
+        for tensor in dataset.tensors:
+            share_sequence_memory(tensor)
+
+
+def _compose_class_mappings(
+    forward_class_mapping: Sequence[int], class_mapping: Sequence[int]
+) -> ArraySequence:
+    # Applies class_mapping to the classes mapped by forward_class_mapping.
+    # -1 is sometimes used to mark unused classes: it's kept as it is.
+    forward_mapping = as_int_array(forward_class_mapping)
+    unused_classes = forward_mapping == -1
+    if np.all(unused_classes):
+        return ArraySequence(forward_mapping)
+
+    mapping = as_int_array(class_mapping)
+    composed = mapping[np.where(unused_classes, 0, forward_mapping)]
+    composed[unused_classes] = -1
+    return ArraySequence(composed)
+
+
+def _compose_transforms_chain(
+    chain: List[Tuple[XTransform, YTransform]]
+) -> Tuple[XTransform, YTransform]:
+    composed = []
+    for value_idx in range(2):
+        transforms = [t[value_idx] for t in chain if t[value_idx] is not None]
+        if len(transforms) == 0:
+            composed.append(None)
+        elif len(transforms) == 1:
+            composed.append(transforms[0])
+        else:
+            composed.append(Compose(transforms))
+    return composed[0], composed[1]
+
+
+def _materialization_fingerprint(
+    frozen_dataset: AvalancheDataset,
+    frozen_tree: Tuple,
+    dtype,
+    user_fingerprint: Optional[str] = None,
+) -> Optional[str]:
+    # Describes the leaf datasets (including the content of the in-memory
+    # ones), the way patterns are picked from them and the frozen
+    # transformations applied to them. Returns None if the content of a leaf
+    # dataset can't be described.
+    plan = frozen_dataset.index_plan
+    leaves = []
+    for route in plan.routes:
+        leaf = route.dataset
+        root = getattr(leaf, "root", None)
+        content = None
+        if root is None:
+            content = _leaf_content(leaf)
+            if content is None and user_fingerprint is None:
+                return None
+        leaves.append(
+            (
+                type(leaf).__module__,
+                type(leaf).__qualname__,
+                len(leaf),
+                root,
+                content,
+                getattr(leaf, "transform", None),
+                getattr(leaf, "target_transform", None),
+                [
+                    step.class_mapping
+                    for step in route.steps
+                    if isinstance(step, ClassMappingStep)
+                ],
+            )
+        )
+
+    return transforms_fingerprint(
+        [
+            "materialize-v2",
+            user_fingerprint,
+            str(dtype),
+            leaves,
+            plan.leaf_ids,
+            plan.leaf_indices,
+            frozen_tree,
+            as_int_array(frozen_dataset.targets_task_labels),
+        ]
+    )
+
+
+def _non_empty_groups(groups: Dict[str, Tuple]) -> Dict[str, Tuple]:
+    # The groups containing at least a transformation: a missing group is
+    # equivalent to a (None, None) one
+    return {
+        name: group
+        for name, group in groups.items()
+        if tuple(group) != (None, None)
+    }
+
+
+def _leaf_content(leaf) -> Optional[List]:
+    # The in-memory values of a leaf dataset, which are hashed by the
+    # fingerprint, or None if they are not known
+    if isinstance(leaf, TensorDataset):
+        return list(leaf.tensors)
+    if isinstance(leaf, SequenceDataset):
+        return list(leaf._sequences)
+    return None
+
+
+def _check_materialized_batch(batch):
+    if len(batch) != 3:
+        raise ValueError(
+            "Only datasets made of (x, y, task label) patterns can be "
+            "materialized"
+        )
+    return batch
+
+
+_PLANNABLE_ITEM_GETTERS = (
+    AvalancheDataset._get_single_item,
+    AvalancheConcatDataset._get_single_item,
+)
+
+
+def _get_inherited_attribute(dataset, attribute_name: str, default):
+    while isinstance(dataset, Subset):
+        dataset = dataset.dataset
+    return getattr(dataset, attribute_name, default)
+
+
+def _stack_values(elements: List[List[Any]], value_idx: int):
+    # Stacks the values found at the given position of each element.
+    # Returns None if they can't be stacked in a single Tensor.
+    values = [element[value_idx] for element in elements]
+    first_value = values[0]
+    if isinstance(first_value, torch.Tensor):
+        shape = first_value.shape
+        for value in values:
+            if not isinstance(value, torch.Tensor) or value.shape != shape:
+                return None
+        return torch.stack(values)
+
+    if all(isinstance(value, (int, float)) for value in values):
+        return torch.as_tensor(values)
+
+    return None
+
+
+def _apply_batch_transform(
+    transform, elements: List[List[Any]], first_value: int, n_values: int
+) -> bool:
+    # Applies a batch-capable transformation to the stacked values of the
+    # given elements. The elements are modified in place. Returns False if
+    # the transformation can't be applied in a batched way.
+    if not is_batch_transform(transform):
+        return False
+
+    element_len = len(elements[0])
+    if n_values == -1:
+        n_values = element_len - first_value
+    n_values = min(n_values, element_len - first_value)
+
+    if any(len(element) != element_len for element in elements):
+        return False
+
+    stacked = []
+    for value_idx in range(first_value, first_value + n_values):
+        stacked_values = _stack_values(elements, value_idx)
+        if stacked_values is None:
+            return False
+        stacked.append(stacked_values)
+
+    transform_result = transform(*stacked)
+    if not isinstance(transform_result, tuple):
+        transform_result = (transform_result,)
+
+    unbound_results = [
+        result.unbind(0) if isinstance(result, torch.Tensor) else result
+        for result in transform_result
+    ]
+
+    for element_idx, element in enumerate(elements):
+        element[first_value:first_value + n_values] = [
+            result[element_idx] for result in unbound_results
+        ]
+
+    return True
+
+
 def _count_unique(*sequences: Sequence[SupportsInt]):
     uniques = set()
 
     for seq in sequences:
+        values = as_int_array(seq)
+        if values is not None:
+            uniques.update(np.unique(values).tolist())
+            continue
+
         for x in seq:
             uniques.add(int(x))
 
     return len(uniques)
 
 
+def _group_indices_by_value(values: np.ndarray) -> Dict[int, Sequence[int]]:
+    # Vectorized version of the loop found in _initialize_tasks_dict: keys
+    # are sorted by first occurrence.
+    if len(values) == 0:
+        return dict()
+
+    order = np.argsort(values, kind="stable")
+    unique_values, starts = np.unique(values[order], return_index=True)
+    if len(unique_values) == 1:
+        return {int(unique_values[0]): range(len(values))}
+
+    ends = np.append(starts[1:], len(values))
+    result = dict()
+    for group_idx in np.argsort(order[starts], kind="stable").tolist():
+        result[int(unique_values[group_idx])] = ArraySequence(
+            order[starts[group_idx]:ends[group_idx]]
+        )
+    return result
+
+
 def _select_targets(dataset, indices):
     if hasattr(dataset, "targets"):
         # Standard supported dataset
@@ -2487,6 +3552,9 @@ def _make_target_from_supported_dataset(
         elif isinstance(dataset.targets, LazyClassMapping) and converter == int:
             # LazyClassMapping already outputs int targets
             return dataset.targets
+        elif isinstance(dataset.targets, ArraySequence) and converter == int:
+            # ArraySequence already outputs int targets
+            return dataset.targets
 
     targets = _traverse_supported_dataset(dataset, _select_targets)
 
@@ -2504,6 +3572,28 @@ def _make_task_labels_from_supported_dataset(
     return SubSequence(task_labels, converter=int)
 
 
+_dataset_add = None
+
+
+def _avdataset_radd(self, other, *args, **kwargs):
+    global _dataset_add
+    if isinstance(other, AvalancheDataset):
+        return NotImplemented
+
+    return _dataset_add(self, other, *args, **kwargs)
+
+
+def _avalanche_monkey_patches():
+    # Applied when AvalancheDataset is first imported: the patch is only
+    # relevant when adding a PyTorch Dataset and an AvalancheDataset.
+    global _dataset_add
+    _dataset_add = Dataset.__add__
+    Dataset.__add__ = _avdataset_radd
+
+
+_avalanche_monkey_patches()
+
+
 __all__ = [
     "SupportedDataset",
     "AvalancheDatasetType",
@@ -14,12 +14,11 @@
     support for balanced dataloading between different tasks or balancing
     between the current data and the replay memory.
 """
-from itertools import chain
-from typing import Dict, Sequence
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 import torch
-from torch.utils.data import RandomSampler
-from torch.utils.data.dataloader import DataLoader
+from torch.utils.data import Dataset, Sampler
+from torch.utils.data.dataloader import DataLoader, default_collate
 
 from avalanche.benchmarks.utils import AvalancheDataset
 
@@ -40,6 +39,284 @@ def _default_collate_mbatches_fn(mbatches):
     return batch
 
 
+class GroupBalancedBatchSampler(Sampler):
+    """Batch sampler that balances data from multiple groups (datasets).
+
+    Each mini-batch contains a fixed number of indices from each group. The
+    sampler yields lists of (group, index) pairs, where the indices of each
+    group are contiguous, so that a single :class:`DataLoader` (and a single
+    pool of workers) can serve all the groups.
+
+    When a group is completely iterated, it is either restarted (if it's
+    oversampled) or skipped in the subsequent mini-batches.
+    """
+
+    def __init__(
+        self,
+        group_lengths: Sequence[int],
+        batch_sizes: Sequence[int],
+        oversample: Sequence[bool],
+        num_batches: Optional[int],
+        shuffle: bool = False,
+        drop_last: bool = False,
+        replacement: bool = False,
+        generator: Optional[torch.Generator] = None,
+    ):
+        """Creates a group-balanced batch sampler.
+
+        :param group_lengths: the number of patterns in each group.
+        :param batch_sizes: the number of patterns taken from each group.
+        :param oversample: for each group, whether it should be restarted
+            when completely iterated.
+        :param num_batches: the number of mini-batches in an epoch. If None,
+            the sampler emits an infinite stream of mini-batches.
+        :param shuffle: whether the patterns of each group should be shuffled
+            at each iteration over the group.
+        :param drop_last: whether the last incomplete mini-batch of each
+            group should be dropped.
+        :param replacement: if True, the patterns of each group are sampled
+            randomly with replacement (each group is then never exhausted).
+        :param generator: the generator used to shuffle or sample the data.
+        """
+        assert len(group_lengths) == len(batch_sizes) == len(oversample)
+        self.group_lengths = list(group_lengths)
+        self.batch_sizes = list(batch_sizes)
+        self.oversample = list(oversample)
+        self.num_batches = num_batches
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.replacement = replacement
+        self.generator = generator
+
+    def __iter__(self) -> Iterator[List[Tuple[int, int]]]:
+        group_iterators = [
+            self._iter_group(group) for group in range(len(self.group_lengths))
+        ]
+
+        it = 0
+        while self.num_batches is None or it < self.num_batches:
+            it += 1
+            batch = []
+            for group, group_iterator in enumerate(group_iterators):
+                if group_iterator is None:
+                    continue
+                indices = next(group_iterator, None)
+                if indices is None:
+                    # We iterated over all the data from this group and we
+                    # don't need the iterator anymore.
+                    group_iterators[group] = None
+                    continue
+                batch.extend((group, idx) for idx in indices)
+
+            if len(batch) == 0:
+                return
+            yield batch
+
+    def __len__(self):
+        if self.num_batches is None:
+            return 10 ** 10
+        return self.num_batches
+
+    def _iter_group(self, group: int) -> Iterator[List[int]]:
+        length = self.group_lengths[group]
+        batch_size = self.batch_sizes[group]
+        if length == 0:
+            return
+
+        if self.replacement:
+            while True:
+                yield torch.randint(
+                    length, (batch_size,), generator=self.generator
+                ).tolist()
+
+        while True:
+            if _num_batches(length, batch_size, self.drop_last) == 0:
+                return
+
+            if self.shuffle:
+                order = torch.randperm(length, generator=self.generator)
+                order = order.tolist()
+            else:
+                order = list(range(length))
+
+            for start in range(0, length, batch_size):
+                indices = order[start : start + batch_size]
+                if self.drop_last and len(indices) < batch_size:
+                    break
+                yield indices
+
+            if not self.oversample[group]:
+                return
+
+
+class _GroupsDataset(Dataset):
+    """Dataset whose patterns are indexed by (group, index) pairs.
+
+    Patterns are returned as (group, pattern) pairs, so that the mini-batches
+    of each group can be collated separately.
+
+    If `index_maps` is set, the index `index_maps[group][idx]` of each pattern
+    is inserted before its task label.
+    """
+
+    def __init__(
+        self,
+        datasets: Sequence[Dataset],
+        index_maps: Optional[Sequence[Sequence[int]]] = None,
+    ):
+        self.datasets = list(datasets)
+        self.index_maps = index_maps
+
+    def __len__(self):
+        return sum(len(d) for d in self.datasets)
+
+    def __getitem__(self, idx):
+        group, idx = idx
+        return group, self._add_index(group, idx, self.datasets[group][idx])
+
+    def __getitems__(self, indices: List[Tuple[int, int]]) -> List:
+        samples = []
+        for group, group_indices in _group_runs(indices):
+            dataset = self.datasets[group]
+            if getattr(dataset, "__getitems__", None) is not None:
+                group_samples = dataset.__getitems__(group_indices)
+            else:
+                group_samples = [dataset[idx] for idx in group_indices]
+            samples.extend(
+                (group, self._add_index(group, idx, sample))
+                for idx, sample in zip(group_indices, group_samples)
+            )
+        return samples
+
+    def _add_index(self, group, idx, sample):
+        if self.index_maps is None:
+            return sample
+        return (*sample[:-1], self.index_maps[group][idx], sample[-1])
+
+
+class _GroupBalancedCollate:
+    """Collates the patterns of each group separately and then combines the
+    resulting mini-batches using `collate_mbatches`."""
+
+    def __init__(self, collate_fn, collate_mbatches):
+        self.collate_fn = collate_fn
+        self.collate_mbatches = collate_mbatches
+
+    def __call__(self, batch):
+        mbatches = [
+            self.collate_fn(samples) for _, samples in _group_runs(batch)
+        ]
+        return self.collate_mbatches(mbatches)
+
+
+def _group_runs(pairs):
+    """Splits a list of (group, value) pairs in runs of consecutive pairs
+    belonging to the same group. Returns a list of (group, values) pairs."""
+    runs = []
+    for group, value in pairs:
+        if len(runs) == 0 or runs[-1][0] != group:
+            runs.append((group, []))
+        runs[-1][1].append(value)
+    return runs
+
+
+def _group_balanced_loader(
+    datasets: Sequence[Dataset],
+    batch_sizes: Sequence[int],
+    oversample: Sequence[bool],
+    num_batches: Optional[int],
+    collate_mbatches,
+    replacement: bool = False,
+    index_maps: Optional[Sequence[Sequence[int]]] = None,
+    **kwargs
+) -> Tuple[DataLoader, GroupBalancedBatchSampler]:
+    """Creates a single data loader emitting group-balanced mini-batches.
+
+    :param index_maps: if not None, the index of each pattern (see
+        :class:`_GroupsDataset`) is added to the mini-batches.
+    :param kwargs: data loader arguments. `shuffle`, `drop_last` and
+        `collate_fn` are applied to each group separately.
+    :return: the data loader and its batch sampler.
+    """
+    kwargs = dict(kwargs)
+    shuffle = kwargs.pop("shuffle", False)
+    drop_last = kwargs.pop("drop_last", False)
+    collate_fn = kwargs.pop("collate_fn", None)
+    if collate_fn is None:
+        collate_fn = default_collate
+    kwargs.pop("batch_size", None)
+
+    batch_sampler = GroupBalancedBatchSampler(
+        [len(d) for d in datasets],
+        batch_sizes,
+        oversample,
+        num_batches,
+        shuffle=shuffle,
+        drop_last=drop_last,
+        replacement=replacement,
+        generator=kwargs.get("generator", None),
+    )
+    loader = DataLoader(
+        _GroupsDataset(datasets, index_maps),
+        batch_sampler=batch_sampler,
+        collate_fn=_GroupBalancedCollate(collate_fn, collate_mbatches),
+        **kwargs
+    )
+    return loader, batch_sampler
+
+
+def _num_batches(length: int, batch_size: int, drop_last: bool) -> int:
+    """Returns the number of mini-batches needed to iterate over a dataset
+    once."""
+    if drop_last:
+        return length // batch_size
+    return (length + batch_size - 1) // batch_size
+
+
+def _split_batch_size(batch_size: int, num_groups: int) -> List[int]:
+    """Divides a mini-batch between groups, giving the remaining patterns
+    to the first groups."""
+    group_batch_size = batch_size // num_groups
+    remaining = batch_size % num_groups
+    return [
+        group_batch_size + (1 if group < remaining else 0)
+        for group in range(num_groups)
+    ]
+
+
+def _concat_index_maps(datasets: Sequence[Dataset]) -> List[range]:
+    """Maps the patterns of each dataset to their index in the
+    concatenation of the datasets."""
+    index_maps = []
+    start = 0
+    for dataset in datasets:
+        index_maps.append(range(start, start + len(dataset)))
+        start += len(dataset)
+    return index_maps
+
+
+class _IndexedLoaderMixin:
+    """Adds the `return_indices` switch to the data loaders based on
+    :func:`_group_balanced_loader`.
+
+    The class must set `dataloader` and `_index_maps`.
+    """
+
+    @property
+    def return_indices(self) -> bool:
+        """If True, each mini-batch contains the indices of its patterns,
+        inserted before the task labels (that is, mini-batches have the form
+        <x, y, ..., indices, t>). Can be changed before iterating on the
+        loader."""
+        return self.dataloader.dataset.index_maps is not None
+
+    @return_indices.setter
+    def return_indices(self, value: bool):
+        self.dataloader.dataset.index_maps = (
+            self._index_maps if value else None
+        )
+
+
 class TaskBalancedDataLoader:
     """Task-balanced data loader for Avalanche's datasets."""
 
@@ -48,6 +325,7 @@ class TaskBalancedDataLoader:
         data: AvalancheDataset,
         oversample_small_tasks: bool = False,
         collate_mbatches=_default_collate_mbatches_fn,
+        return_indices: bool = False,
         **kwargs
     ):
         """Task-balanced data loader for Avalanche's datasets.
@@ -67,11 +345,12 @@ class TaskBalancedDataLoader:
         :param collate_mbatches: function that given a sequence of mini-batches
             (one for each task) combines them into a single mini-batch. Used to
             combine the mini-batches obtained separately from each task.
-        :param kwargs: data loader arguments used to instantiate the loader for
-            each task separately. See pytorch :class:`DataLoader`.
+        :param return_indices: if True, each mini-batch contains the indices
+            of its patterns in `data`, inserted before the task labels.
+        :param kwargs: data loader arguments used to instantiate the loader.
+            See pytorch :class:`DataLoader`.
         """
         self.data = data
-        self.dataloaders: Dict[int, DataLoader] = {}
         self.oversample_small_tasks = oversample_small_tasks
         self.collate_mbatches = collate_mbatches
 
@@ -90,16 +369,31 @@ class TaskBalancedDataLoader:
         kwargs["oversample_small_groups"] = oversample_small_tasks
         kwargs["collate_mbatches"] = collate_mbatches
         self._dl = GroupBalancedDataLoader(datasets=task_datasets, **kwargs)
+        self._dl._index_maps = [
+            self.data.tasks_pattern_indices[task_label]
+            for task_label in self.data.task_set
+        ]
+        self.return_indices = return_indices
+
+    @property
+    def return_indices(self) -> bool:
+        """If True, each mini-batch contains the indices of its patterns in
+        `data`, inserted before the task labels. Can be changed before
+        iterating on the loader."""
+        return self._dl.return_indices
+
+    @return_indices.setter
+    def return_indices(self, value: bool):
+        self._dl.return_indices = value
 
     def __iter__(self):
-        for el in self._dl.__iter__():
-            yield el
+        return iter(self._dl)
 
     def __len__(self):
         return self._dl.__len__()
 
 
-class GroupBalancedDataLoader:
+class GroupBalancedDataLoader(_IndexedLoaderMixin):
     """Data loader that balances data from multiple datasets."""
 
     def __init__(
@@ -108,6 +402,7 @@ class GroupBalancedDataLoader:
         oversample_small_groups: bool = False,
         collate_mbatches=_default_collate_mbatches_fn,
         batch_size: int = 32,
+        return_indices: bool = False,
         **kwargs
     ):
         """Data loader that balances data from multiple datasets.
@@ -120,6 +415,11 @@ class GroupBalancedDataLoader:
         match the largest group. Otherwise, once data from a group is
         completely iterated, the group will be skipped.
 
+        A single :class:`DataLoader` (and a single pool of workers) is used
+        for all the groups: mini-batches of indices are created by a
+        :class:`GroupBalancedBatchSampler` and the patterns of each group are
+        collated separately before being combined using `collate_mbatches`.
+
         :param datasets: an instance of `AvalancheDataset`.
         :param oversample_small_groups: whether smaller groups should be
             oversampled to match the largest one.
@@ -128,11 +428,14 @@ class GroupBalancedDataLoader:
             combine the mini-batches obtained separately from each task.
         :param batch_size: the size of the batch. It must be greater than or
             equal to the number of groups.
-        :param kwargs: data loader arguments used to instantiate the loader for
-            each group separately. See pytorch :class:`DataLoader`.
+        :param return_indices: if True, each mini-batch contains the indices
+            of its patterns in the concatenation of `datasets`, inserted
+            before the task labels.
+        :param kwargs: data loader arguments used to instantiate the loader.
+            `shuffle`, `drop_last` and `collate_fn` are applied to each group
+            separately. See pytorch :class:`DataLoader`.
         """
         self.datasets = datasets
-        self.dataloaders = []
         self.oversample_small_groups = oversample_small_groups
         self.collate_mbatches = collate_mbatches
 
@@ -140,50 +443,26 @@ class GroupBalancedDataLoader:
         assert batch_size >= len(datasets)
 
         # divide the batch between all datasets in the group
-        ds_batch_size = batch_size // len(datasets)
-        remaining = batch_size % len(datasets)
-
-        for data in self.datasets:
-            bs = ds_batch_size
-            if remaining > 0:
-                bs += 1
-                remaining -= 1
-            self.dataloaders.append(DataLoader(data, batch_size=bs, **kwargs))
-        self.max_len = max([len(d) for d in self.dataloaders])
+        batch_sizes = _split_batch_size(batch_size, len(datasets))
+        drop_last = kwargs.get("drop_last", False)
+        self.max_len = max(
+            _num_batches(len(data), bs, drop_last)
+            for data, bs in zip(self.datasets, batch_sizes)
+        )
+
+        self._index_maps = _concat_index_maps(self.datasets)
+        self.dataloader, self.batch_sampler = _group_balanced_loader(
+            self.datasets,
+            batch_sizes,
+            [oversample_small_groups] * len(self.datasets),
+            self.max_len,
+            collate_mbatches,
+            index_maps=self._index_maps if return_indices else None,
+            **kwargs
+        )
 
     def __iter__(self):
-        iter_dataloaders = []
-        for dl in self.dataloaders:
-            iter_dataloaders.append(iter(dl))
-
-        max_num_mbatches = max([len(d) for d in iter_dataloaders])
-        for it in range(max_num_mbatches):
-            mb_curr = []
-            is_removed_dataloader = False
-            # copy() is necessary because we may remove keys from the
-            # dictionary. This would break the generator.
-            for tid, t_loader in enumerate(iter_dataloaders):
-                try:
-                    batch = next(t_loader)
-                except StopIteration:
-                    # StopIteration is thrown if dataset ends.
-                    if self.oversample_small_groups:
-                        # reinitialize data loader
-                        iter_dataloaders[tid] = iter(self.dataloaders[tid])
-                        batch = next(iter_dataloaders[tid])
-                    else:
-                        # We iteratated over all the data from this group
-                        # and we don't need the iterator anymore.
-                        iter_dataloaders[tid] = None
-                        is_removed_dataloader = True
-                        continue
-                mb_curr.append(batch)
-            yield self.collate_mbatches(mb_curr)
-
-            # clear empty data-loaders
-            if is_removed_dataloader:
-                while None in iter_dataloaders:
-                    iter_dataloaders.remove(None)
+        return iter(self.dataloader)
 
     def __len__(self):
         return self.max_len
@@ -210,38 +489,33 @@ class GroupBalancedInfiniteDataLoader:
         :param collate_mbatches: function that given a sequence of mini-batches
             (one for each task) combines them into a single mini-batch. Used to
             combine the mini-batches obtained separately from each task.
-        :param kwargs: data loader arguments used to instantiate the loader for
-            each group separately. See pytorch :class:`DataLoader`.
+        :param kwargs: data loader arguments used to instantiate the loader.
+            `batch_size` is the number of patterns sampled from each group.
+            See pytorch :class:`DataLoader`.
         """
         self.datasets = datasets
-        self.dataloaders = []
         self.collate_mbatches = collate_mbatches
 
-        for data in self.datasets:
-            infinite_sampler = RandomSampler(
-                data, replacement=True, num_samples=10 ** 10
-            )
-            dl = DataLoader(data, sampler=infinite_sampler, **kwargs)
-            self.dataloaders.append(dl)
+        batch_size = kwargs.pop("batch_size", 1)
+        self.dataloader, self.batch_sampler = _group_balanced_loader(
+            self.datasets,
+            [batch_size] * len(self.datasets),
+            [True] * len(self.datasets),
+            None,
+            collate_mbatches,
+            replacement=True,
+            **kwargs
+        )
         self.max_len = 10 ** 10
 
     def __iter__(self):
-        iter_dataloaders = []
-        for dl in self.dataloaders:
-            iter_dataloaders.append(iter(dl))
-
-        while True:
-            mb_curr = []
-            for tid, t_loader in enumerate(iter_dataloaders):
-                batch = next(t_loader)
-                mb_curr.append(batch)
-            yield self.collate_mbatches(mb_curr)
+        return iter(self.dataloader)
 
     def __len__(self):
         return self.max_len
 
 
-class ReplayDataLoader:
+class ReplayDataLoader(_IndexedLoaderMixin):
     """Custom data loader for rehearsal/replay strategies."""
 
     def __init__(self, data: AvalancheDataset, memory: AvalancheDataset = None,
@@ -250,6 +524,7 @@ class ReplayDataLoader:
                  batch_size: int = 32,
                  batch_size_mem: int = 32,
                  task_balanced_dataloader: bool = False,
+                 return_indices: bool = False,
                  **kwargs):
         """ Custom data loader for rehearsal strategies.
 
@@ -262,6 +537,9 @@ class ReplayDataLoader:
         If `oversample_small_tasks == True` smaller tasks are oversampled to
         match the largest task.
 
+        A single :class:`DataLoader` (and a single pool of workers) is used
+        for both the data and the memory.
+
         :param data: AvalancheDataset.
         :param memory: AvalancheDataset.
         :param oversample_small_tasks: whether smaller tasks should be
@@ -277,14 +555,18 @@ class ReplayDataLoader:
         :param task_balanced_dataloader: if true, buffer data loaders will be
             task-balanced, otherwise it creates a single data loader for the
             buffer samples.
-        :param kwargs: data loader arguments used to instantiate the loader for
-            each task separately. See pytorch :class:`DataLoader`.
+        :param return_indices: if True, each mini-batch contains the indices
+            of its patterns, inserted before the task labels. Patterns of
+            `data` keep their index, while the index of the patterns of
+            `memory` is offset by `len(data)`.
+        :param kwargs: data loader arguments used to instantiate the loader.
+            `shuffle`, `drop_last` and `collate_fn` are applied to the data
+            and to each memory group separately. See pytorch
+            :class:`DataLoader`.
         """
 
         self.data = data
         self.memory = memory
-        self.loader_data: Sequence[DataLoader] = {}
-        self.loader_memory: Sequence[DataLoader] = {}
         self.oversample_small_tasks = oversample_small_tasks
         self.collate_mbatches = collate_mbatches
 
@@ -295,101 +577,57 @@ class ReplayDataLoader:
                 "to the number of tasks in the memory " \
                 "and current data."
 
-        # Create dataloader for data items
-        self.loader_data, _ = self._create_dataloaders(
-            data, batch_size, 0, False, **kwargs)
-
-        # Create dataloader for memory items
+        # Groups of memory items
         if task_balanced_dataloader:
-            single_group_batch_size = batch_size_mem // num_keys
-            remaining_example = batch_size_mem % num_keys
+            memory_datasets = [
+                memory.task_set[task_id] for task_id in memory.task_set
+            ]
+            memory_batch_sizes = _split_batch_size(batch_size_mem, num_keys)
+            memory_index_maps = [
+                [
+                    len(data) + idx
+                    for idx in memory.tasks_pattern_indices[task_id]
+                ]
+                for task_id in memory.task_set
+            ]
         else:
-            single_group_batch_size = batch_size_mem
-            remaining_example = 0
-
-        self.loader_memory, remaining_example = self._create_dataloaders(
-            memory, single_group_batch_size, remaining_example,
-            task_balanced_dataloader, **kwargs)
-
-        self.max_len = max([len(d) for d in chain(
-            self.loader_data.values(), self.loader_memory.values())]
-                           )
+            memory_datasets = [memory]
+            memory_batch_sizes = [batch_size_mem]
+            memory_index_maps = [range(len(data), len(data) + len(memory))]
+
+        datasets = [data] + memory_datasets
+        batch_sizes = [batch_size] + memory_batch_sizes
+        oversample = [False] + [oversample_small_tasks] * len(memory_datasets)
+        drop_last = kwargs.get("drop_last", False)
+        num_batches = [
+            _num_batches(len(d), bs, drop_last)
+            for d, bs in zip(datasets, batch_sizes)
+        ]
+        self.max_len = max(num_batches)
+
+        # An epoch ends when the current data has been iterated
+        self._index_maps = [range(len(data))] + memory_index_maps
+        self.dataloader, self.batch_sampler = _group_balanced_loader(
+            datasets,
+            batch_sizes,
+            oversample,
+            num_batches[0],
+            collate_mbatches,
+            index_maps=self._index_maps if return_indices else None,
+            **kwargs
+        )
 
     def __iter__(self):
-        iter_data_dataloaders = {}
-        iter_buffer_dataloaders = {}
-
-        for t in self.loader_data.keys():
-            iter_data_dataloaders[t] = iter(self.loader_data[t])
-        for t in self.loader_memory.keys():
-            iter_buffer_dataloaders[t] = iter(self.loader_memory[t])
-
-        max_len = max([len(d) for d in iter_data_dataloaders.values()])
-
-        try:
-            for it in range(max_len):
-                mb_curr = []
-                self._get_mini_batch_from_data_dict(
-                    self.data, iter_data_dataloaders,
-                    self.loader_data, False,
-                    mb_curr)
-
-                self._get_mini_batch_from_data_dict(
-                    self.memory, iter_buffer_dataloaders,
-                    self.loader_memory, self.oversample_small_tasks,
-                    mb_curr)
-
-                yield self.collate_mbatches(mb_curr)
-        except StopIteration:
-            return
+        return iter(self.dataloader)
 
     def __len__(self):
         return self.max_len
 
-    def _get_mini_batch_from_data_dict(self, data, iter_dataloaders,
-                                       loaders_dict, oversample_small_tasks,
-                                       mb_curr):
-        # list() is necessary because we may remove keys from the
-        # dictionary. This would break the generator.
-        for t in list(iter_dataloaders.keys()):
-            t_loader = iter_dataloaders[t]
-            try:
-                tbatch = next(t_loader)
-            except StopIteration:
-                # StopIteration is thrown if dataset ends.
-                # reinitialize data loader
-                if oversample_small_tasks:
-                    # reinitialize data loader
-                    iter_dataloaders[t] = iter(loaders_dict[t])
-                    tbatch = next(iter_dataloaders[t])
-                else:
-                    del iter_dataloaders[t]
-                    continue
-            mb_curr.append(tbatch)
-
-    def _create_dataloaders(self, data_dict, single_exp_batch_size,
-                            remaining_example, task_balanced_dataloader,
-                            **kwargs):
-        loaders_dict: Dict[int, DataLoader] = {}
-        if task_balanced_dataloader:
-            for task_id in data_dict.task_set:
-                data = data_dict.task_set[task_id]
-                current_batch_size = single_exp_batch_size
-                if remaining_example > 0:
-                    current_batch_size += 1
-                    remaining_example -= 1
-                loaders_dict[task_id] = DataLoader(
-                    data, batch_size=current_batch_size, **kwargs)
-        else:
-            loaders_dict[0] = DataLoader(
-                data_dict, batch_size=single_exp_batch_size, **kwargs)
-
-        return loaders_dict, remaining_example
-
 
 __all__ = [
     "TaskBalancedDataLoader",
     "GroupBalancedDataLoader",
     "ReplayDataLoader",
     "GroupBalancedInfiniteDataLoader",
+    "GroupBalancedBatchSampler",
 ]
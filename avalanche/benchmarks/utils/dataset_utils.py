@@ -9,8 +9,12 @@
 # Website: avalanche.continualai.org                                           #
 ################################################################################
 import bisect
+import operator
 
-from torch.utils.data import Subset, ConcatDataset
+import numpy as np
+import torch
+from torch import Tensor
+from torch.utils.data import Subset, ConcatDataset, TensorDataset
 
 from .dataset_definitions import (
     IDatasetWithTargets,
@@ -31,6 +35,7 @@ try:
         Tuple,
         Callable,
         Generic,
+        Dict,
     )
 except ImportError:
     from typing import (
@@ -45,6 +50,7 @@ except ImportError:
         Tuple,
         Callable,
         Generic,
+        Dict,
     )
     from typing_extensions import Protocol
 
@@ -215,6 +221,466 @@ class ConstantSequence(Sequence[int]):
         )
 
 
+class ArraySequence(Sequence[int]):
+    """
+    A sequence of int values backed by a NumPy int64 array.
+
+    This is the compact representation used to store the targets and task
+    labels of AvalancheDatasets. Elements are returned as Python ints, just
+    like a list. Slicing and indexing with a sequence of indices return a new
+    :class:`ArraySequence`.
+
+    The underlying array can be obtained without copies using
+    :meth:`numpy` and :meth:`tensor`.
+
+    Like the lists it replaces, an :class:`ArraySequence` is not hashable:
+    it is compared by value and its values can be changed through the
+    underlying array.
+    """
+
+    __hash__ = None
+
+    def __init__(self, values: Union[Sequence[int], np.ndarray, Tensor]):
+        if isinstance(values, Tensor):
+            values = values.detach().cpu().numpy()
+        self._values: np.ndarray = np.asarray(values, dtype=np.int64).reshape(
+            -1
+        )
+        self._shared_values: Optional[Tensor] = None
+
+    def share_memory(self) -> "ArraySequence":
+        """
+        Moves the values to shared memory (in place).
+
+        When sent to other processes using the PyTorch multiprocessing
+        pickler (as done for the workers of a DataLoader), only a handle to
+        the shared memory is transferred.
+
+        :return: This sequence.
+        """
+        if self._shared_values is None:
+            self._values, self._shared_values = share_array(self._values)
+        return self
+
+    def __getstate__(self):
+        if self._shared_values is not None:
+            return {"shared_values": self._shared_values}
+        return {"values": self._values}
+
+    def __setstate__(self, state):
+        self._shared_values = state.get("shared_values")
+        if self._shared_values is not None:
+            self._values = self._shared_values.numpy()
+        else:
+            self._values = state["values"]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, item_idx) -> Union[int, "ArraySequence"]:
+        if isinstance(item_idx, slice):
+            return ArraySequence(self._values[item_idx])
+
+        try:
+            item_idx = operator.index(item_idx)
+        except TypeError:
+            mask = _as_bool_mask(item_idx)
+            if mask is not None:
+                return ArraySequence(self._values[mask])
+            return ArraySequence(self._values[_as_int64_array(item_idx)])
+
+        return int(self._values[item_idx])
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, ArraySequence):
+            return np.array_equal(self._values, other._values)
+        if isinstance(other, (list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self._values
+        return self._values.astype(dtype, copy=False)
+
+    def numpy(self) -> np.ndarray:
+        """
+        Returns the underlying NumPy array (no copy is made).
+        """
+        return self._values
+
+    def tensor(self) -> Tensor:
+        """
+        Returns a PyTorch tensor sharing the memory of the underlying array.
+        """
+        return torch.from_numpy(self._values)
+
+    def tolist(self) -> List[int]:
+        return self._values.tolist()
+
+    def __str__(self):
+        return "[" + ", ".join([str(x) for x in self]) + "]"
+
+
+def as_int_array(sequence) -> Optional[np.ndarray]:
+    """
+    Converts a sequence of int values to a NumPy int64 array.
+
+    Lazy sequences (see :class:`SubSequence`, :class:`LazyClassMapping`,
+    :class:`LazyConcatTargets`, ...) are converted using vectorized gathers,
+    lookups and concatenations on the arrays of the sequences they are built
+    on, without iterating over their elements.
+
+    :param sequence: The sequence to convert.
+    :return: The int64 array or None if the sequence can't be converted (for
+        instance, because it doesn't contain int values).
+    """
+    if isinstance(sequence, ArraySequence):
+        return sequence.numpy()
+
+    if isinstance(sequence, range):
+        return np.arange(
+            sequence.start, sequence.stop, sequence.step, dtype=np.int64
+        )
+
+    if isinstance(sequence, np.ndarray):
+        if sequence.ndim != 1 or sequence.dtype.kind not in "iu":
+            return None
+        return sequence.astype(np.int64, copy=False)
+
+    if isinstance(sequence, Tensor):
+        if sequence.dim() != 1 or sequence.is_floating_point() or \
+                sequence.is_complex() or sequence.dtype == torch.bool:
+            return None
+        return sequence.detach().cpu().numpy().astype(np.int64, copy=False)
+
+    if isinstance(sequence, ConstantSequence):
+        if not _is_int_value(sequence._constant_value):
+            return None
+        return np.full(len(sequence), sequence._constant_value, dtype=np.int64)
+
+    if isinstance(sequence, LazySubsequence):
+        values = as_int_array(sequence._sequence)
+        if values is None:
+            return None
+        return values[sequence._start_idx:sequence._end_idx]
+
+    if isinstance(sequence, SubSequence):
+        if sequence.converter not in (None, int):
+            return None
+
+        values = as_int_array(sequence._targets)
+        if values is not None and sequence._indices is not None:
+            indices = as_int_array(sequence._indices)
+            values = None if indices is None else values[indices]
+
+        if values is not None and isinstance(sequence, LazyClassMapping) \
+                and sequence._mapping is not None:
+            mapping = as_int_array(sequence._mapping)
+            values = None if mapping is None else mapping[values]
+
+        return values
+
+    if isinstance(sequence, LazyConcatTargets):
+        if sequence.converter not in (None, int):
+            return None
+
+        all_values = [as_int_array(t) for t in sequence._targets_list]
+        if any(values is None for values in all_values):
+            return None
+        if len(all_values) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(all_values)
+
+    if isinstance(sequence, (list, tuple)):
+        if len(sequence) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if not _is_int_value(sequence[0]):
+            return None
+
+        try:
+            values = np.asarray(sequence)
+        except (ValueError, TypeError):
+            return None
+        return as_int_array(values)
+
+    return None
+
+
+class DatasetStatistics:
+    """
+    Class and task label statistics of a dataset.
+
+    Statistics are computed once, using vectorized operations, from the int
+    targets and task labels of the dataset. The indices of the patterns of
+    each class (and task) are stored in the CSR format: `class_indices`
+    contains the indices of the patterns sorted by class (the order of
+    patterns of the same class is kept) while `class_offsets` contains the
+    position of the first pattern of each class (plus a final element, which
+    is the number of patterns).
+
+    Class statistics are only available if targets are int values (as in
+    classification datasets). If not, class-related fields are None.
+
+    Consider using the `statistics` field of AvalancheDatasets instead of
+    creating instances of this class directly.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[int],
+        task_labels: Sequence[int],
+        *,
+        class_order: Optional[np.ndarray] = None,
+        task_order: Optional[np.ndarray] = None
+    ):
+        """
+        Creates the statistics given the targets and task labels.
+
+        :param targets: The targets of the patterns.
+        :param task_labels: The task labels of the patterns.
+        :param class_order: If not None, the indices of the patterns stably
+            sorted by class. Defaults to None, which means that it will be
+            computed.
+        :param task_order: If not None, the indices of the patterns stably
+            sorted by task label. Defaults to None, which means that it will
+            be computed.
+        """
+        targets_array = as_int_array(targets)
+        task_labels_array = as_int_array(task_labels)
+        if task_labels_array is None:
+            raise ValueError(
+                "Statistics can only be computed on int task labels"
+            )
+
+        self.targets: Optional[np.ndarray] = targets_array
+        """
+        The targets of the patterns, as an int64 array (None if targets are
+        not int values).
+        """
+
+        self.task_labels: np.ndarray = task_labels_array
+        """
+        The task labels of the patterns, as an int64 array.
+        """
+
+        self.classes: Optional[np.ndarray] = None
+        """
+        The sorted class labels found in the dataset.
+        """
+
+        # The class -> indices mapping (CSR)
+        self.class_offsets: Optional[np.ndarray] = None
+        self.class_indices: Optional[np.ndarray] = None
+
+        self.class_counts: Optional[np.ndarray] = None
+        """
+        The number of patterns of each class (see `classes`).
+        """
+
+        if targets_array is not None:
+            self.classes, self.class_offsets, self.class_indices = _make_csr(
+                targets_array, class_order
+            )
+            self.class_counts = np.diff(self.class_offsets)
+
+        # The sorted task labels found in the dataset and the task -> indices
+        # mapping (CSR)
+        self.tasks, self.task_offsets, self.task_indices = _make_csr(
+            task_labels_array, task_order
+        )
+        self.task_counts: np.ndarray = np.diff(self.task_offsets)
+        """
+        The number of patterns of each task (see `tasks`).
+        """
+
+    @staticmethod
+    def concat(
+        statistics_list: Sequence["DatasetStatistics"],
+    ) -> "DatasetStatistics":
+        """
+        Creates the statistics of the concatenation of multiple datasets
+        given their statistics.
+
+        This is cheaper than computing the statistics from scratch, as the
+        indices of the concatenated datasets are already sorted.
+
+        :param statistics_list: The statistics of the concatenated datasets.
+        :return: The statistics of the concatenation.
+        """
+        offsets = np.cumsum(
+            [0] + [len(stats.task_labels) for stats in statistics_list]
+        )
+        has_targets = all(
+            stats.targets is not None for stats in statistics_list
+        )
+
+        def merged_order(values_name, indices_name):
+            # Each concatenated dataset contributes with a sorted run: stable
+            # sorting is very cheap (and keeps the order of the patterns).
+            sorted_values = np.concatenate(
+                [np.zeros(0, dtype=np.int64)] + [
+                    getattr(stats, values_name)[getattr(stats, indices_name)]
+                    for stats in statistics_list
+                ]
+            )
+            indices = np.concatenate(
+                [np.zeros(0, dtype=np.int64)] + [
+                    getattr(stats, indices_name) + offset
+                    for stats, offset in zip(statistics_list, offsets)
+                ]
+            )
+            return indices[np.argsort(sorted_values, kind="stable")]
+
+        targets = None
+        class_order = None
+        if has_targets:
+            targets = np.concatenate(
+                [np.zeros(0, dtype=np.int64)]
+                + [stats.targets for stats in statistics_list]
+            )
+            class_order = merged_order("targets", "class_indices")
+
+        return DatasetStatistics(
+            targets,
+            np.concatenate(
+                [np.zeros(0, dtype=np.int64)]
+                + [stats.task_labels for stats in statistics_list]
+            ),
+            class_order=class_order,
+            task_order=merged_order("task_labels", "task_indices"),
+        )
+
+    @property
+    def has_class_statistics(self) -> bool:
+        """
+        True if class statistics are available (that is, if targets are int
+        values).
+        """
+        return self.classes is not None
+
+    @property
+    def n_classes(self) -> int:
+        """
+        The number of distinct classes.
+        """
+        return len(self._check_classes())
+
+    @property
+    def min_class(self) -> Optional[int]:
+        """
+        The lowest class label (None if the dataset is empty).
+        """
+        classes = self._check_classes()
+        return int(classes[0]) if len(classes) > 0 else None
+
+    @property
+    def max_class(self) -> Optional[int]:
+        """
+        The highest class label (None if the dataset is empty).
+        """
+        classes = self._check_classes()
+        return int(classes[-1]) if len(classes) > 0 else None
+
+    def class_patterns(self, class_id: int) -> ArraySequence:
+        """
+        Returns the indices of the patterns of the given class.
+
+        :param class_id: The class label.
+        :return: The indices of the patterns (empty if the class is not in
+            the dataset).
+        """
+        return _csr_row(
+            self._check_classes(),
+            self.class_offsets,
+            self.class_indices,
+            class_id,
+        )
+
+    def task_patterns(self, task_label: int) -> ArraySequence:
+        """
+        Returns the indices of the patterns of the given task.
+
+        :param task_label: The task label.
+        :return: The indices of the patterns (empty if the task is not in
+            the dataset).
+        """
+        return _csr_row(
+            self.tasks, self.task_offsets, self.task_indices, task_label
+        )
+
+    def indices_by_class(self) -> Dict[int, ArraySequence]:
+        """
+        Returns the indices of the patterns of each class.
+
+        :return: A dictionary mapping class labels (sorted) to the indices of
+            their patterns.
+        """
+        return _csr_to_dict(
+            self._check_classes(), self.class_offsets, self.class_indices
+        )
+
+    def indices_by_task(self) -> Dict[int, ArraySequence]:
+        """
+        Returns the indices of the patterns of each task.
+
+        :return: A dictionary mapping task labels (sorted) to the indices of
+            their patterns.
+        """
+        return _csr_to_dict(self.tasks, self.task_offsets, self.task_indices)
+
+    def class_counts_dict(self) -> Dict[int, int]:
+        """
+        Returns the number of patterns of each class.
+
+        :return: A dictionary mapping class labels (sorted) to the number of
+            patterns.
+        """
+        return dict(
+            zip(self._check_classes().tolist(), self.class_counts.tolist())
+        )
+
+    def _check_classes(self) -> np.ndarray:
+        if self.classes is None:
+            raise ValueError(
+                "Class statistics are only available for int targets"
+            )
+        return self.classes
+
+
+def _make_csr(values: np.ndarray, order: Optional[np.ndarray] = None):
+    if order is None:
+        order = np.argsort(values, kind="stable")
+    keys, counts = np.unique(values, return_counts=True)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return keys, offsets, order.astype(np.int64, copy=False)
+
+
+def _csr_row(keys, offsets, indices, key) -> ArraySequence:
+    position = int(np.searchsorted(keys, key))
+    if position >= len(keys) or keys[position] != key:
+        return ArraySequence(np.zeros(0, dtype=np.int64))
+    return ArraySequence(indices[offsets[position]:offsets[position + 1]])
+
+
+def _csr_to_dict(keys, offsets, indices) -> Dict[int, ArraySequence]:
+    offsets = offsets.tolist()
+    return {
+        key: ArraySequence(indices[offsets[i]:offsets[i + 1]])
+        for i, key in enumerate(keys.tolist())
+    }
+
+
+def _is_int_value(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(
+        value, (bool, np.bool_)
+    )
+
+
 class SubsetWithTargets(Generic[T_co, TTargetType], Subset[T_co]):
     """
     A Dataset that behaves like a PyTorch :class:`torch.utils.data.Subset`.
@@ -236,6 +702,9 @@ class SubsetWithTargets(Generic[T_co, TTargetType], Subset[T_co]):
     def __getitem__(self, idx):
         return self.dataset[self.indices[idx]]
 
+    def __getitems__(self, indices: List[int]) -> List:
+        return fetch_items(self.dataset, gather_indices(self.indices, indices))
+
     def __len__(self) -> int:
         return len(self.indices)
 
@@ -270,6 +739,18 @@ class ClassificationSubset(SubsetWithTargets[T_co, int]):
 
         return result
 
+    def __getitems__(self, indices: List[int]) -> List:
+        results = super().__getitems__(indices)
+
+        if self.class_mapping is None:
+            return results
+
+        mapping = self.class_mapping
+        return [
+            make_tuple((result[0], mapping[result[1]], *result[2:]), result)
+            for result in results
+        ]
+
 
 class SequenceDataset(IDatasetWithTargets[T_co, TTargetType]):
     """
@@ -313,12 +794,101 @@ class SequenceDataset(IDatasetWithTargets[T_co, TTargetType]):
 
         self.targets: Sequence[TTargetType] = targets
 
+        # Position of the shared arrays -> Tensor owning their memory
+        self._shared_tensors: Dict[int, Tensor] = dict()
+
     def __getitem__(self, idx):
         return tuple(seq[idx] for seq in self._sequences)
 
+    def __getitems__(self, indices: List[int]) -> List:
+        # A single fancy-indexing operation for each sequence, then the
+        # gathered columns are zipped back into patterns.
+        columns = [gather_values(seq, indices) for seq in self._sequences]
+        return list(zip(*columns))
+
     def __len__(self) -> int:
         return len(self._sequences[0])
 
+    def share_memory(self) -> "SequenceDataset":
+        """
+        Moves the Tensors and NumPy arrays of this dataset to shared memory
+        (in place). Other sequences are not affected.
+
+        When sent to other processes using the PyTorch multiprocessing
+        pickler (as done for the workers of a DataLoader), only handles to
+        the shared memory are transferred.
+
+        :return: This dataset.
+        """
+        sequences = list(self._sequences)
+        for seq_idx, sequence in enumerate(self._sequences):
+            if isinstance(sequence, np.ndarray) and \
+                    seq_idx not in self._shared_tensors:
+                try:
+                    shared_array, shared_tensor = share_array(sequence)
+                except TypeError:
+                    # Type not supported by PyTorch
+                    continue
+                sequences[seq_idx] = shared_array
+                self._shared_tensors[seq_idx] = shared_tensor
+                if self.targets is sequence:
+                    self.targets = shared_array
+            else:
+                share_sequence_memory(sequence)
+
+        self._sequences = tuple(sequences)
+        return self
+
+    def __getstate__(self):
+        # Shared arrays are sent as the Tensors owning their memory
+        state = dict(self.__dict__)
+        state["_sequences"] = tuple(
+            self._shared_tensors.get(seq_idx, sequence)
+            for seq_idx, sequence in enumerate(self._sequences)
+        )
+        for seq_idx, sequence in enumerate(self._sequences):
+            if self.targets is sequence:
+                state["targets"] = seq_idx
+        return state
+
+    def __setstate__(self, state):
+        sequences = list(state["_sequences"])
+        for seq_idx in state["_shared_tensors"].keys():
+            sequences[seq_idx] = sequences[seq_idx].numpy()
+        state["_sequences"] = tuple(sequences)
+        if isinstance(state["targets"], int):
+            state["targets"] = sequences[state["targets"]]
+        self.__dict__.update(state)
+
+
+def share_sequence_memory(sequence: Sequence) -> None:
+    """
+    Moves a sequence to shared memory (in place), if possible.
+
+    Only CPU Tensors and :class:`ArraySequence` instances are supported.
+    Other sequences are left untouched.
+
+    :param sequence: The sequence to move.
+    """
+    if isinstance(sequence, Tensor):
+        if not sequence.is_cuda:
+            sequence.share_memory_()
+    elif isinstance(sequence, ArraySequence):
+        sequence.share_memory()
+
+
+def share_array(array: np.ndarray) -> Tuple[np.ndarray, Tensor]:
+    """
+    Copies a NumPy array to shared memory.
+
+    :param array: The array to copy. Must have a type supported by PyTorch.
+    :return: A tuple containing the shared array and the Tensor owning its
+        memory. The Tensor must be kept alive as long as the array is used.
+    """
+    shared_tensor = torch.from_numpy(np.ascontiguousarray(array))
+    shared_tensor = shared_tensor.clone().share_memory_()
+    return shared_tensor.numpy(), shared_tensor
+
 
 def find_list_from_index(
     pattern_idx: int,
@@ -345,8 +915,86 @@ def find_list_from_index(
     return list_idx, pattern_idx
 
 
+def gather_values(sequence: Sequence, indices: List[int]) -> Sequence:
+    """
+    Selects multiple values from a sequence.
+
+    Tensors and ndarrays are gathered using a single fancy-indexing operation.
+    Other sequences are accessed element by element.
+
+    :param sequence: The sequence to gather the values from.
+    :param indices: The list of int indices to select.
+    :return: The selected values. Tensors and ndarrays are returned as a
+        Tensor/ndarray. A list is returned for any other sequence type.
+    """
+    if isinstance(sequence, Tensor):
+        return sequence[torch.as_tensor(indices, dtype=torch.long)]
+    if isinstance(sequence, np.ndarray):
+        return sequence[np.asarray(indices, dtype=np.int64)]
+    return [sequence[idx] for idx in indices]
+
+
+def gather_indices(sequence: Sequence[int], indices: List[int]) -> List[int]:
+    """
+    Selects multiple values from a sequence of indices (such as the indices
+    of a subset) and returns them as a list of ints.
+
+    :param sequence: The sequence of indices.
+    :param indices: The positions to select.
+    :return: The list of selected indices, as Python ints.
+    """
+    if isinstance(sequence, (Tensor, np.ndarray)):
+        return gather_values(sequence, indices).tolist()
+    if isinstance(sequence, ArraySequence):
+        return gather_values(sequence.numpy(), indices).tolist()
+    return [int(sequence[idx]) for idx in indices]
+
+
+def fetch_items(dataset, indices: List[int]) -> List:
+    """
+    Retrieves multiple elements from a dataset.
+
+    If the dataset implements the batched fetching protocol used by PyTorch
+    data loaders (a ``__getitems__`` method), that method is used to obtain
+    all the elements at once. PyTorch Subsets and TensorDatasets are resolved
+    here in a vectorized way, as older PyTorch versions don't implement that
+    protocol. For any other dataset, elements are retrieved one by one.
+
+    :param dataset: The dataset.
+    :param indices: The list of int indices of the elements to retrieve.
+    :return: The list of elements, in the same order of the given indices.
+    """
+    getitems = getattr(dataset, "__getitems__", None)
+    if getitems is not None:
+        return getitems(indices)
+
+    dataset_getitem = type(dataset).__getitem__
+    if isinstance(dataset, Subset) and dataset_getitem is Subset.__getitem__:
+        return fetch_items(
+            dataset.dataset, gather_indices(dataset.indices, indices)
+        )
+
+    if isinstance(dataset, TensorDataset) and \
+            dataset_getitem is TensorDataset.__getitem__:
+        columns = [gather_values(t, indices) for t in dataset.tensors]
+        return list(zip(*columns))
+
+    return [dataset[idx] for idx in indices]
+
+
+def as_index_list(indices) -> List[int]:
+    """
+    Converts a sequence of indices (a list, a Tensor, an ndarray, ...) to a
+    list of Python ints.
+    """
+    if isinstance(indices, (Tensor, np.ndarray, ArraySequence)):
+        return indices.tolist()
+    return [int(idx) for idx in indices]
+
+
 def manage_advanced_indexing(
-    idx, single_element_getter, max_length, collate_fn
+    idx, single_element_getter, max_length, collate_fn,
+    multi_element_getter=None
 ):
     """
     Utility function used to manage the advanced indexing and slicing.
@@ -361,6 +1009,10 @@ def manage_advanced_indexing(
     :param max_length: The maximum sequence length.
     :param collate_fn: The function to use to create a batch of data from
         single elements.
+    :param multi_element_getter: An optional callable used to obtain multiple
+        elements given a list of int indexes. If not None, it will be used
+        in place of `single_element_getter` when more than one element is
+        selected. Defaults to None.
     :return: A tuple consisting of two tensors containing the X and Y values
         of the patterns addressed by the idx parameter.
     """
@@ -377,10 +1029,16 @@ def manage_advanced_indexing(
     else:
         indexes_iterator = idx
 
-    elements = []
-    for single_idx in indexes_iterator:
-        single_element = single_element_getter(int(single_idx))
-        elements.append(single_element)
+    if multi_element_getter is not None:
+        indexes_iterator = as_index_list(indexes_iterator)
+
+    if multi_element_getter is not None and len(indexes_iterator) > 1:
+        elements = multi_element_getter(indexes_iterator)
+    else:
+        elements = []
+        for single_idx in indexes_iterator:
+            single_element = single_element_getter(int(single_idx))
+            elements.append(single_element)
 
     if len(elements) == 1:
         return elements[0]
@@ -415,15 +1073,314 @@ class LazySubsequence(Sequence[int]):
 
 
 def optimize_sequence(sequence: Sequence[TTargetType]) -> Sequence[TTargetType]:
-    if len(sequence) == 0 or isinstance(sequence, ConstantSequence):
+    if len(sequence) == 0 or isinstance(
+        sequence, (ConstantSequence, ArraySequence, range)
+    ):
         return sequence
 
+    # Sequences of int values (class labels, task labels, indices, ...) are
+    # stored in a compact array
+    values = as_int_array(sequence)
+    if values is not None:
+        return ArraySequence(values)
+
     if isinstance(sequence, list):
         return sequence
 
     return list(sequence)
 
 
+class IndexPlanRoute:
+    """
+    A route from the root of a dataset tree to one of its leaf datasets.
+
+    The route contains the leaf dataset and the list of processing steps
+    (transformations, class mappings, ...) found between the leaf and the
+    root of the tree. Steps are listed in the order in which they have to be
+    applied (from the leaf to the root).
+
+    A step is a callable that receives a pattern (as a list of values) and
+    returns the processed pattern. Steps must also expose an `apply_batch`
+    method that does the same for a list of patterns.
+    """
+
+    def __init__(self, dataset, steps: Sequence[Callable] = ()):
+        self.dataset = dataset
+        self.steps = tuple(steps)
+
+    def with_step(self, step: Callable) -> "IndexPlanRoute":
+        return IndexPlanRoute(self.dataset, self.steps + (step,))
+
+    def process(self, element) -> List:
+        # Task labels added by intermediate AvalancheDatasets are always
+        # replaced by the ones of the root dataset, so they can be dropped.
+        if isinstance(element, TupleTLabel):
+            element = element[:-1]
+        element = list(element)
+        for step in self.steps:
+            element = step(element)
+        return element
+
+    def process_batch(self, elements: List) -> List[List]:
+        elements = [
+            list(element[:-1])
+            if isinstance(element, TupleTLabel)
+            else list(element)
+            for element in elements
+        ]
+        for step in self.steps:
+            elements = step.apply_batch(elements)
+        return elements
+
+
+class ClassMappingStep:
+    """
+    Index plan step that applies the class mapping of a
+    :class:`ClassificationSubset`.
+    """
+
+    def __init__(self, class_mapping: Sequence[int]):
+        self.class_mapping = class_mapping
+
+    def __call__(self, element: List) -> List:
+        element[1] = self.class_mapping[element[1]]
+        return element
+
+    def apply_batch(self, elements: List[List]) -> List[List]:
+        mapping = self.class_mapping
+        for element in elements:
+            element[1] = mapping[element[1]]
+        return elements
+
+
+class DatasetIndexPlan:
+    """
+    A flat index plan of a tree of datasets.
+
+    Trees made of subsets and concatenated datasets are flattened into two
+    contiguous int64 arrays: `leaf_ids`, which contains, for each pattern,
+    the id of the route (see :class:`IndexPlanRoute`) to its leaf dataset,
+    and `leaf_indices`, which contains the index of the pattern in that leaf
+    dataset. This allows for retrieving a pattern in constant time,
+    regardless of the depth of the tree.
+
+    The plan can also be used by samplers to inspect where patterns are
+    actually stored (for instance, to group indices by leaf dataset).
+    """
+
+    def __init__(
+        self,
+        leaf_ids: np.ndarray,
+        leaf_indices: np.ndarray,
+        routes: Sequence[IndexPlanRoute],
+    ):
+        self.leaf_ids: np.ndarray = leaf_ids
+        """
+        The id of the route (in `routes`) of each pattern.
+        """
+
+        self.leaf_indices: np.ndarray = leaf_indices
+        """
+        The index of each pattern in its leaf dataset.
+        """
+
+        self.routes: List[IndexPlanRoute] = list(routes)
+        """
+        The routes to the leaf datasets.
+        """
+
+    @staticmethod
+    def build(datasets: Sequence) -> "DatasetIndexPlan":
+        """
+        Creates the plan of the concatenation of the given datasets.
+
+        Subsets (PyTorch and Avalanche ones), concatenations and
+        AvalancheDatasets are traversed recursively. Any other dataset is
+        considered a leaf.
+
+        :param datasets: The list of datasets.
+        :return: The index plan.
+        """
+        routes, leaf_ids, leaf_indices = _concat_plan_nodes(
+            [_make_plan_node(dataset) for dataset in datasets]
+        )
+
+        # Remove routes no longer reachable (excluded by subsets)
+        used_routes, leaf_ids = np.unique(leaf_ids, return_inverse=True)
+        routes = [routes[route_id] for route_id in used_routes.tolist()]
+
+        return DatasetIndexPlan(
+            leaf_ids.reshape(-1).astype(np.int64), leaf_indices, routes
+        )
+
+    def __len__(self):
+        return len(self.leaf_ids)
+
+    @property
+    def leaf_datasets(self) -> List:
+        """
+        The leaf dataset of each route.
+        """
+        return [route.dataset for route in self.routes]
+
+    def get_item(self, idx: int, cache=None) -> List:
+        """
+        Retrieves a pattern from its leaf dataset and applies the steps of its
+        route.
+
+        :param idx: The index of the pattern.
+        :param cache: If not None, the cache (see :class:`SampleCache`) used
+            to store the patterns loaded from leaf datasets. Defaults to None.
+        :return: The pattern, as a list of values (without task label).
+        """
+        route = self.routes[self.leaf_ids[idx]]
+        leaf_idx = int(self.leaf_indices[idx])
+        if cache is None:
+            return route.process(route.dataset[leaf_idx])
+
+        element = cache.get(route.dataset, leaf_idx)
+        if element is None:
+            element = route.dataset[leaf_idx]
+            cache.put(route.dataset, leaf_idx, element)
+        return route.process(element)
+
+    def get_items(self, indices: List[int], cache=None) -> List[List]:
+        """
+        Retrieves multiple patterns at once.
+
+        Patterns are fetched in a batched way, one leaf dataset at a time.
+
+        :param indices: The list of int indices of the patterns.
+        :param cache: If not None, the cache (see :class:`SampleCache`) used
+            to store the patterns loaded from leaf datasets. Defaults to None.
+        :return: The list of patterns, each as a list of values (without task
+            label).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        route_ids = self.leaf_ids[indices]
+        leaf_indices = self.leaf_indices[indices]
+
+        elements = [None] * len(indices)
+        for route_id in np.unique(route_ids).tolist():
+            positions = np.flatnonzero(route_ids == route_id)
+            route = self.routes[route_id]
+            route_elements = route.process_batch(
+                _fetch_leaf_items(
+                    route.dataset, leaf_indices[positions].tolist(), cache
+                )
+            )
+            for position, element in zip(positions.tolist(), route_elements):
+                elements[position] = element
+
+        return elements
+
+
+def _fetch_leaf_items(dataset, indices: List[int], cache) -> List:
+    if cache is None:
+        return fetch_items(dataset, indices)
+
+    elements = [cache.get(dataset, idx) for idx in indices]
+    missing = [i for i, element in enumerate(elements) if element is None]
+    if len(missing) > 0:
+        missing_elements = fetch_items(
+            dataset, [indices[i] for i in missing]
+        )
+        for i, element in zip(missing, missing_elements):
+            cache.put(dataset, indices[i], element)
+            elements[i] = element
+    return elements
+
+
+def _as_bool_mask(indices) -> Optional[np.ndarray]:
+    # Returns the indices as a boolean array if they are a boolean mask
+    if isinstance(indices, Tensor):
+        if indices.dtype != torch.bool:
+            return None
+        return indices.detach().cpu().numpy().reshape(-1)
+    if isinstance(indices, (np.ndarray, list, tuple)):
+        mask = np.asarray(indices)
+        if mask.dtype == bool:
+            return mask.reshape(-1)
+    return None
+
+
+def _as_int64_array(indices) -> np.ndarray:
+    values = as_int_array(indices)
+    if values is None:
+        values = np.asarray(indices, dtype=np.int64).reshape(-1)
+    return values
+
+
+def _make_plan_node(dataset):
+    # Returns (routes, leaf_ids, leaf_indices) for the given dataset
+
+    # AvalancheDatasets describe their node by themselves
+    plan_node = getattr(dataset, "_index_plan_node", None)
+    if plan_node is not None:
+        node = plan_node()
+        if node is not None:
+            children, step = node
+            return _add_plan_step(
+                _concat_plan_nodes([_make_plan_node(c) for c in children]),
+                step,
+            )
+
+    dataset_getitem = type(dataset).__getitem__
+    if isinstance(dataset, Subset) and dataset_getitem in (
+        Subset.__getitem__,
+        SubsetWithTargets.__getitem__,
+        ClassificationSubset.__getitem__,
+    ):
+        routes, leaf_ids, leaf_indices = _make_plan_node(dataset.dataset)
+        subset_indices = _as_int64_array(dataset.indices)
+        step = None
+        if isinstance(dataset, ClassificationSubset) and \
+                dataset.class_mapping is not None:
+            step = ClassMappingStep(dataset.class_mapping)
+
+        return _add_plan_step(
+            (routes, leaf_ids[subset_indices], leaf_indices[subset_indices]),
+            step,
+        )
+
+    if isinstance(dataset, ConcatDataset) and \
+            dataset_getitem is ConcatDataset.__getitem__:
+        return _concat_plan_nodes(
+            [_make_plan_node(c) for c in dataset.datasets]
+        )
+
+    # Leaf dataset
+    dataset_len = len(dataset)
+    return (
+        [IndexPlanRoute(dataset)],
+        np.zeros(dataset_len, dtype=np.int64),
+        np.arange(dataset_len, dtype=np.int64),
+    )
+
+
+def _concat_plan_nodes(nodes):
+    routes = []
+    all_leaf_ids = []
+    all_leaf_indices = []
+    for node_routes, leaf_ids, leaf_indices in nodes:
+        all_leaf_ids.append(leaf_ids + len(routes))
+        all_leaf_indices.append(leaf_indices)
+        routes.extend(node_routes)
+
+    if len(nodes) == 0:
+        return routes, np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+    return routes, np.concatenate(all_leaf_ids), \
+        np.concatenate(all_leaf_indices)
+
+
+def _add_plan_step(node, step):
+    if step is None:
+        return node
+    routes, leaf_ids, leaf_indices = node
+    return [route.with_step(step) for route in routes], leaf_ids, leaf_indices
+
+
 class TupleTLabel(tuple):
     """
     A simple tuple class used to describe a value returned from a dataset
@@ -450,11 +1407,23 @@ __all__ = [
     "LazyConcatTargets",
     "LazyConcatIntTargets",
     "ConstantSequence",
+    "ArraySequence",
+    "as_int_array",
+    "DatasetStatistics",
     "SubsetWithTargets",
     "ClassificationSubset",
     "SequenceDataset",
+    "share_array",
+    "share_sequence_memory",
     "find_list_from_index",
+    "gather_values",
+    "gather_indices",
+    "fetch_items",
+    "as_index_list",
     "manage_advanced_indexing",
     "optimize_sequence",
+    "IndexPlanRoute",
+    "ClassMappingStep",
+    "DatasetIndexPlan",
     "TupleTLabel",
 ]
@@ -0,0 +1,282 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+Datasets whose patterns are stored in memory-mapped files, used by
+:meth:`AvalancheDataset.materialize`.
+"""
+
+import hashlib
+import json
+import os
+import types
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch import Tensor
+from torch.utils.data.dataset import Dataset
+
+
+class MemoryMappedDataset(Dataset):
+    """
+    A dataset whose patterns are stored in a memory-mapped NumPy array.
+
+    The dataset is stored in a directory containing the following files:
+
+    - "data.npy": the patterns, as a single fixed-shape array.
+    - "targets.npy": the targets of the patterns.
+    - "task_labels.npy": the task labels of the patterns.
+    - "metadata.json": the shape, dtype and fingerprint of the stored data.
+
+    Patterns are returned as (x, target) tuples, where x is a Tensor sharing
+    its memory with the memory-mapped file (no copy is made). The mapping
+    is copy-on-write: modifying a pattern won't change the file.
+
+    When the dataset is sent to another process (for instance, to the workers
+    of a DataLoader), only the path of the directory is transferred. Each
+    process maps the file on its own, so that the content of the file is
+    shared through the page cache of the operating system.
+    """
+
+    DATA_FILE = "data.npy"
+    TARGETS_FILE = "targets.npy"
+    TASK_LABELS_FILE = "task_labels.npy"
+    METADATA_FILE = "metadata.json"
+
+    def __init__(self, path: str):
+        """
+        Opens a dataset stored in the given directory.
+
+        :param path: The directory containing the dataset files.
+        """
+        self.path: str = path
+        """
+        The directory containing the dataset files.
+        """
+
+        self._open()
+
+    def _open(self):
+        self.data: np.ndarray = np.load(
+            os.path.join(self.path, MemoryMappedDataset.DATA_FILE),
+            mmap_mode="c",
+        )
+        """
+        The memory-mapped array containing the patterns.
+        """
+
+        self.targets: Tensor = torch.from_numpy(
+            np.load(os.path.join(self.path, MemoryMappedDataset.TARGETS_FILE))
+        )
+        """
+        The targets of the patterns.
+        """
+
+        self.targets_task_labels: Tensor = torch.from_numpy(
+            np.load(
+                os.path.join(self.path, MemoryMappedDataset.TASK_LABELS_FILE)
+            )
+        )
+        """
+        The task labels of the patterns.
+        """
+
+    def __getstate__(self):
+        # Only the path is sent to other processes
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        return torch.from_numpy(self.data[idx]), self.targets[idx]
+
+    def __getitems__(self, indices: List[int]) -> List:
+        indices = np.asarray(indices, dtype=np.int64)
+        data = torch.from_numpy(np.asarray(self.data[indices]))
+        return list(zip(data, self.targets[torch.from_numpy(indices)]))
+
+    @staticmethod
+    def read_metadata(path: str) -> Optional[dict]:
+        """
+        Reads the metadata of the dataset stored in the given directory.
+
+        :param path: The directory containing the dataset files.
+        :return: The metadata or None if the directory doesn't contain a
+            (complete) dataset.
+        """
+        metadata_path = os.path.join(path, MemoryMappedDataset.METADATA_FILE)
+        if not os.path.isfile(metadata_path):
+            return None
+        with open(metadata_path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def write(
+        path: str,
+        batches,
+        length: int,
+        dtype: Optional[np.dtype] = None,
+        fingerprint: str = None,
+    ) -> "MemoryMappedDataset":
+        """
+        Stores a dataset in the given directory.
+
+        Patterns are written one batch at a time, so that the whole dataset
+        never needs to fit in memory. The metadata file is written last: a
+        directory with no metadata file contains an incomplete dataset.
+
+        :param path: The directory in which the dataset files will be stored.
+            Created if it doesn't exist. Existing files are overwritten.
+        :param batches: An iterable of (x, targets, task labels) tuples of
+            Tensors, each one containing a batch of patterns.
+        :param length: The overall number of patterns.
+        :param dtype: The NumPy dtype used to store the patterns. Defaults to
+            None, which means that the dtype of the first batch will be used.
+        :param fingerprint: A string identifying the content of the dataset,
+            stored in the metadata. Defaults to None.
+        :return: The stored dataset.
+        """
+        if length <= 0:
+            raise ValueError("Can't store an empty dataset")
+
+        os.makedirs(path, exist_ok=True)
+        metadata_path = os.path.join(path, MemoryMappedDataset.METADATA_FILE)
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path)
+
+        data = None
+        targets = []
+        task_labels = []
+        offset = 0
+        for batch_x, batch_y, batch_t in batches:
+            batch_x = torch.as_tensor(batch_x).numpy()
+            if data is None:
+                if dtype is None:
+                    dtype = batch_x.dtype
+                data = np.lib.format.open_memmap(
+                    os.path.join(path, MemoryMappedDataset.DATA_FILE),
+                    mode="w+",
+                    dtype=dtype,
+                    shape=(length,) + batch_x.shape[1:],
+                )
+            elif batch_x.shape[1:] != data.shape[1:]:
+                raise ValueError(
+                    "Patterns must have the same shape, found {} and "
+                    "{}".format(data.shape[1:], batch_x.shape[1:])
+                )
+
+            data[offset:offset + len(batch_x)] = batch_x
+            offset += len(batch_x)
+            targets.append(torch.as_tensor(batch_y).numpy())
+            task_labels.append(torch.as_tensor(batch_t).numpy())
+
+        if offset != length:
+            raise ValueError(
+                "Expected {} patterns, found {}".format(length, offset)
+            )
+
+        data.flush()
+        shape = data.shape
+        del data
+        np.save(
+            os.path.join(path, MemoryMappedDataset.TARGETS_FILE),
+            np.concatenate(targets),
+        )
+        np.save(
+            os.path.join(path, MemoryMappedDataset.TASK_LABELS_FILE),
+            np.concatenate(task_labels).astype(np.int64),
+        )
+
+        metadata = {
+            "length": length,
+            "shape": list(shape),
+            "dtype": np.dtype(dtype).str,
+            "fingerprint": fingerprint,
+        }
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f)
+
+        return MemoryMappedDataset(path)
+
+
+def transforms_fingerprint(values: Sequence[Any]) -> str:
+    """
+    Computes a fingerprint of a sequence of values describing a dataset,
+    such as transformations, ints, strings, arrays, ...
+
+    Functions are described by their qualified name, bytecode and closure.
+    Objects not defining a custom `repr` (such as most transformations) are
+    described by their class name and attributes. Other values are described
+    by their `repr`.
+
+    :param values: The values to describe.
+    :return: The hex digest of the fingerprint.
+    """
+    digest = hashlib.sha256()
+    for description in _describe_values(values, _MAX_DESCRIPTION_DEPTH):
+        digest.update(description)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+_MAX_DESCRIPTION_DEPTH = 8
+
+
+def _describe_values(values, depth: int) -> List[bytes]:
+    descriptions = []
+    for value in values:
+        if depth <= 0:
+            descriptions.append(repr(value).encode())
+        elif isinstance(value, (list, tuple)):
+            descriptions.append(b"(")
+            descriptions.extend(_describe_values(value, depth - 1))
+            descriptions.append(b")")
+        elif isinstance(value, dict):
+            descriptions.extend(
+                _describe_values([sorted(value.items(), key=str)], depth - 1)
+            )
+        elif isinstance(value, np.ndarray):
+            descriptions.append(_describe_array(value))
+        elif isinstance(value, Tensor):
+            descriptions.append(_describe_array(value.detach().cpu().numpy()))
+        elif isinstance(value, types.FunctionType):
+            code = value.__code__
+            descriptions.append(
+                "{}.{}:{}".format(
+                    value.__module__, value.__qualname__, code.co_consts
+                ).encode()
+                + code.co_code
+            )
+            closure = [cell.cell_contents for cell in value.__closure__ or ()]
+            descriptions.extend(_describe_values([closure], depth - 1))
+        elif type(value).__repr__ is object.__repr__ and hasattr(
+            value, "__dict__"
+        ):
+            descriptions.append(type(value).__qualname__.encode())
+            descriptions.extend(_describe_values([vars(value)], depth - 1))
+        else:
+            descriptions.append(repr(value).encode())
+    return descriptions
+
+
+def _describe_array(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array)
+    description: Tuple = (array.dtype.str, array.shape)
+    return repr(description).encode() + array.tobytes()
+
+
+__all__ = ["MemoryMappedDataset", "transforms_fingerprint"]
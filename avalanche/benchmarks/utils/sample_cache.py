@@ -0,0 +1,232 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+In-memory cache of dataset patterns, used by
+:meth:`AvalancheDataset.with_cache`.
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from PIL.Image import Image
+from torch import Tensor
+
+
+class SampleCache:
+    """
+    A byte-budgeted, in-memory cache of dataset patterns.
+
+    Patterns are identified by the dataset they are loaded from and their
+    index in that dataset. When the size of the cached patterns exceeds the
+    byte budget, patterns are evicted using one of the following policies:
+
+    - "lru": the least recently used pattern is evicted first.
+    - "clock": the CLOCK (second chance) approximation of LRU. Cache hits
+      only set a reference bit, which makes them cheaper than in the LRU
+      policy.
+
+    The size of patterns is estimated from the size of their tensors, arrays,
+    images, bytes, ... Patterns must not be modified in place by the code
+    using them (for instance, by in-place transformations).
+
+    When a cache is sent to another process (for instance, to the workers of
+    a DataLoader), its content is not transferred: each process starts with
+    an empty cache and keeps its own patterns and counters. Consider using
+    `persistent_workers=True` in order to keep the worker caches between
+    epochs.
+    """
+
+    POLICIES = ("lru", "clock")
+
+    def __init__(self, max_bytes: int, policy: str = "lru"):
+        """
+        Creates a cache.
+
+        :param max_bytes: The maximum size of the cached patterns, in bytes.
+        :param policy: The eviction policy, "lru" or "clock". Defaults to
+            "lru".
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be a non-negative value")
+        if policy not in SampleCache.POLICIES:
+            raise ValueError(
+                "Invalid cache policy {}. Valid policies: {}".format(
+                    policy, SampleCache.POLICIES
+                )
+            )
+
+        self.max_bytes: int = max_bytes
+        """
+        The maximum size of the cached patterns, in bytes.
+        """
+
+        self.policy: str = policy
+        """
+        The eviction policy.
+        """
+
+        self._reset()
+
+    def _reset(self):
+        # key -> [pattern, size, referenced]
+        self._entries: Dict[Hashable, List] = OrderedDict()
+        self._datasets: List[Any] = []
+        self._dataset_ids: Dict[int, int] = dict()
+
+        self.current_bytes: int = 0
+        """
+        The size of the cached patterns, in bytes.
+        """
+
+        self.hits: int = 0
+        """
+        The number of patterns found in the cache.
+        """
+
+        self.misses: int = 0
+        """
+        The number of patterns not found in the cache.
+        """
+
+        self.evictions: int = 0
+        """
+        The number of patterns evicted from the cache.
+        """
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # The content of the cache is not sent to other processes
+        return {"max_bytes": self.max_bytes, "policy": self.policy}
+
+    def __setstate__(self, state):
+        self.max_bytes = state["max_bytes"]
+        self.policy = state["policy"]
+        self._reset()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The ratio of the patterns found in the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def get(self, dataset, index: int) -> Optional[Any]:
+        """
+        Retrieves a pattern from the cache.
+
+        :param dataset: The dataset the pattern is loaded from.
+        :param index: The index of the pattern in the dataset.
+        :return: The pattern or None if it isn't in the cache.
+        """
+        key = self._make_key(dataset, index)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+        else:
+            entry[2] = True
+        return entry[0]
+
+    def put(self, dataset, index: int, pattern: Any) -> bool:
+        """
+        Stores a pattern in the cache, evicting other patterns if needed.
+
+        :param dataset: The dataset the pattern is loaded from.
+        :param index: The index of the pattern in the dataset.
+        :param pattern: The pattern.
+        :return: True if the pattern has been stored, False if it's bigger
+            than the cache.
+        """
+        size = estimate_size(pattern)
+        if size > self.max_bytes:
+            return False
+
+        key = self._make_key(dataset, index)
+        previous_entry = self._entries.pop(key, None)
+        if previous_entry is not None:
+            self.current_bytes -= previous_entry[1]
+
+        while self.current_bytes + size > self.max_bytes:
+            self._evict()
+
+        self._entries[key] = [pattern, size, False]
+        self.current_bytes += size
+        return True
+
+    def clear(self):
+        """
+        Removes all the patterns from the cache and resets the counters.
+        """
+        self._reset()
+
+    def _evict(self):
+        while True:
+            key, entry = self._entries.popitem(last=False)
+            if self.policy == "clock" and entry[2]:
+                # Second chance
+                entry[2] = False
+                self._entries[key] = entry
+                continue
+
+            self.current_bytes -= entry[1]
+            self.evictions += 1
+            return
+
+    def _make_key(self, dataset, index: int) -> Tuple[int, int]:
+        dataset_id = self._dataset_ids.get(id(dataset))
+        if dataset_id is None:
+            # Keeping a reference to the dataset guarantees that its id won't
+            # be reused by other objects
+            dataset_id = len(self._datasets)
+            self._datasets.append(dataset)
+            self._dataset_ids[id(dataset)] = dataset_id
+        return dataset_id, int(index)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimates the size (in bytes) of a value.
+
+    Tensors, NumPy arrays, PIL images, bytes and strings are measured using
+    the size of their data. Tuples, lists and dictionaries are measured
+    recursively. Other values are measured using `sys.getsizeof`.
+
+    :param value: The value.
+    :return: The estimated size, in bytes.
+    """
+    if isinstance(value, Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+__all__ = ["SampleCache", "estimate_size"]
@@ -12,10 +12,10 @@ from dataclasses import dataclass
 from typing import List, Optional, TYPE_CHECKING, Tuple, Union
 
 from PIL.Image import Image
-from matplotlib.figure import Figure
 from torch import Tensor
 
 if TYPE_CHECKING:
+    from matplotlib.figure import Figure
     from .metric_definitions import Metric
 
 MetricResult = Optional[List["MetricValue"]]
@@ -29,7 +29,7 @@ class TensorImage:
         return self.image.numpy()
 
 
-MetricType = Union[float, int, str, Tensor, Image, TensorImage, Figure]
+MetricType = Union[float, int, str, Tensor, Image, TensorImage, "Figure"]
 
 
 class AlternativeValues:
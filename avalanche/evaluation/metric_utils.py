@@ -11,13 +11,12 @@
 
 from typing import Dict, Union, Iterable, Sequence, Tuple, TYPE_CHECKING, List
 
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib.axes import Axes
 from numpy import ndarray, arange
 from torch import Tensor
 
 if TYPE_CHECKING:
+    from matplotlib.axes import Axes
     from avalanche.training.templates.supervised import SupervisedTemplate
     from avalanche.benchmarks.scenarios import Experience
     from avalanche.evaluation import PluginMetric
@@ -63,6 +62,8 @@ def default_cm_image_creator(
     :return: The Confusion Matrix as a PIL Image.
     """
 
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
 
     cm = confusion_matrix_tensor.numpy()
@@ -148,6 +149,8 @@ def repartition_pie_chart_image_creator(
     :param colors: The colors to use in the chart.
     :param fmt: Formatting used to display the text values in the chart.
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     ax: Axes
 
@@ -173,6 +176,8 @@ def repartition_bar_chart_image_creator(
     :param counters: (unused) The steps the counts were taken at.
     :param colors: The colors to use in the chart.
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     ax: Axes
 
@@ -207,6 +212,8 @@ def default_history_repartition_image_creator(
     :param counters: The steps the counts were taken at.
     :param colors: The colors to use in the chart.
     """
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots()
     ax: Axes
 
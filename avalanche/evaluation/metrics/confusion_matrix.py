@@ -20,7 +20,6 @@ from typing import (
     Sequence,
 )
 
-import wandb
 import numpy as np
 import torch
 from PIL.Image import Image
@@ -440,6 +439,8 @@ class WandBStreamConfusionMatrix(PluginMetric):
         )
         plot_x_position = strategy.clock.train_iterations
 
+        import wandb
+
         # compute predicted classes
         preds = torch.argmax(outputs, dim=1).cpu().numpy()
         result = wandb.plot.confusion_matrix(
@@ -10,8 +10,6 @@ from typing import (
     Counter,
 )
 
-from matplotlib.figure import Figure
-
 from avalanche.evaluation import GenericPluginMetric, Metric, PluginMetric
 from avalanche.evaluation.metric_results import MetricValue, AlternativeValues
 from avalanche.evaluation.metric_utils import (
@@ -26,6 +24,7 @@ except ImportError:
 
 
 if TYPE_CHECKING:
+    from matplotlib.figure import Figure
     from avalanche.training.templates.supervised import SupervisedTemplate
     from avalanche.evaluation.metric_results import MetricResult
 
@@ -70,11 +69,11 @@ class LabelsRepartition(Metric):
 
 
 LabelsRepartitionImageCreator = Callable[
-    [Dict[int, List[int]], List[int]], Figure
+    [Dict[int, List[int]], List[int]], "Figure"
 ]
 
 
-class LabelsRepartitionPlugin(GenericPluginMetric[Figure]):
+class LabelsRepartitionPlugin(GenericPluginMetric["Figure"]):
     """
     A plugin to monitor the labels repartition.
 
@@ -14,9 +14,6 @@ from collections import defaultdict
 from typing import Callable, Dict, Set, TYPE_CHECKING, List, Optional
 
 import torch
-from matplotlib.axes import Axes
-from matplotlib.figure import Figure
-from matplotlib.pyplot import subplots
 from torch import Tensor, arange
 
 from avalanche.evaluation import Metric, PluginMetric
@@ -32,6 +29,8 @@ except ImportError:
     from typing_extensions import Literal
 
 if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
     from avalanche.training.templates.supervised import SupervisedTemplate
     from avalanche.evaluation.metric_results import MetricResult
 
@@ -110,7 +109,7 @@ class MeanNewOldScores(MeanScores):
 
 def default_mean_scores_image_creator(
     label2step2mean_scores: Dict[LabelCat, Dict[int, float]]
-) -> Figure:
+) -> "Figure":
     """
     Default function to create an image of the evolution of the scores of the
         true class, averaged by new and old classes.
@@ -120,6 +119,8 @@ def default_mean_scores_image_creator(
         step of the observation.
     :return: The figure containing the graphs.
     """
+    from matplotlib.pyplot import subplots
+
     fig, ax = subplots()
     ax: Axes
 
@@ -143,7 +144,7 @@ def default_mean_scores_image_creator(
     return fig
 
 
-MeanScoresImageCreator = Callable[[Dict[LabelCat, Dict[int, int]]], Figure]
+MeanScoresImageCreator = Callable[[Dict[LabelCat, Dict[int, int]]], "Figure"]
 
 
 class MeanScoresPluginMetricABC(PluginMetric, ABC):
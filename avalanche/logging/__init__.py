@@ -1,6 +1,28 @@
-from .base_logger import *
-from .tensorboard_logger import *
-from .wandb_logger import *
-from .text_logging import TextLogger
-from .interactive_logging import InteractiveLogger
-from .csv_logger import CSVLogger
+import importlib
+
+# Loggers are imported on first access (PEP 562), so that the dependencies
+# of the loggers that are not used (such as TensorBoard) are not loaded.
+_LOGGERS = {
+    "BaseLogger": ".base_logger",
+    "TensorboardLogger": ".tensorboard_logger",
+    "WandBLogger": ".wandb_logger",
+    "TextLogger": ".text_logging",
+    "InteractiveLogger": ".interactive_logging",
+    "CSVLogger": ".csv_logger",
+}
+
+
+def __getattr__(name):
+    if name in _LOGGERS:
+        module = importlib.import_module(_LOGGERS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name)
+    )
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LOGGERS))
+
+
+__all__ = list(_LOGGERS)
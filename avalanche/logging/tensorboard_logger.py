@@ -17,8 +17,6 @@ from typing import Union
 
 from PIL.Image import Image
 from torch import Tensor
-from torch.utils.tensorboard import SummaryWriter
-from matplotlib.pyplot import Figure
 from torchvision.transforms.functional import to_tensor
 from avalanche.evaluation.metric_results import AlternativeValues, TensorImage
 from avalanche.logging import BaseLogger
@@ -59,6 +57,9 @@ class TensorboardLogger(BaseLogger):
             tensorboard log file. Default ''.
         """
 
+        # Imported here, as TensorBoard is slow to import
+        from torch.utils.tensorboard import SummaryWriter
+
         super().__init__()
         tb_log_dir = _make_path_if_local(tb_log_dir)
         self.writer = SummaryWriter(tb_log_dir, filename_suffix=filename_suffix)
@@ -70,6 +71,8 @@ class TensorboardLogger(BaseLogger):
         weakref.finalize(self, SummaryWriter.close, self.writer)
 
     def log_single_metric(self, name, value, x_plot):
+        from matplotlib.figure import Figure
+
         if isinstance(value, AlternativeValues):
             value = value.best_supported_value(
                 Image, Tensor, TensorImage, Figure, float, int
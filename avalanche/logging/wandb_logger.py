@@ -22,7 +22,6 @@ import torch
 from torch import Tensor
 
 from PIL.Image import Image
-from matplotlib.pyplot import Figure
 
 from avalanche.core import SupervisedPlugin
 from avalanche.evaluation.metric_results import (
@@ -138,6 +137,8 @@ class WandBLogger(BaseLogger, SupervisedPlugin):
         self.exp_count += 1
 
     def log_single_metric(self, name, value, x_plot):
+        from matplotlib.figure import Figure
+
         self.step = x_plot
 
         if isinstance(value, AlternativeValues):
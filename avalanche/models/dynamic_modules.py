@@ -17,7 +17,6 @@ import torch
 from torch.nn import Module
 
 from avalanche.benchmarks.utils import AvalancheDataset
-from avalanche.benchmarks.utils.dataset_utils import ConstantSequence
 
 
 class DynamicModule(Module):
@@ -114,8 +113,10 @@ class MultiTaskModule(DynamicModule):
         :param dataset: data from the current experience.
         :return:
         """
-        self.max_class_label = max(self.max_class_label,
-                                   max(dataset.targets) + 1)
+        statistics = dataset.statistics
+        if statistics.has_class_statistics:
+            self.max_class_label = max(self.max_class_label,
+                                       statistics.max_class + 1)
         if self.training:
             self.train_adaptation(dataset)
         else:
@@ -126,10 +127,7 @@ class MultiTaskModule(DynamicModule):
 
     def train_adaptation(self, dataset: AvalancheDataset = None):
         """Update known task labels."""
-        task_labels = dataset.targets_task_labels
-        if isinstance(task_labels, ConstantSequence):
-            # task label is unique. Don't check duplicates.
-            task_labels = [task_labels[0]]
+        task_labels = dataset.statistics.tasks.tolist()
         self.known_train_tasks_labels = self.known_train_tasks_labels.union(
             set(task_labels)
         )
@@ -221,7 +219,7 @@ class IncrementalClassifier(DynamicModule):
         in_features = self.classifier.in_features
         old_nclasses = self.classifier.out_features
         new_nclasses = max(
-            self.classifier.out_features, max(dataset.targets) + 1
+            self.classifier.out_features, dataset.statistics.max_class + 1
         )
 
         if old_nclasses == new_nclasses:
@@ -291,12 +289,9 @@ class MultiHeadClassifier(MultiTaskModule):
         :return:
         """
         super().adaptation(dataset)
-        task_labels = dataset.targets_task_labels
-        if isinstance(task_labels, ConstantSequence):
-            # task label is unique. Don't check duplicates.
-            task_labels = [task_labels[0]]
+        task_labels = dataset.statistics.tasks.tolist()
 
-        for tid in set(task_labels):
+        for tid in task_labels:
             tid = str(tid)  # need str keys
             if tid not in self.classifiers:
                 new_head = IncrementalClassifier(
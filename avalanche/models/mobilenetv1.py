@@ -16,12 +16,7 @@ This is the definition od the Mid-caffenet high resolution in Pythorch
 import torch.nn as nn
 import torch
 
-from pytorchcv.models.mobilenet import mobilenet_w1
-
-try:
-    from pytorchcv.models.mobilenet import DwsConvBlock
-except Exception:
-    from pytorchcv.models.common import DwsConvBlock
+# pytorchcv is imported by the functions using it, as it's slow to import
 
 
 def remove_sequential(network, all_layers):
@@ -37,6 +32,10 @@ def remove_sequential(network, all_layers):
 
 
 def remove_DwsConvBlock(cur_layers):
+    try:
+        from pytorchcv.models.mobilenet import DwsConvBlock
+    except Exception:
+        from pytorchcv.models.common import DwsConvBlock
 
     all_layers = []
     for layer in cur_layers:
@@ -54,6 +53,8 @@ class MobilenetV1(nn.Module):
     can be instantiated from a pretrained network."""
 
     def __init__(self, pretrained=True, latent_layer_num=20):
+        from pytorchcv.models.mobilenet import mobilenet_w1
+
         super().__init__()
 
         model = mobilenet_w1(pretrained=pretrained)
@@ -3,7 +3,6 @@ import torch.nn.functional as F
 from torch import nn
 
 from avalanche.benchmarks.utils import AvalancheDataset
-from avalanche.benchmarks.utils.dataset_utils import ConstantSequence
 from avalanche.models import MultiTaskModule, DynamicModule
 from avalanche.models import MultiHeadClassifier
 
@@ -170,12 +169,7 @@ class PNNLayer(MultiTaskModule):
         :return:
         """
         super().train_adaptation(dataset)
-        task_labels = dataset.targets_task_labels
-        if isinstance(task_labels, ConstantSequence):
-            # task label is unique. Don't check duplicates.
-            task_labels = [task_labels[0]]
-        else:
-            task_labels = set(task_labels)
+        task_labels = dataset.statistics.tasks.tolist()
         assert len(task_labels) == 1, (
             "PNN assumes a single task for each experience. Please use a "
             "compatible benchmark."
@@ -8,3 +8,5 @@ can be easily combined with your own strategy.
 from .supervised import *
 from .storage_policy import *
 from .losses import *
+from .teacher_cache import *
+from .exemplar_store import *
@@ -0,0 +1,550 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+Compact storage of the exemplars of rehearsal buffers.
+"""
+
+import io
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from PIL import Image
+from torch import Tensor
+from torch.utils.data import DataLoader, Dataset
+
+from avalanche.benchmarks.utils import (
+    AvalancheDataset,
+    AvalancheSubset,
+    AvalancheConcatDataset,
+)
+from avalanche.benchmarks.utils.dataset_utils import as_int_array
+
+
+class ExemplarCodec(ABC):
+    """Encodes the X values of the exemplars to flat uint8 Tensors.
+
+    Alongside the encoded bytes, the codec returns a (hashable) description
+    of the encoded value, such as its shape and dtype, which is given back
+    to the codec when decoding it.
+    """
+
+    @abstractmethod
+    def encode(self, x: Any) -> Tuple[Tensor, Hashable]:
+        """Encodes a value.
+
+        :param x: the X value of a pattern.
+        :return: the encoded bytes, as a 1-D uint8 Tensor, and the
+            description of the value.
+        """
+        ...
+
+    @abstractmethod
+    def decode(self, data: Tensor, info: Hashable) -> Any:
+        """Decodes a value.
+
+        :param data: the encoded bytes.
+        :param info: the description returned by `encode`.
+        :return: the (possibly approximated) X value.
+        """
+        ...
+
+
+class Uint8Codec(ExemplarCodec):
+    """Stores values as raw uint8 arrays.
+
+    PIL images and uint8 Tensors are stored without any loss. Float Tensors
+    are quantized to 256 levels in the range [low, high] (values outside
+    the range are clipped) and decoded as float32 Tensors.
+    """
+
+    def __init__(self, low: float = 0.0, high: float = 1.0):
+        """
+        :param low: the lowest value of float Tensors.
+        :param high: the highest value of float Tensors.
+        """
+        self.low = low
+        self.high = high
+
+    def encode(self, x):
+        if isinstance(x, Image.Image):
+            array = torch.from_numpy(np.array(x, dtype=np.uint8))
+            return array.reshape(-1), ("pil", x.mode, tuple(array.shape))
+
+        x = torch.as_tensor(x)
+        if x.dtype == torch.uint8:
+            return x.reshape(-1).clone(), ("uint8", tuple(x.shape))
+
+        scale = 255.0 / (self.high - self.low)
+        quantized = ((x.float() - self.low) * scale).round().clamp(0, 255)
+        return (
+            quantized.to(torch.uint8).reshape(-1),
+            ("float", tuple(x.shape)),
+        )
+
+    def decode(self, data, info):
+        kind = info[0]
+        if kind == "pil":
+            image = Image.fromarray(data.view(info[2]).numpy())
+            if image.mode != info[1]:
+                image = image.convert(info[1])
+            return image
+        if kind == "uint8":
+            # a copy, as transformations may modify the value in place
+            return data.view(info[1]).clone()
+        x = data.view(info[1]).float()
+        return x * ((self.high - self.low) / 255.0) + self.low
+
+
+class Float16Codec(ExemplarCodec):
+    """Stores float Tensors with half precision.
+
+    Values are decoded with their original dtype.
+    """
+
+    def encode(self, x):
+        if not isinstance(x, Tensor) or not x.is_floating_point():
+            raise ValueError("Float16Codec can only store float Tensors")
+        half = x.detach().to("cpu", torch.float16).contiguous()
+        return half.reshape(-1).view(torch.uint8), (tuple(x.shape), x.dtype)
+
+    def decode(self, data, info):
+        shape, dtype = info
+        return data.view(torch.float16).view(shape).to(dtype, copy=True)
+
+
+class ImageCodec(ExemplarCodec):
+    """Re-encodes values as compressed images.
+
+    PIL images are decoded as PIL images. Tensors with shape (C, H, W), with
+    1 or 3 channels, are decoded as Tensors with the same dtype. Float
+    Tensors are expected to be in the range [0, 1].
+    """
+
+    def __init__(self, format: str = "JPEG", quality: int = 90):
+        """
+        :param format: the image format used by PIL, such as "JPEG" (lossy)
+            or "PNG" (lossless).
+        :param quality: the quality of the JPEG encoding, from 1 to 95.
+            Ignored by other formats.
+        """
+        self.format = format
+        self.quality = quality
+
+    def encode(self, x):
+        if isinstance(x, Image.Image):
+            image = x
+            info = ("pil", x.mode)
+        else:
+            x = torch.as_tensor(x)
+            info = ("tensor", tuple(x.shape), x.dtype)
+            if x.dtype != torch.uint8:
+                x = (x.float() * 255.0).round().clamp(0, 255)
+                x = x.to(torch.uint8)
+            array = x.permute(1, 2, 0).numpy()
+            if array.shape[2] == 1:
+                array = array[:, :, 0]
+            image = Image.fromarray(array)
+
+        buffer = io.BytesIO()
+        if self.format.upper() == "JPEG":
+            image.save(buffer, format=self.format, quality=self.quality)
+        else:
+            image.save(buffer, format=self.format)
+        data = np.frombuffer(buffer.getvalue(), dtype=np.uint8)
+        return torch.from_numpy(data.copy()), info
+
+    def decode(self, data, info):
+        image = Image.open(io.BytesIO(data.numpy().tobytes()))
+        if info[0] == "pil":
+            return image.convert(info[1])
+
+        shape, dtype = info[1], info[2]
+        x = torch.from_numpy(np.array(image, dtype=np.uint8))
+        x = x.reshape(shape[1], shape[2], shape[0]).permute(2, 0, 1)
+        if dtype == torch.uint8:
+            return x.contiguous()
+        return x.to(dtype) / 255.0
+
+
+CODECS = {
+    "uint8": Uint8Codec,
+    "fp16": Float16Codec,
+    "jpeg": lambda: ImageCodec("JPEG"),
+    "png": lambda: ImageCodec("PNG"),
+}
+"""
+The codecs that can be selected by name.
+"""
+
+
+class CompressedExemplarsDataset(Dataset):
+    """A dataset whose patterns are encoded by a :class:`ExemplarCodec`.
+
+    The encoded patterns are stored in a single flat uint8 Tensor. Patterns
+    are returned as (x, target) tuples, where x is decoded on the fly.
+    """
+
+    def __init__(
+        self,
+        codec: ExemplarCodec,
+        data: Tensor,
+        offsets: Tensor,
+        infos: Sequence[Hashable],
+        info_ids: Tensor,
+        targets: Tensor,
+        task_labels: Tensor,
+    ):
+        """
+        :param codec: the codec used to encode the patterns.
+        :param data: the encoded patterns, concatenated.
+        :param offsets: the start of each pattern in `data`, followed by the
+            length of `data`.
+        :param infos: the distinct descriptions of the encoded values.
+        :param info_ids: the description (in `infos`) of each pattern.
+        :param targets: the targets of the patterns.
+        :param task_labels: the task labels of the patterns.
+        """
+        self.codec = codec
+        self.data = data
+        self.offsets = offsets
+        self.infos = list(infos)
+        self.info_ids = info_ids
+        self.targets = targets
+        self.targets_task_labels = task_labels
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        start, end = self.offsets[idx : idx + 2].tolist()
+        x = self.codec.decode(
+            self.data[start:end], self.infos[self.info_ids[idx]]
+        )
+        return x, self.targets[idx]
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used by the encoded patterns, their targets
+        and their task labels."""
+        return sum(
+            t.numel() * t.element_size()
+            for t in (
+                self.data,
+                self.offsets,
+                self.info_ids,
+                self.targets,
+                self.targets_task_labels,
+            )
+        )
+
+    def select(self, indices: Tensor) -> "CompressedExemplarsDataset":
+        """Returns a new dataset containing the given patterns, without
+        decoding them.
+
+        :param indices: the indices of the patterns.
+        :return: the new dataset.
+        """
+        indices = torch.as_tensor(indices, dtype=torch.long)
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        offsets = torch.zeros(len(indices) + 1, dtype=torch.long)
+        torch.cumsum(lengths, dim=0, out=offsets[1:])
+
+        # The position of each byte of the selected patterns in self.data
+        positions = torch.arange(int(offsets[-1])) + torch.repeat_interleave(
+            starts - offsets[:-1], lengths
+        )
+        return CompressedExemplarsDataset(
+            self.codec,
+            self.data[positions],
+            offsets,
+            self.infos,
+            self.info_ids[indices],
+            self.targets[indices],
+            self.targets_task_labels[indices],
+        )
+
+    @staticmethod
+    def concat(
+        datasets: Sequence["CompressedExemplarsDataset"],
+    ) -> "CompressedExemplarsDataset":
+        """Concatenates datasets encoded by the same codec.
+
+        :param datasets: the datasets.
+        :return: the concatenated dataset.
+        """
+        infos: List[Hashable] = []
+        info_to_id = dict()
+        info_ids = []
+        for dataset in datasets:
+            id_map = []
+            for info in dataset.infos:
+                if info not in info_to_id:
+                    info_to_id[info] = len(infos)
+                    infos.append(info)
+                id_map.append(info_to_id[info])
+            id_map = torch.tensor(id_map, dtype=torch.long)
+            info_ids.append(id_map[dataset.info_ids])
+
+        lengths = torch.cat([d.offsets[1:] - d.offsets[:-1] for d in datasets])
+        offsets = torch.zeros(len(lengths) + 1, dtype=torch.long)
+        torch.cumsum(lengths, dim=0, out=offsets[1:])
+        return CompressedExemplarsDataset(
+            datasets[0].codec,
+            torch.cat([d.data for d in datasets]),
+            offsets,
+            infos,
+            torch.cat(info_ids),
+            torch.cat([d.targets for d in datasets]),
+            torch.cat([d.targets_task_labels for d in datasets]),
+        )
+
+
+class ExemplarStore:
+    """Snapshots the exemplars of rehearsal buffers into a compact storage.
+
+    The frozen transformations of the datasets are applied once and the
+    resulting X values are encoded with the given codec. Stored exemplars
+    are decoded on the fly and the non-frozen transformations are then
+    applied to them as usual. The stored exemplars don't keep references to
+    the original datasets.
+
+    The datasets snapshotted by the same store are expected to share the
+    same non-frozen transformations. Exemplars that are stored already are
+    copied without decoding them, so that lossy codecs don't degrade them
+    any further.
+
+    If a byte budget is given, the balanced buffers using the store
+    (:class:`ExperienceBalancedBuffer`, :class:`ClassBalancedBuffer`,
+    :class:`ParametricBuffer`) are sized so that the stored exemplars,
+    including their targets and task labels, don't exceed it.
+    """
+
+    def __init__(
+        self,
+        codec: Union[str, ExemplarCodec] = "uint8",
+        max_bytes: Optional[int] = None,
+        batch_size: int = 256,
+        num_workers: int = 0,
+    ):
+        """
+        :param codec: the codec used to encode the X values, or its name.
+            One of "uint8", "fp16", "jpeg" and "png" (see :data:`CODECS`).
+            Defaults to "uint8".
+        :param max_bytes: the byte budget of the buffers using the store.
+            Defaults to None, which means that buffers are sized by their
+            number of samples.
+        :param batch_size: the number of patterns loaded at once when
+            snapshotting a dataset.
+        :param num_workers: the number of processes used to load the
+            patterns when snapshotting a dataset.
+        """
+        if isinstance(codec, str):
+            if codec not in CODECS:
+                raise ValueError(
+                    "Unknown codec {}. Must be one of {}".format(
+                        codec, list(CODECS.keys())
+                    )
+                )
+            codec = CODECS[codec]()
+        self.codec: ExemplarCodec = codec
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+
+        self._encoded_bytes = 0
+        self._encoded_patterns = 0
+
+    @property
+    def bytes_per_pattern(self) -> Optional[float]:
+        """The average number of bytes used by a stored pattern (including
+        its target and task label), or None if no pattern has been encoded
+        yet."""
+        if self._encoded_patterns == 0:
+            return None
+        return self._encoded_bytes / self._encoded_patterns + _INDEX_BYTES
+
+    def store(
+        self,
+        datasets: Sequence[AvalancheDataset],
+        dataset_ids: Optional[Tensor] = None,
+        dataset_indices: Optional[Tensor] = None,
+    ) -> AvalancheDataset:
+        """Snapshots patterns taken from the given datasets.
+
+        :param datasets: the datasets.
+        :param dataset_ids: the dataset (in `datasets`) of each pattern.
+            Defaults to None, which means that all the patterns of the
+            datasets are stored.
+        :param dataset_indices: the index of each pattern in its dataset.
+        :return: a dataset containing the patterns, in the given order.
+        """
+        if dataset_ids is None:
+            lengths = torch.tensor([len(d) for d in datasets])
+            dataset_ids = torch.repeat_interleave(
+                torch.arange(len(datasets)), lengths
+            )
+            dataset_indices = torch.cat(
+                [torch.arange(len(d)) for d in datasets]
+            )
+        dataset_ids = torch.as_tensor(dataset_ids, dtype=torch.long)
+        dataset_indices = torch.as_tensor(dataset_indices, dtype=torch.long)
+        if (
+            len(datasets) == 1
+            and ExemplarStore.is_stored(datasets[0])
+            and torch.equal(dataset_indices, torch.arange(len(datasets[0])))
+        ):
+            return datasets[0]
+
+        parts = []
+        part_ids = torch.zeros(len(dataset_ids), dtype=torch.long)
+        part_indices = torch.zeros(len(dataset_ids), dtype=torch.long)
+        template = None
+        for dataset_id, dataset in enumerate(datasets):
+            selected = (dataset_ids == dataset_id).nonzero().view(-1)
+            if len(selected) == 0:
+                continue
+            indices = dataset_indices[selected]
+            if ExemplarStore.is_stored(dataset):
+                part = dataset._dataset.select(indices)
+                if template is None:
+                    template = dataset
+            else:
+                part = self._encode(AvalancheSubset(dataset, indices))
+                template = dataset
+            part_ids[selected] = len(parts)
+            part_indices[selected] = torch.arange(len(selected))
+            parts.append(part)
+
+        if template is None:
+            return AvalancheConcatDataset([])
+
+        # Restore the order of the patterns
+        lengths = torch.tensor([len(part) for part in parts])
+        offsets = torch.cumsum(lengths, dim=0) - lengths
+        stored = CompressedExemplarsDataset.concat(parts).select(
+            offsets[part_ids] + part_indices
+        )
+        return template._with_stored_patterns(
+            stored, stored.targets, stored.targets_task_labels
+        )
+
+    def capacity(self, dataset: AvalancheDataset, n_probes: int = 16) -> int:
+        """Estimates the number of patterns fitting in the byte budget.
+
+        A few patterns of the given dataset are encoded to refine the
+        average size of the stored patterns.
+
+        :param dataset: the dataset whose patterns will be stored.
+        :param n_probes: the number of patterns encoded.
+        :return: the number of patterns.
+        """
+        if len(dataset) > 0 and n_probes > 0:
+            probes = torch.randperm(len(dataset))[:n_probes]
+            if ExemplarStore.is_stored(dataset):
+                self._encode_stats(dataset._dataset.select(probes))
+            else:
+                self._encode(AvalancheSubset(dataset, probes))
+
+        if self.bytes_per_pattern is None:
+            return 0
+        return int(self.max_bytes // math.ceil(self.bytes_per_pattern))
+
+    @staticmethod
+    def is_stored(dataset: Dataset) -> bool:
+        """Returns True if the dataset has been created by
+        :meth:`ExemplarStore.store`."""
+        return type(dataset) is AvalancheDataset and isinstance(
+            dataset._dataset, CompressedExemplarsDataset
+        )
+
+    @staticmethod
+    def nbytes(dataset: Dataset) -> int:
+        """Returns the number of bytes used by a stored dataset (0 for other
+        datasets)."""
+        if not ExemplarStore.is_stored(dataset):
+            return 0
+        return dataset._dataset.nbytes
+
+    @torch.no_grad()
+    def _encode(self, dataset: AvalancheDataset) -> CompressedExemplarsDataset:
+        # Only the frozen transformations are applied
+        loader = DataLoader(
+            dataset.replace_transforms(None, None),
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            collate_fn=_collate_list,
+        )
+
+        chunks, lengths = [], []
+        infos: List[Hashable] = []
+        info_to_id = dict()
+        info_ids = []
+        for batch in loader:
+            for element in batch:
+                data, info = self.codec.encode(element[0])
+                if info not in info_to_id:
+                    info_to_id[info] = len(infos)
+                    infos.append(info)
+                info_ids.append(info_to_id[info])
+                chunks.append(data)
+                lengths.append(len(data))
+
+        offsets = torch.zeros(len(lengths) + 1, dtype=torch.long)
+        torch.cumsum(
+            torch.tensor(lengths, dtype=torch.long), dim=0, out=offsets[1:]
+        )
+        encoded = CompressedExemplarsDataset(
+            self.codec,
+            torch.cat(chunks) if chunks else torch.zeros(0, dtype=torch.uint8),
+            offsets,
+            infos,
+            torch.tensor(info_ids, dtype=torch.long),
+            _as_long_tensor(dataset.targets),
+            _as_long_tensor(dataset.targets_task_labels),
+        )
+        self._encode_stats(encoded)
+        return encoded
+
+    def _encode_stats(self, encoded: CompressedExemplarsDataset):
+        self._encoded_bytes += len(encoded.data)
+        self._encoded_patterns += len(encoded)
+
+
+# The bytes used by the offset, the description, the target and the task
+# label of each stored pattern
+_INDEX_BYTES = 4 * 8
+
+
+def _collate_list(batch):
+    return batch
+
+
+def _as_long_tensor(sequence) -> Tensor:
+    array = as_int_array(sequence)
+    if array is None:
+        return torch.tensor(list(sequence), dtype=torch.long)
+    return torch.from_numpy(array)
+
+
+__all__ = [
+    "ExemplarCodec",
+    "Uint8Codec",
+    "Float16Codec",
+    "ImageCodec",
+    "CODECS",
+    "CompressedExemplarsDataset",
+    "ExemplarStore",
+]
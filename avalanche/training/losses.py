@@ -1,7 +1,9 @@
 import copy
+from typing import Optional
 
 import torch
 from avalanche.core import SupervisedPlugin
+from avalanche.training.teacher_cache import TeacherOutputCache
 from torch.nn import BCELoss
 import numpy as np
 
@@ -17,18 +19,37 @@ class ICaRLLossPlugin(SupervisedPlugin):
         observed again in future training experiences.
     """
 
-    def __init__(self):
+    def __init__(self, teacher_cache: Optional[TeacherOutputCache] = None):
+        """
+        :param teacher_cache: an optional cache used to reuse the logits of
+            the old model in the epochs following the first one of each
+            experience. See :class:`TeacherOutputCache`.
+        """
         super().__init__()
         self.criterion = BCELoss()
+        self.teacher_cache = teacher_cache
 
         self.old_classes = []
         self.old_model = None
         self.old_logits = None
 
+    def before_training_exp(self, strategy, **kwargs):
+        if self.teacher_cache is not None:
+            self.teacher_cache.reset()
+
+    def before_training_epoch(self, strategy, **kwargs):
+        if self.old_model is not None and self.teacher_cache is not None:
+            self.teacher_cache.enable(strategy)
+
     def before_forward(self, strategy, **kwargs):
         if self.old_model is not None:
             with torch.no_grad():
-                self.old_logits = self.old_model(strategy.mb_x)
+                if self.teacher_cache is not None:
+                    self.old_logits = self.teacher_cache.get(
+                        strategy, lambda: self.old_model(strategy.mb_x)
+                    )
+                else:
+                    self.old_logits = self.old_model(strategy.mb_x)
 
     def __call__(self, logits, targets):
         predictions = torch.sigmoid(logits)
@@ -1,9 +1,8 @@
+from functools import partial
+
 import torch
-from torch.utils.data import random_split
+from torch.utils.data import DataLoader, Subset
 
-from avalanche.benchmarks.utils.data_loader import (
-    GroupBalancedInfiniteDataLoader,
-)
 from avalanche.models import avalanche_forward
 from avalanche.training.plugins.strategy_plugin import SupervisedPlugin
 
@@ -16,6 +15,14 @@ class AGEMPlugin(SupervisedPlugin):
     between the current gradient and the (average) gradient of a randomly
     sampled set of memory examples is negative, the gradient is projected.
     This plugin does not use task identities.
+
+    The gradients of the model parameters are views of a single flat buffer,
+    so that the projection is computed with a few vectorized operations.
+    Parameters that don't get a gradient from the current mini-batch (for
+    instance, the heads of the other tasks of a multi-head model) keep a
+    None gradient, so that the optimizer doesn't update them. The memory is
+    stored in preallocated tensors on the strategy device and sampled in the
+    main process.
     """
 
     def __init__(self, patterns_per_experience: int, sample_size: int):
@@ -31,101 +38,232 @@ class AGEMPlugin(SupervisedPlugin):
         self.patterns_per_experience = int(patterns_per_experience)
         self.sample_size = int(sample_size)
 
-        self.buffers = []  # one AvalancheDataset for each experience.
-        self.buffer_dataloader = None
-        self.buffer_dliter = None
+        # The preallocated patterns, targets and task labels of all the
+        # experiences. Only the first `sum(memory_sizes)` are used.
+        self._memory_x, self._memory_y, self._memory_tid = None, None, None
+        # The number of patterns in memory for each experience
+        self.memory_sizes = []
 
         self.reference_gradients = None
-        self.memory_x, self.memory_y = None, None
+
+        self._flat_grads = None
+        """
+        The flat buffer containing the gradients of the model parameters.
+        """
+
+        self._grad_views = []
+        """
+        The (parameter, gradient view) pairs of the model parameters.
+        """
+
+        self._grads_attached = False
+        self._used_grads = []
+        """
+        Whether each parameter got a gradient in the current backward pass.
+        """
+
+        self._grad_hooks = []
+
+    @property
+    def memory_x(self):
+        """The patterns in memory."""
+        return self._used_memory(self._memory_x)
+
+    @property
+    def memory_y(self):
+        """The targets of the patterns in memory."""
+        return self._used_memory(self._memory_y)
+
+    @property
+    def memory_tid(self):
+        """The task labels of the patterns in memory."""
+        return self._used_memory(self._memory_tid)
+
+    def _used_memory(self, memory):
+        if memory is None:
+            return None
+        return memory[: sum(self.memory_sizes)]
+
+    def before_training_exp(self, strategy, **kwargs):
+        """
+        Create the flat gradient buffer of the (adapted) model.
+        """
+        self._init_flat_grads(strategy.model)
 
     def before_training_iteration(self, strategy, **kwargs):
         """
         Compute reference gradient on memory sample.
         """
-        if len(self.buffers) > 0:
+        if len(self.memory_sizes) > 0:
             strategy.model.train()
-            strategy.optimizer.zero_grad()
-            mb = self.sample_from_memory()
-            xref, yref, tid = mb[0], mb[1], mb[-1]
-            xref, yref = xref.to(strategy.device), yref.to(strategy.device)
+            self._attach_grads()
+            self._flat_grads.zero_()
+            xref, yref, tid = self.sample_from_memory()
 
             out = avalanche_forward(strategy.model, xref, tid)
             loss = strategy._criterion(out, yref)
             loss.backward()
-            # gradient can be None for some head on multi-headed models
-            self.reference_gradients = [
-                p.grad.view(-1)
-                if p.grad is not None
-                else torch.zeros(p.numel(), device=strategy.device)
-                for n, p in strategy.model.named_parameters()
-            ]
-            self.reference_gradients = torch.cat(self.reference_gradients)
-            strategy.optimizer.zero_grad()
+            # gradient is zero for unused heads on multi-headed models
+            self.reference_gradients.copy_(self._flat_grads)
+            self._flat_grads.zero_()
+
+    def before_backward(self, strategy, **kwargs):
+        """
+        Make sure that gradients are accumulated in the flat buffer.
+        """
+        if len(self.memory_sizes) > 0:
+            self._attach_grads()
+            self._used_grads = [False] * len(self._grad_views)
 
     @torch.no_grad()
     def after_backward(self, strategy, **kwargs):
         """
         Project gradient based on reference gradients
         """
-        if len(self.buffers) > 0:
-            current_gradients = [
-                p.grad.view(-1)
-                if p.grad is not None
-                else torch.zeros(p.numel(), device=strategy.device)
-                for n, p in strategy.model.named_parameters()
-            ]
-            current_gradients = torch.cat(current_gradients)
+        if len(self.memory_sizes) > 0:
+            current_gradients = self._flat_grads
+            reference_gradients = self.reference_gradients
 
             assert (
-                current_gradients.shape == self.reference_gradients.shape
+                current_gradients.shape == reference_gradients.shape
             ), "Different model parameters in AGEM projection"
 
-            dotg = torch.dot(current_gradients, self.reference_gradients)
-            if dotg < 0:
-                alpha2 = dotg / torch.dot(
-                    self.reference_gradients, self.reference_gradients
-                )
-                grad_proj = (
-                    current_gradients - self.reference_gradients * alpha2
-                )
-
-                count = 0
-                for n, p in strategy.model.named_parameters():
-                    n_param = p.numel()
-                    if p.grad is not None:
-                        p.grad.copy_(
-                            grad_proj[count : count + n_param].view_as(p)
-                        )
-                    count += n_param
+            # Branchless projection: alpha2 is zero if the dot product is
+            # not negative.
+            dotg = torch.dot(current_gradients, reference_gradients)
+            alpha2 = dotg.clamp(max=0) / torch.dot(
+                reference_gradients, reference_gradients
+            ).clamp(min=torch.finfo(reference_gradients.dtype).tiny)
+            current_gradients.addcmul_(reference_gradients, alpha2, value=-1)
+
+            # parameters without gradient are not updated by the optimizer
+            for used, (param, _) in zip(self._used_grads, self._grad_views):
+                if not used:
+                    param.grad = None
+                    self._grads_attached = False
 
     def after_training_exp(self, strategy, **kwargs):
         """Update replay memory with patterns from current experience."""
-        self.update_memory(strategy.experience.dataset, **kwargs)
+        self._remove_grad_hooks()
+        self.update_memory(
+            strategy.experience.dataset, device=strategy.device, **kwargs
+        )
 
     def sample_from_memory(self):
         """
         Sample a minibatch from memory.
-        Return a tuple of patterns (tensor), targets (tensor).
+        Return a tuple of patterns (tensor), targets (tensor) and task labels
+        (tensor).
+
+        The same number of patterns is sampled (with replacement) from the
+        memory of each experience.
         """
-        return next(self.buffer_dliter)
+        n_experiences = len(self.memory_sizes)
+        device = self.memory_x.device
+        sizes = torch.tensor(self.memory_sizes, device=device)
+        starts = torch.cumsum(sizes, dim=0) - sizes
+        per_experience = max(1, self.sample_size // n_experiences)
+
+        rand = torch.rand(n_experiences, per_experience, device=device)
+        indices = (rand * sizes[:, None]).long()
+        indices = torch.minimum(indices, sizes[:, None] - 1)
+        indices = (indices + starts[:, None]).flatten()
+        return (
+            self.memory_x[indices],
+            self.memory_y[indices],
+            self.memory_tid[indices],
+        )
 
     @torch.no_grad()
-    def update_memory(self, dataset, num_workers=4, **kwargs):
+    def update_memory(self, dataset, num_workers=0, device="cpu", **kwargs):
         """
         Update replay memory with patterns from current experience.
         """
-        removed_els = len(dataset) - self.patterns_per_experience
-        if removed_els > 0:
-            dataset, _ = random_split(
-                dataset, [self.patterns_per_experience, removed_els]
-            )
-        self.buffers.append(dataset)
-        persistent_workers = num_workers > 0
-        self.buffer_dataloader = GroupBalancedInfiniteDataLoader(
-            self.buffers,
-            batch_size=self.sample_size // len(self.buffers),
+        n_patterns = min(self.patterns_per_experience, len(dataset))
+        indices = torch.randperm(len(dataset))[:n_patterns].tolist()
+        dataloader = DataLoader(
+            Subset(dataset, indices),
+            batch_size=max(1, self.sample_size),
             num_workers=num_workers,
-            pin_memory=True,
-            persistent_workers=persistent_workers,
         )
-        self.buffer_dliter = iter(self.buffer_dataloader)
+
+        start = sum(self.memory_sizes)
+        for mbatch in dataloader:
+            x, y, tid = mbatch[0], mbatch[1], mbatch[-1]
+            self._reserve_memory(start + n_patterns, x, y, tid, device)
+            end = start + len(x)
+            self._memory_x[start:end].copy_(x)
+            self._memory_y[start:end].copy_(y)
+            self._memory_tid[start:end].copy_(tid)
+            start = end
+        self.memory_sizes.append(n_patterns)
+
+    def _reserve_memory(self, size, x, y, tid, device):
+        """Makes sure that the memory can contain `size` patterns, with the
+        shapes and types of the patterns, targets and task labels of the
+        given mini-batch. The capacity is doubled when it is exceeded, so
+        that the memory is reallocated a logarithmic number of times."""
+        if self._memory_x is not None:
+            if size <= len(self._memory_x):
+                return
+            size = max(size, 2 * len(self._memory_x))
+
+        n_used = sum(self.memory_sizes)
+        memories = []
+        for old, new in (
+            (self._memory_x, x),
+            (self._memory_y, y),
+            (self._memory_tid, tid),
+        ):
+            memory = torch.empty(
+                (size,) + tuple(new.shape[1:]),
+                dtype=new.dtype,
+                device=device,
+            )
+            if old is not None:
+                memory[:n_used].copy_(old[:n_used])
+            memories.append(memory)
+        self._memory_x, self._memory_y, self._memory_tid = memories
+
+    def _init_flat_grads(self, model):
+        params = [p for p in model.parameters() if p.requires_grad]
+        self._flat_grads = torch.zeros(
+            sum(p.numel() for p in params),
+            device=params[0].device,
+            dtype=params[0].dtype,
+        )
+        self.reference_gradients = torch.zeros_like(self._flat_grads)
+
+        views = self._flat_grads.split([p.numel() for p in params])
+        self._grad_views = [
+            (p, view.view_as(p)) for p, view in zip(params, views)
+        ]
+        self._grads_attached = False
+
+        self._remove_grad_hooks()
+        self._grad_hooks = [
+            p.register_hook(partial(self._mark_used_grad, i))
+            for i, p in enumerate(params)
+        ]
+
+    def _attach_grads(self):
+        """Sets the gradients of the parameters to the views of the flat
+        buffer if they have been replaced (for instance, by
+        `optimizer.zero_grad(set_to_none=True)`)."""
+        param, view = self._grad_views[0]
+        if self._grads_attached and param.grad is view:
+            return
+
+        self._flat_grads.zero_()
+        for param, view in self._grad_views:
+            param.grad = view
+        self._grads_attached = True
+
+    def _mark_used_grad(self, index, grad):
+        if index < len(self._used_grads):
+            self._used_grads[index] = True
+
+    def _remove_grad_hooks(self):
+        for handle in self._grad_hooks:
+            handle.remove()
+        self._grad_hooks = []
@@ -1,14 +1,21 @@
 import warnings
 from copy import copy
 from collections import defaultdict
-from typing import Union, Sequence, TYPE_CHECKING
+from typing import Callable, Dict, List, Union, Sequence, Tuple, \
+    TYPE_CHECKING
 
+from avalanche.core import BasePlugin, BaseSGDPlugin, SupervisedPlugin
+from avalanche.evaluation.metric_definitions import PluginMetric
 from avalanche.evaluation.metric_results import MetricValue
 from avalanche.evaluation.metrics import accuracy_metrics, loss_metrics
 from avalanche.logging import InteractiveLogger
+from avalanche.training.utils import (
+    PluginList,
+    callback_functions,
+    implements_callback,
+)
 
 if TYPE_CHECKING:
-    from avalanche.evaluation import PluginMetric
     from avalanche.logging import BaseLogger
     from avalanche.training.templates.supervised import SupervisedTemplate
 
@@ -68,6 +75,12 @@ class EvaluationPlugin:
                 flat_metrics_list += list(metric)
             else:
                 flat_metrics_list.append(metric)
+        self._callbacks: Dict[str, Tuple[List[Callable], List, List]] = dict()
+        """Metrics and loggers implementing each callback (computed on
+        first use)."""
+
+        self._callbacks_version = None
+
         self.metrics = flat_metrics_list
 
         if loggers is None:
@@ -90,7 +103,7 @@ class EvaluationPlugin:
         else:
             self.complete_test_stream = benchmark.test_stream
 
-        self.loggers: Sequence["BaseLogger"] = loggers
+        self.loggers = loggers
 
         if len(self.loggers) == 0:
             warnings.warn("No loggers specified, metrics will not be logged")
@@ -115,6 +128,24 @@ class EvaluationPlugin:
         self._metric_values = []
         """List of metrics that have yet to be processed by loggers."""
 
+    @property
+    def metrics(self) -> List["PluginMetric"]:
+        """The metrics to compute."""
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Sequence["PluginMetric"]):
+        self._metrics = PluginList(metrics)
+
+    @property
+    def loggers(self) -> List["BaseLogger"]:
+        """The loggers used to log the metric values."""
+        return self._loggers
+
+    @loggers.setter
+    def loggers(self, loggers: Sequence["BaseLogger"]):
+        self._loggers = PluginList(loggers)
+
     @property
     def active(self):
         return self._active
@@ -146,9 +177,12 @@ class EvaluationPlugin:
         if not self._active:
             return []
 
-        for metric in self.metrics:
+        metric_callbacks, loggers, logger_callbacks = self._get_callbacks(
+            callback
+        )
+        for metric_callback in metric_callbacks:
             try:
-                metric_result = getattr(metric, callback)(strategy)
+                metric_result = metric_callback(strategy)
                 if isinstance(metric_result, Sequence):
                     for mval in metric_result:
                         self.publish_metric_value(mval)
@@ -157,12 +191,61 @@ class EvaluationPlugin:
             except AttributeError:
                 pass
 
-        for logger in self.loggers:
-            logger.log_metrics(self._metric_values)
-            if hasattr(logger, callback):
-                getattr(logger, callback)(strategy, self._metric_values)
+        metric_values = self._metric_values
+        if len(metric_values) == 0:
+            # No need to send empty lists of values to the loggers
+            for logger_callback in logger_callbacks:
+                if logger_callback is not None:
+                    logger_callback(strategy, metric_values)
+            return
+
+        for logger, logger_callback in zip(loggers, logger_callbacks):
+            logger.log_metrics(metric_values)
+            if logger_callback is not None:
+                logger_callback(strategy, metric_values)
         self._metric_values = []
 
+    def _get_callbacks(
+        self, callback: str
+    ) -> Tuple[List[Callable], List, List]:
+        """Returns the callbacks of the metrics implementing `callback`, the
+        loggers and their callbacks (None for loggers not implementing it).
+
+        Callbacks are computed on first use and computed again when the
+        metrics or the loggers change.
+        """
+        version = (
+            id(self._metrics),
+            self._metrics.version,
+            id(self._loggers),
+            self._loggers.version,
+        )
+        if self._callbacks_version != version:
+            self._callbacks = dict()
+            self._callbacks_version = version
+
+        callbacks = self._callbacks.get(callback)
+        if callbacks is None:
+            metric_callbacks = [
+                getattr(metric, callback)
+                for metric in self._metrics
+                if implements_callback(
+                    metric, callback, _EMPTY_METRIC_CALLBACKS
+                )
+            ]
+            loggers = list(self._loggers)
+            logger_callbacks = [
+                getattr(logger, callback)
+                if implements_callback(
+                    logger, callback, _EMPTY_PLUGIN_CALLBACKS
+                )
+                else None
+                for logger in loggers
+            ]
+            callbacks = (metric_callbacks, loggers, logger_callbacks)
+            self._callbacks[callback] = callbacks
+        return callbacks
+
     def get_last_metrics(self):
         """
         Return a shallow copy of dictionary with metric names
@@ -198,20 +281,22 @@ class EvaluationPlugin:
         """
         self.last_metric_results = {}
 
-    def __getattribute__(self, item):
+    def __getattr__(self, item):
         # We don't want to reimplement all the callbacks just to call the
         # metrics. What we don't instead is to assume that any method that
         # starts with `before` or `after` is a callback of the plugin system,
-        # and we forward that call to the metrics.
-        try:
-            return super().__getattribute__(item)
-        except AttributeError as e:
-            if item.startswith("before_") or item.startswith("after_"):
-                # method is a callback. Forward to metrics.
-                return lambda strat, **kwargs: self._update_metrics_and_loggers(
-                    strat, item
-                )
-            raise
+        # and we forward that call to the metrics. Unlike __getattribute__,
+        # __getattr__ is only called for attributes that are not found.
+        if item.startswith("before_") or item.startswith("after_"):
+            # method is a callback. Forward to metrics.
+            return lambda strat, **kwargs: self._update_metrics_and_loggers(
+                strat, item
+            )
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(
+                type(self).__name__, item
+            )
+        )
 
     def before_eval(self, strategy: "SupervisedTemplate", **kwargs):
         self._update_metrics_and_loggers(strategy, "before_eval")
@@ -240,6 +325,13 @@ class EvaluationPlugin:
                         warnings.warn(msgw)
 
 
+# The empty callbacks defined by the base classes of metrics and loggers
+_EMPTY_METRIC_CALLBACKS = callback_functions(PluginMetric)
+_EMPTY_PLUGIN_CALLBACKS = callback_functions(
+    BasePlugin, BaseSGDPlugin, SupervisedPlugin
+)
+
+
 default_evaluator = EvaluationPlugin(
     accuracy_metrics(minibatch=False, epoch=True, experience=True, stream=True),
     loss_metrics(minibatch=False, epoch=True, experience=True, stream=True),
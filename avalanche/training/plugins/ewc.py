@@ -41,8 +41,9 @@ class EWCPlugin(SupervisedPlugin):
         :param keep_importance_data: if True, keep in memory both parameter
                 values and importances for all previous task, for all modes.
                 If False, keep only last parameter values and importances.
-                If mode is `separate`, the value of `keep_importance_data` is
-                set to be True.
+                If mode is `separate`, the penalties of previous experiences
+                are merged into a single one and parameter values and
+                importances are kept only if `keep_importance_data` is True.
         """
 
         super().__init__()
@@ -60,14 +61,23 @@ class EWCPlugin(SupervisedPlugin):
         self.mode = mode
         self.decay_factor = decay_factor
 
-        if self.mode == "separate":
-            self.keep_importance_data = True
-        else:
-            self.keep_importance_data = keep_importance_data
+        self.keep_importance_data = keep_importance_data
 
         self.saved_params = defaultdict(list)
         self.importances = defaultdict(list)
 
+        self.penalties: Dict[str, Tuple[Tensor, Tensor]] = dict()
+        """
+        The penalties of previous experiences merged into a single one (used
+        in `separate` mode), as a dictionary mapping each parameter name to
+        its (importance, center). See `consolidate_penalty`.
+        """
+
+        self.penalty_offset = 0.0
+        """
+        The constant term of the merged penalty.
+        """
+
     def before_backward(self, strategy, **kwargs):
         """
         Compute EWC penalty and add it to the loss.
@@ -79,13 +89,14 @@ class EWCPlugin(SupervisedPlugin):
         penalty = torch.tensor(0).float().to(strategy.device)
 
         if self.mode == "separate":
-            for experience in range(exp_counter):
-                for (_, cur_param), (_, saved_param), (_, imp) in zip(
-                    strategy.model.named_parameters(),
-                    self.saved_params[experience],
-                    self.importances[experience],
-                ):
-                    penalty += (imp * (cur_param - saved_param).pow(2)).sum()
+            for name, cur_param in strategy.model.named_parameters():
+                if name not in self.penalties:
+                    # parameters added after the previous experiences (e.g.
+                    # new heads) have zero importance
+                    continue
+                importance, center = self.penalties[name]
+                penalty += (importance * (cur_param - center).pow(2)).sum()
+            penalty += self.penalty_offset
         elif self.mode == "online":
             prev_exp = exp_counter - 1
             for (_, cur_param), (_, saved_param), (_, imp) in zip(
@@ -112,12 +123,69 @@ class EWCPlugin(SupervisedPlugin):
             strategy.device,
             strategy.train_mb_size,
         )
+        saved_params = copy_params_dict(strategy.model)
+        if self.mode == "separate":
+            self.consolidate_penalty(importances, saved_params)
+            if not self.keep_importance_data:
+                return
+
         self.update_importances(importances, exp_counter)
-        self.saved_params[exp_counter] = copy_params_dict(strategy.model)
+        self.saved_params[exp_counter] = saved_params
         # clear previous parameter values
         if exp_counter > 0 and (not self.keep_importance_data):
             del self.saved_params[exp_counter - 1]
 
+    @torch.no_grad()
+    def consolidate_penalty(self, importances, saved_params):
+        """
+        Merge the penalty of an experience into the penalty of the previous
+        experiences.
+
+        The sum over experiences of `imp_t * (p - saved_t)^2` is equal to
+        `imp * (p - center)^2 + offset`, where `imp` is the sum of the
+        importances, `center` is the importance-weighted average of the
+        saved parameters and `offset` is a constant. This makes the cost of
+        the penalty independent of the number of experiences, and the
+        parameters and importances of each experience don't need to be kept.
+
+        Penalties are merged by parameter name, so that the model can grow
+        between experiences (e.g. multi-head models adding a new head): a
+        parameter missing from an experience has zero importance in it.
+
+        :param importances: the importances of the experience, as a list of
+            (name, importance).
+        :param saved_params: the parameters at the end of the experience, as
+            a list of (name, parameter).
+        """
+        for (k1, exp_center), (k2, exp_importance) in zip(
+            saved_params, importances
+        ):
+            assert k1 == k2, "Error in importance computation."
+            if k1 not in self.penalties:
+                self.penalties[k1] = (
+                    exp_importance.clone(),
+                    exp_center.clone(),
+                )
+                continue
+
+            # Running weighted mean and sum of squares (parallel axis
+            # theorem)
+            importance, center = self.penalties[k1]
+            new_importance = importance + exp_importance
+            new_center = torch.where(
+                new_importance > 0,
+                (importance * center + exp_importance * exp_center)
+                / new_importance,
+                center,
+            )
+            self.penalty_offset += (
+                (importance * (center - new_center).pow(2)).double().sum()
+                + (exp_importance * (exp_center - new_center).pow(2))
+                .double()
+                .sum()
+            ).item()
+            self.penalties[k1] = (new_importance, new_center)
+
     def compute_importances(
         self, model, criterion, optimizer, dataset, device, batch_size
     ):
@@ -1,6 +1,8 @@
+from typing import Optional
+
 import numpy as np
-import quadprog
 import torch
+from torch import Tensor
 from torch.utils.data import DataLoader
 
 from avalanche.models import avalanche_forward
@@ -34,6 +36,13 @@ class GEMPlugin(SupervisedPlugin):
 
         self.G = None
 
+        self._memory_batch = None
+        """
+        The memory of all the previous experiences moved to the strategy
+        device, as a tuple (experiences, x, y, task labels) of lists with
+        one element per experience. Computed again when the memory changes.
+        """
+
     def before_training_iteration(self, strategy, **kwargs):
         """
         Compute gradient constraints on previous memory samples from all
@@ -41,32 +50,98 @@ class GEMPlugin(SupervisedPlugin):
         """
 
         if strategy.clock.train_exp_counter > 0:
-            G = []
             strategy.model.train()
-            for t in range(strategy.clock.train_exp_counter):
-                strategy.model.train()
-                strategy.optimizer.zero_grad()
-                xref = self.memory_x[t].to(strategy.device)
-                yref = self.memory_y[t].to(strategy.device)
-                out = avalanche_forward(
-                    strategy.model, xref, self.memory_tid[t]
+            self.G = self.compute_reference_gradients(
+                strategy, strategy.clock.train_exp_counter
+            )  # (experiences, parameters)
+
+    def compute_reference_gradients(self, strategy, n_experiences) -> Tensor:
+        """
+        Compute the gradients of the loss on the memory of each previous
+        experience.
+
+        The memory of each experience goes through the model in a separate
+        forward pass, so that the batch statistics (for instance, of batch
+        normalization layers) are computed per experience. The gradients of
+        the per-experience losses are then computed in a single batched
+        backward pass (one backward pass per experience if the model doesn't
+        support batched gradients).
+
+        :param strategy: the strategy.
+        :param n_experiences: the number of previous experiences.
+        :return: the flat gradients, one row per experience.
+        """
+        if (
+            self._memory_batch is None
+            or self._memory_batch[0] != n_experiences
+        ):
+            self._memory_batch = (
+                n_experiences,
+                [
+                    self.memory_x[t].to(strategy.device)
+                    for t in range(n_experiences)
+                ],
+                [
+                    self.memory_y[t].to(strategy.device)
+                    for t in range(n_experiences)
+                ],
+                [self.memory_tid[t] for t in range(n_experiences)],
+            )
+        _, xref, yref, tref = self._memory_batch
+
+        losses = torch.stack(
+            [
+                strategy._criterion(
+                    avalanche_forward(strategy.model, x_t, t_t), y_t
                 )
-                loss = strategy._criterion(out, yref)
-                loss.backward()
-
-                G.append(
-                    torch.cat(
-                        [
-                            p.grad.flatten()
-                            if p.grad is not None
-                            else torch.zeros(p.numel(), device=strategy.device)
-                            for p in strategy.model.parameters()
-                        ],
-                        dim=0,
-                    )
+                for x_t, y_t, t_t in zip(xref, yref, tref)
+            ]
+        )
+
+        params = list(strategy.model.parameters())
+        trainable = [p for p in params if p.requires_grad]
+        try:
+            grads = torch.autograd.grad(
+                losses,
+                trainable,
+                grad_outputs=torch.eye(
+                    n_experiences, device=losses.device, dtype=losses.dtype
+                ),
+                is_grads_batched=True,
+                allow_unused=True,
+            )
+        except (RuntimeError, TypeError):
+            # Batched gradients are not supported by the model (or by this
+            # version of PyTorch): one backward pass per experience.
+            exp_grads = [
+                torch.autograd.grad(
+                    losses[t], trainable, retain_graph=True, allow_unused=True
                 )
+                for t in range(n_experiences)
+            ]
+            grads = [
+                None if grads_p[0] is None else torch.stack(grads_p)
+                for grads_p in zip(*exp_grads)
+            ]
+        grads = dict(zip(trainable, grads))
 
-            self.G = torch.stack(G)  # (experiences, parameters)
+        G = torch.empty(
+            n_experiences,
+            sum(p.numel() for p in params),
+            device=losses.device,
+        )
+        num_pars = 0
+        for p in params:
+            curr_pars = p.numel()
+            grad = grads.get(p, None)
+            if grad is None:
+                G[:, num_pars : num_pars + curr_pars].fill_(0.0)
+            else:
+                G[:, num_pars : num_pars + curr_pars].copy_(
+                    grad.reshape(n_experiences, -1)
+                )
+            num_pars += curr_pars
+        return G
 
     @torch.no_grad()
     def after_backward(self, strategy, **kwargs):
@@ -90,7 +165,9 @@ class GEMPlugin(SupervisedPlugin):
             to_project = False
 
         if to_project:
-            v_star = self.solve_quadprog(g).to(strategy.device)
+            v_star = self.solve_qp(g)
+            if v_star is None:
+                v_star = self.solve_quadprog(g).to(strategy.device)
 
             num_pars = 0  # reshape v_star into the parameter matrices
             for p in strategy.model.parameters():
@@ -153,6 +230,40 @@ class GEMPlugin(SupervisedPlugin):
                     )
                 break
             tot += x.size(0)
+        self._memory_batch = None
+
+    def solve_qp(self, g) -> Optional[Tensor]:
+        """
+        Project the current gradient g using the gradients matrix on previous
+        tasks G.
+
+        The dual problem (one variable per previous experience) is built and
+        solved exactly with an active-set method in double precision on the
+        device of the gradients. The projected gradient is then computed in
+        place in g.
+
+        :param g: the flat gradient on the current minibatch.
+        :return: the projected gradient (g itself) or None if the solver
+            didn't converge.
+        """
+        t = self.G.size(0)
+        P = torch.mm(self.G, self.G.t()).double()
+        P = 0.5 * (P + P.t()) + 1e-3 * torch.eye(
+            t, dtype=P.dtype, device=P.device
+        )
+        q = torch.mv(self.G, g).double()
+
+        # min 1/2 v^T P v + q^T v s.t. v >= memory_strength, solved in
+        # u = v - memory_strength >= 0
+        margin = torch.full(
+            (t,), float(self.memory_strength), dtype=P.dtype, device=P.device
+        )
+        u = _solve_nnqp(P, torch.mv(P, margin) + q)
+        if u is None:
+            return None
+
+        v = (u + margin).to(g.dtype)
+        return g.addmv_(self.G.t(), v)
 
     def solve_quadprog(self, g):
         """
@@ -161,6 +272,7 @@ class GEMPlugin(SupervisedPlugin):
         Taken from original code:
         https://github.com/facebookresearch/GradientEpisodicMemory/blob/master/model/gem.py
         """
+        import quadprog
 
         memories_np = self.G.cpu().double().numpy()
         gradient_np = g.cpu().contiguous().view(-1).double().numpy()
@@ -174,3 +286,40 @@ class GEMPlugin(SupervisedPlugin):
         v_star = np.dot(v, memories_np) + gradient_np
 
         return torch.from_numpy(v_star).float()
+
+
+def _solve_nnqp(P: Tensor, c: Tensor, tol: float = 1e-10) -> Optional[Tensor]:
+    """
+    Solve min 1/2 u^T P u + c^T u s.t. u >= 0, with P positive definite,
+    using the active-set method of Lawson and Hanson.
+
+    :return: the solution or None if the method didn't converge.
+    """
+    n = c.numel()
+    tol = tol * max(1.0, c.abs().max().item())
+    u = torch.zeros_like(c)
+    passive = torch.zeros(n, dtype=torch.bool, device=c.device)
+    for _ in range(3 * n + 10):
+        w = -(torch.mv(P, u) + c)
+        w[passive] = -float("inf")
+        j = torch.argmax(w)
+        if w[j] <= tol:
+            return u
+        passive[j] = True
+
+        while True:
+            idx = passive.nonzero().flatten()
+            z = torch.zeros_like(c)
+            z[idx] = torch.linalg.solve(P[idx][:, idx], -c[idx])
+            if bool((z[idx] > tol).all()):
+                u = z
+                break
+
+            # Move towards z until a variable becomes zero
+            blocking = idx[z[idx] <= tol]
+            step = u[blocking] / (u[blocking] - z[blocking]).clamp(min=tol)
+            alpha = step.min().clamp(0.0, 1.0)
+            u = u + alpha * (z - u)
+            passive &= u > tol
+            u[~passive] = 0.0
+    return None
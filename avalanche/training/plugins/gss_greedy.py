@@ -1,3 +1,4 @@
+from itertools import accumulate
 from typing import TYPE_CHECKING
 
 import torch
@@ -5,6 +6,12 @@ from avalanche.benchmarks.utils import AvalancheDataset
 from avalanche.benchmarks.utils.data_loader import ReplayDataLoader
 from avalanche.training.plugins.strategy_plugin import SupervisedPlugin
 
+try:
+    from torch.func import functional_call, grad, vmap
+except ImportError:
+    # PyTorch < 2.0: per-sample gradients are computed one sample at a time
+    functional_call = grad = vmap = None
+
 if TYPE_CHECKING:
     from ..templates.supervised import SupervisedTemplate
 
@@ -39,6 +46,12 @@ class GSS_greedyPlugin(SupervisedPlugin):
 
         self.buffer_score = torch.FloatTensor(self.mem_size).fill_(0)
 
+        self._batched_grads = vmap is not None
+        """
+        If True, per-sample gradients are computed in a single batched pass.
+        Set to False if the model doesn't support it.
+        """
+
     def before_training(self, strategy: "SupervisedTemplate", **kwargs):
         self.device = strategy.device
         self.ext_mem_list_x = self.ext_mem_list_x.to(strategy.device)
@@ -53,20 +66,24 @@ class GSS_greedyPlugin(SupervisedPlugin):
         sim = torch.mm(x1, x2.t()) / (w1 * w2.t()).clamp(min=eps)
         return sim
 
-    def get_grad_vector(self, pp, grad_dims):
+    def get_grad_vector(self, pp, grad_dims, out=None):
         """
         gather the gradients in one vector
+
+        :param pp: a function returning the parameters.
+        :param grad_dims: the number of elements of each parameter.
+        :param out: an optional preallocated vector in which the gradients
+            are written.
         """
-        grads = torch.zeros(sum(grad_dims), device=self.device)
-        grads.fill_(0.0)
-        cnt = 0
-        for param in pp():
+        if out is None:
+            out = torch.empty(sum(grad_dims), device=self.device)
+        ends = list(accumulate(grad_dims))
+        for param, beg, en in zip(pp(), [0] + ends, ends):
             if param.grad is not None:
-                beg = 0 if cnt == 0 else sum(grad_dims[:cnt])
-                en = sum(grad_dims[: cnt + 1])
-                grads[beg:en].copy_(param.grad.data.view(-1))
-            cnt += 1
-        return grads
+                out[beg:en].copy_(param.grad.data.view(-1))
+            else:
+                out[beg:en].fill_(0.0)
+        return out
 
     def get_batch_sim(self, strategy, grad_dims, batch_x, batch_y):
         """
@@ -120,37 +137,123 @@ class GSS_greedyPlugin(SupervisedPlugin):
 
             loss = strategy._criterion(strategy.model.forward(batch_x), batch_y)
             loss.backward()
-            mem_grads[i].data.copy_(
-                self.get_grad_vector(strategy.model.parameters, grad_dims)
+            self.get_grad_vector(
+                strategy.model.parameters, grad_dims, out=mem_grads[i]
             )
         return mem_grads
 
-    def get_each_batch_sample_sim(
-        self, strategy, grad_dims, mem_grads, batch_x, batch_y
-    ):
+    def get_per_sample_grads(self, strategy, grad_dims, batch_x, batch_y):
         """
         Args:
-            buffer: memory buffer
             grad_dims: gradient dimensions
-            mem_grads: gradient from memory subsets
             batch_x: batch images
             batch_y: batch labels
-        Returns: score of each sample from current batch
+        Returns: a matrix containing the gradient of each sample (one row
+            per sample)
         """
-        cosine_sim = torch.zeros(batch_x.size(0), device=strategy.device)
+        sample_grads = torch.empty(
+            batch_x.size(0),
+            sum(grad_dims),
+            dtype=torch.float32,
+            device=strategy.device,
+        )
+        if self._batched_grads:
+            try:
+                self._chunked_per_sample_grads(
+                    strategy, grad_dims, batch_x, batch_y, sample_grads
+                )
+                return sample_grads
+            except RuntimeError as error:
+                if _is_out_of_memory(error):
+                    raise
+                # The model can't be vectorized (for instance, it uses
+                # in-place operations on its inputs or calls .item())
+                self._batched_grads = False
+
         for i, (x, y) in enumerate(zip(batch_x, batch_y)):
             strategy.model.zero_grad()
             ptloss = strategy._criterion(
                 strategy.model.forward(x.unsqueeze(0)), y.unsqueeze(0)
             )
             ptloss.backward()
-            # add the new grad to the memory grads and add it is cosine
-            # similarity
-            this_grad = self.get_grad_vector(
-                strategy.model.parameters, grad_dims
-            ).unsqueeze(0)
-            cosine_sim[i] = max(self.cosine_similarity(mem_grads, this_grad))
-        return cosine_sim
+            self.get_grad_vector(
+                strategy.model.parameters, grad_dims, out=sample_grads[i]
+            )
+        return sample_grads
+
+    def _chunked_per_sample_grads(
+        self, strategy, grad_dims, batch_x, batch_y, out
+    ):
+        """Computes the per-sample gradients in batched passes, splitting
+        the batch in smaller chunks if it doesn't fit in memory."""
+        chunk_size = batch_x.size(0)
+        beg = 0
+        while beg < batch_x.size(0):
+            end = beg + chunk_size
+            try:
+                self._batched_per_sample_grads(
+                    strategy,
+                    grad_dims,
+                    batch_x[beg:end],
+                    batch_y[beg:end],
+                    out[beg:end],
+                )
+            except RuntimeError as error:
+                if not _is_out_of_memory(error) or chunk_size == 1:
+                    raise
+                chunk_size = (chunk_size + 1) // 2
+                continue
+            beg = end
+
+    def _batched_per_sample_grads(
+        self, strategy, grad_dims, batch_x, batch_y, out
+    ):
+        model = strategy.model
+        criterion = strategy._criterion
+        named_params = list(model.named_parameters())
+        params = {k: p.detach() for k, p in named_params if p.requires_grad}
+        constants = {
+            k: p.detach() for k, p in named_params if not p.requires_grad
+        }
+        constants.update((k, b.detach()) for k, b in model.named_buffers())
+
+        def sample_loss(params, x, y):
+            params_and_constants = dict(constants)
+            params_and_constants.update(params)
+            output = functional_call(
+                model, params_and_constants, (x.unsqueeze(0),)
+            )
+            return criterion(output, y.unsqueeze(0))
+
+        grads = vmap(grad(sample_loss), in_dims=(None, 0, 0))(
+            params, batch_x, batch_y
+        )
+
+        ends = list(accumulate(grad_dims))
+        for (k, _), beg, en in zip(named_params, [0] + ends, ends):
+            if k in grads:
+                out[:, beg:en].copy_(grads[k].reshape(out.size(0), -1))
+            else:
+                out[:, beg:en].fill_(0.0)
+
+    def get_each_batch_sample_sim(
+        self, strategy, grad_dims, mem_grads, batch_x, batch_y
+    ):
+        """
+        Args:
+            buffer: memory buffer
+            grad_dims: gradient dimensions
+            mem_grads: gradient from memory subsets
+            batch_x: batch images
+            batch_y: batch labels
+        Returns: score of each sample from current batch
+        """
+        sample_grads = self.get_per_sample_grads(
+            strategy, grad_dims, batch_x, batch_y
+        )
+        # Similarity of each sample (column) with each memory subset (row)
+        cosine_sim = self.cosine_similarity(mem_grads, sample_grads)
+        return cosine_sim.max(dim=0).values
 
     def before_training_exp(
         self, strategy, num_workers=0, shuffle=True, **kwargs
@@ -287,3 +390,11 @@ class GSS_greedyPlugin(SupervisedPlugin):
             self.ext_mem_list_current_index += offset
 
         strategy.model.train()
+
+
+def _is_out_of_memory(error: RuntimeError) -> bool:
+    """Checks if an error is raised because a device is out of memory."""
+    oom_error = getattr(torch.cuda, "OutOfMemoryError", None)
+    if oom_error is not None and isinstance(error, oom_error):
+        return True
+    return "out of memory" in str(error)
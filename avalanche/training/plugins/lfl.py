@@ -1,8 +1,10 @@
 import copy
+from typing import Optional
 
 import torch
 
 from avalanche.training.plugins.strategy_plugin import SupervisedPlugin
+from avalanche.training.teacher_cache import TeacherOutputCache
 from avalanche.training.utils import get_last_fc_layer, freeze_everything
 from avalanche.models.base_model import BaseModel
 
@@ -20,13 +22,19 @@ class LFLPlugin(SupervisedPlugin):
     This plugin does not use task identities.
     """
 
-    def __init__(self, lambda_e):
+    def __init__(
+        self, lambda_e, teacher_cache: Optional[TeacherOutputCache] = None
+    ):
         """
         :param lambda_e: Euclidean loss hyper parameter
+        :param teacher_cache: an optional cache used to reuse the features of
+            the previous model in the epochs following the first one of each
+            experience. See :class:`TeacherOutputCache`.
         """
         super().__init__()
 
         self.lambda_e = lambda_e
+        self.teacher_cache = teacher_cache
         self.prev_model = None
 
     def _euclidean_loss(self, features, prev_features):
@@ -35,18 +43,23 @@ class LFLPlugin(SupervisedPlugin):
         """
         return torch.nn.functional.mse_loss(features, prev_features)
 
-    def penalty(self, x, model, lambda_e):
+    def penalty(self, x, model, lambda_e, strategy=None):
         """
         Compute weighted euclidean loss
+
+        :param strategy: if not None, the features of the previous model are
+            retrieved from the cache, if available.
         """
         if self.prev_model is None:
             return 0
         else:
-            features, prev_features = self.compute_features(model, x)
+            features, prev_features = self.compute_features(
+                model, x, strategy
+            )
             dist_loss = self._euclidean_loss(features, prev_features)
             return lambda_e * dist_loss
 
-    def compute_features(self, model, x):
+    def compute_features(self, model, x, strategy=None):
         """
         Compute features from prev model and current model
         """
@@ -54,7 +67,12 @@ class LFLPlugin(SupervisedPlugin):
         self.prev_model.eval()
 
         features = model.get_features(x)
-        prev_features = self.prev_model.get_features(x)
+        if strategy is not None and self.teacher_cache is not None:
+            prev_features = self.teacher_cache.get(
+                strategy, lambda: self.prev_model.get_features(x)
+            )
+        else:
+            prev_features = self.prev_model.get_features(x)
 
         return features, prev_features
 
@@ -68,9 +86,26 @@ class LFLPlugin(SupervisedPlugin):
             else self.lambda_e
         )
 
-        penalty = self.penalty(strategy.mb_x, strategy.model, lambda_e)
+        penalty = self.penalty(
+            strategy.mb_x, strategy.model, lambda_e, strategy
+        )
         strategy.loss += penalty
 
+    def before_training_exp(self, strategy, **kwargs):
+        """
+        Empty the cache of the features of the previous model.
+        """
+        if self.teacher_cache is not None:
+            self.teacher_cache.reset()
+
+    def before_training_epoch(self, strategy, **kwargs):
+        """
+        Ask the data loader for the indices used by the cache of the features
+        of the previous model.
+        """
+        if self.prev_model is not None and self.teacher_cache is not None:
+            self.teacher_cache.enable(strategy)
+
     def after_training_exp(self, strategy, **kwargs):
         """
         Save a copy of the model after each experience
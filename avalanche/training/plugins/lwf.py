@@ -1,9 +1,16 @@
 import copy
+from typing import Dict, List, Optional
 
 import torch
+import torch.nn.functional as F
 
-from avalanche.models import avalanche_forward, MultiTaskModule
+from avalanche.models import (
+    avalanche_forward,
+    MultiTaskModule,
+    MultiHeadClassifier,
+)
 from avalanche.training.plugins.strategy_plugin import SupervisedPlugin
+from avalanche.training.teacher_cache import TeacherOutputCache
 
 
 class LwFPlugin(SupervisedPlugin):
@@ -13,27 +20,61 @@ class LwFPlugin(SupervisedPlugin):
     taken from a previous version of the model.
     This plugin does not use task identities.
     When used with multi-headed models, all heads are distilled.
+
+    For multi-task models with a :class:`MultiHeadClassifier` (and no other
+    multi-task submodule), the features given to the classifier are assumed
+    to be independent of the task label: they are computed once for each
+    mini-batch (reusing the forward pass of the strategy for the current
+    model) and all the previous heads are evaluated together on them.
     """
 
-    def __init__(self, alpha=1, temperature=2):
+    def __init__(
+        self,
+        alpha=1,
+        temperature=2,
+        teacher_cache: Optional[TeacherOutputCache] = None,
+    ):
         """
         :param alpha: distillation hyperparameter. It can be either a float
                 number or a list containing alpha for each experience.
         :param temperature: softmax temperature for distillation
+        :param teacher_cache: an optional cache used to reuse the outputs of
+                the previous model in the epochs following the first one of
+                each experience. See :class:`TeacherOutputCache`.
         """
 
         super().__init__()
 
         self.alpha = alpha
         self.temperature = temperature
+        self.teacher_cache = teacher_cache
         self.prev_model = None
 
         self.prev_classes = {"0": set()}
-        """ In Avalanche, targets of different experiences are not ordered. 
-        As a result, some units may be allocated even though their 
+        """ In Avalanche, targets of different experiences are not ordered.
+        As a result, some units may be allocated even though their
         corresponding class has never been seen by the model.
-        Knowledge distillation uses only units corresponding to old classes. 
+        Knowledge distillation uses only units corresponding to old classes.
+        """
+
+        self._active_units: Dict[str, torch.Tensor] = dict()
+        """
+        The previously active units of each task, as index tensors.
+        """
+
+        self._curr_features: List[torch.Tensor] = []
         """
+        The inputs of the multi-head classifier of the current model captured
+        during the forward pass of the strategy.
+        """
+
+        self._features_classifier: Optional[MultiHeadClassifier] = None
+        """
+        The multi-head classifier of the current model whose inputs are
+        captured during the training forward passes, if any.
+        """
+
+        self._features_hook = None
 
     def _distillation_loss(self, out, prev_out, active_units):
         """
@@ -41,42 +82,122 @@ class LwFPlugin(SupervisedPlugin):
         and output of the previous (saved) model.
         """
         # we compute the loss only on the previously active units.
-        au = list(active_units)
+        if isinstance(active_units, torch.Tensor):
+            au = active_units.to(out.device)
+        else:
+            au = list(active_units)
         log_p = torch.log_softmax(out / self.temperature, dim=1)[:, au]
         q = torch.softmax(prev_out / self.temperature, dim=1)[:, au]
         res = torch.nn.functional.kl_div(log_p, q, reduction="batchmean")
         return res
 
-    def penalty(self, out, x, alpha, curr_model):
+    @torch.no_grad()
+    def _prev_model_outputs(self, x):
+        """
+        Compute the outputs of the previous model (of all its heads).
+        """
+        if isinstance(self.prev_model, MultiTaskModule):
+            classifier = _shared_multihead_classifier(self.prev_model)
+            if classifier is None:
+                y_prev = avalanche_forward(self.prev_model, x, None)
+                return {str(k): v for k, v in y_prev.items()}
+
+            task_ids = self._distilled_tasks(classifier)
+            if len(task_ids) == 0:
+                return dict()
+            features = _classifier_features(
+                self.prev_model, classifier, x, task_ids[0]
+            )
+            return _forward_heads(classifier, features, task_ids)
+        else:  # no task labels
+            return {"0": self.prev_model(x)}
+
+    def _curr_model_outputs(self, x, curr_model):
+        """
+        Compute the outputs of the previously learned heads of the current
+        multi-task model.
+        """
+        classifier = _shared_multihead_classifier(curr_model)
+        if classifier is None:
+            y_curr = avalanche_forward(curr_model, x, None)
+            return {str(k): v for k, v in y_curr.items()}
+
+        task_ids = self._distilled_tasks(classifier)
+        if len(task_ids) == 0:
+            return dict()
+        captured = self._curr_features
+        if len(captured) == 1 and len(captured[0]) == len(x):
+            # reuse the forward pass of the strategy.
+            features = captured[0]
+        else:
+            features = _classifier_features(
+                curr_model, classifier, x, task_ids[0]
+            )
+        return _forward_heads(classifier, features, task_ids)
+
+    def _distilled_tasks(self, classifier):
+        return [
+            task_id
+            for task_id in self.prev_classes
+            if task_id in classifier.classifiers
+            and len(self.prev_classes[task_id]) > 0
+        ]
+
+    def _get_active_units(self, task_id, device):
+        au = self._active_units.get(task_id, None)
+        if au is None or au.device != device:
+            au = torch.tensor(
+                sorted(self.prev_classes[task_id]),
+                dtype=torch.long,
+                device=device,
+            )
+            self._active_units[task_id] = au
+        return au
+
+    def penalty(self, out, x, alpha, curr_model, y_prev=None):
         """
         Compute weighted distillation loss.
+
+        :param y_prev: the outputs of the previous model on `x`. If None,
+            they are computed.
         """
 
         if self.prev_model is None:
             return 0
         else:
-            with torch.no_grad():
-                if isinstance(self.prev_model, MultiTaskModule):
-                    # output from previous output heads.
-                    y_prev = avalanche_forward(self.prev_model, x, None)
-                    # in a multitask scenario we need to compute the output
-                    # from all the heads, so we need to call forward again.
-                    # TODO: can we avoid this?
-                    y_curr = avalanche_forward(curr_model, x, None)
-                else:  # no task labels
-                    y_prev = {"0": self.prev_model(x)}
-                    y_curr = {"0": out}
+            if y_prev is None:
+                y_prev = self._prev_model_outputs(x)
+            if isinstance(self.prev_model, MultiTaskModule):
+                y_curr = self._curr_model_outputs(x, curr_model)
+            else:  # no task labels
+                y_curr = {"0": out}
 
             dist_loss = 0
             for task_id in y_prev.keys():
                 # compute kd only for previous heads.
-                if task_id in self.prev_classes:
+                if task_id in self.prev_classes and task_id in y_curr:
                     yp = y_prev[task_id]
                     yc = y_curr[task_id]
-                    au = self.prev_classes[task_id]
+                    au = self._get_active_units(task_id, yc.device)
                     dist_loss += self._distillation_loss(yc, yp, au)
             return alpha * dist_loss
 
+    def before_forward(self, strategy, **kwargs):
+        """
+        Capture the features of the multi-head classifier of the current
+        model during the training forward pass.
+        """
+        self._curr_features = []
+        if self._features_classifier is not None:
+            self._features_hook = (
+                self._features_classifier.register_forward_pre_hook(
+                    self._capture_features
+                )
+            )
+
+    def after_forward(self, strategy, **kwargs):
+        self._remove_features_hook()
+
     def before_backward(self, strategy, **kwargs):
         """
         Add distillation loss
@@ -86,25 +207,108 @@ class LwFPlugin(SupervisedPlugin):
             if isinstance(self.alpha, (list, tuple))
             else self.alpha
         )
+        y_prev = None
+        if self.prev_model is not None and self.teacher_cache is not None:
+            y_prev = self.teacher_cache.get(
+                strategy, lambda: self._prev_model_outputs(strategy.mb_x)
+            )
         penalty = self.penalty(
-            strategy.mb_output, strategy.mb_x, alpha, strategy.model
+            strategy.mb_output, strategy.mb_x, alpha, strategy.model, y_prev
         )
         strategy.loss += penalty
+        self._curr_features = []
+
+    def before_training_exp(self, strategy, **kwargs):
+        """
+        Empty the cache of the outputs of the previous model and find the
+        multi-head classifier of the current model whose features are
+        captured.
+        """
+        if self.teacher_cache is not None:
+            self.teacher_cache.reset()
+
+        self._features_classifier = None
+        if isinstance(self.prev_model, MultiTaskModule):
+            self._features_classifier = _shared_multihead_classifier(
+                strategy.model
+            )
+
+    def before_training_epoch(self, strategy, **kwargs):
+        """
+        Ask the data loader for the indices used by the cache of the outputs
+        of the previous model.
+        """
+        if self.prev_model is not None and self.teacher_cache is not None:
+            self.teacher_cache.enable(strategy)
 
     def after_training_exp(self, strategy, **kwargs):
         """
         Save a copy of the model after each experience and
         update self.prev_classes to include the newly learned classes.
         """
+        # the hook must not be copied with the model
+        self._remove_features_hook()
+        self._features_classifier = None
         self.prev_model = copy.deepcopy(strategy.model)
         task_ids = strategy.experience.dataset.task_set
         for task_id in task_ids:
             task_data = strategy.experience.dataset.task_set[task_id]
             pc = set(task_data.targets)
 
-            if task_id not in self.prev_classes:
-                self.prev_classes[str(task_id)] = pc
-            else:
-                self.prev_classes[str(task_id)] = self.prev_classes[
-                    task_id
-                ].union(pc)
+            task_id = str(task_id)
+            self.prev_classes[task_id] = self.prev_classes.get(
+                task_id, set()
+            ).union(pc)
+        self._active_units = dict()
+
+    def _capture_features(self, module, inputs):
+        self._curr_features.append(inputs[0])
+
+    def _remove_features_hook(self):
+        if self._features_hook is not None:
+            self._features_hook.remove()
+            self._features_hook = None
+
+
+def _shared_multihead_classifier(model) -> Optional[MultiHeadClassifier]:
+    """Returns the multi-head classifier of a multi-task model whose heads
+    can be evaluated on the same features, that is the only
+    :class:`MultiHeadClassifier` of the model when the model doesn't contain
+    other multi-task modules. Returns None otherwise."""
+    classifiers = []
+    for module in model.modules():
+        if isinstance(module, MultiHeadClassifier):
+            classifiers.append(module)
+        elif module is not model and isinstance(module, MultiTaskModule):
+            return None
+    if len(classifiers) != 1:
+        return None
+    return classifiers[0]
+
+
+def _classifier_features(model, classifier, x, task_id):
+    """Computes the input of the multi-head classifier with a single forward
+    pass of the model, using the head of the given task."""
+    features = []
+    handle = classifier.register_forward_pre_hook(
+        lambda module, inputs: features.append(inputs[0])
+    )
+    try:
+        # an int task label makes the model forward the whole mini-batch
+        # through a single head.
+        avalanche_forward(model, x, int(task_id))
+    finally:
+        handle.remove()
+    return features[0]
+
+
+def _forward_heads(classifier, features, task_ids):
+    """Evaluates the given heads of a multi-head classifier on the same
+    features with a single matrix multiplication."""
+    heads = [classifier.classifiers[t].classifier for t in task_ids]
+    weight = torch.cat([head.weight for head in heads])
+    bias = torch.cat([head.bias for head in heads])
+    out = F.linear(features, weight, bias)
+    return dict(
+        zip(task_ids, out.split([head.out_features for head in heads], dim=1))
+    )
@@ -28,7 +28,9 @@ class ReplayPlugin(SupervisedPlugin):
     patterns to the external memory.
 
     The :mem_size: attribute controls the total number of patterns to be stored
-    in the external memory.
+    in the external memory. If the storage policy has a byte budget (see
+    :class:`ExemplarStore`), the number of patterns is computed from the
+    budget and `mem_size` is ignored (it can be set to `None`).
 
     :param batch_size: the size of the data batch. If set to `None`, it
         will be set equal to the strategy's batch size.
@@ -44,7 +46,8 @@ class ReplayPlugin(SupervisedPlugin):
                            in memory
     """
 
-    def __init__(self, mem_size: int = 200, batch_size: int = None,
+    def __init__(self, mem_size: Optional[int] = 200,
+                 batch_size: int = None,
                  batch_size_mem: int = None,
                  task_balanced_dataloader: bool = False,
                  storage_policy: Optional["ExemplarsBuffer"] = None):
@@ -56,7 +59,11 @@ class ReplayPlugin(SupervisedPlugin):
 
         if storage_policy is not None:  # Use other storage policy
             self.storage_policy = storage_policy
-            assert storage_policy.max_size == self.mem_size
+            storage = getattr(storage_policy, "storage", None)
+            # with a byte budget, the size of the buffer is computed from
+            # the budget when the first exemplars are stored
+            if getattr(storage, "max_bytes", None) is None:
+                assert storage_policy.max_size == self.mem_size
         else:  # Default
             self.storage_policy = ExperienceBalancedBuffer(
                 max_size=self.mem_size,
@@ -1,19 +1,27 @@
+import json
+import math
+import os
 import random
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, List, TYPE_CHECKING
+from typing import Dict, Optional, List, Tuple, TYPE_CHECKING
 
+import numpy as np
 import torch
 from numpy import inf
 from torch import cat, Tensor
 from torch.nn import Module
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset
+from torch.utils.data.dataloader import default_collate
 
 from avalanche.benchmarks.utils import (
     AvalancheDataset,
     AvalancheSubset,
     AvalancheConcatDataset,
+    MemoryMappedDataset,
 )
+from avalanche.benchmarks.utils.dataset_utils import as_int_array
 from avalanche.models import FeatureExtractorBackbone
+from avalanche.training.exemplar_store import ExemplarStore
 
 if TYPE_CHECKING:
     from .templates.supervised import SupervisedTemplate
@@ -35,6 +43,9 @@ class ExemplarsBuffer(ABC):
         """ Maximum size of the buffer. """
         self._buffer = AvalancheConcatDataset([])
 
+        self._parent: Optional["BalancedExemplarsBuffer"] = None
+        """ The balanced buffer containing this buffer as a group, if any. """
+
     @property
     def buffer(self) -> AvalancheDataset:
         """Buffer of samples."""
@@ -43,6 +54,15 @@ class ExemplarsBuffer(ABC):
     @buffer.setter
     def buffer(self, new_buffer: AvalancheDataset):
         self._buffer = new_buffer
+        self._notify_parent()
+
+    def _notify_parent(self):
+        """Tells the balanced buffer containing this buffer that its content
+        changed."""
+        # The buffer may be partially restored when copying or unpickling.
+        parent = getattr(self, "_parent", None)
+        if parent is not None:
+            parent._invalidate_buffer()
 
     @abstractmethod
     def update(self, strategy: "SupervisedTemplate", **kwargs):
@@ -66,11 +86,24 @@ class ExemplarsBuffer(ABC):
 
 
 class ReservoirSamplingBuffer(ExemplarsBuffer):
-    """Buffer updated with reservoir sampling."""
+    """Buffer updated with reservoir sampling.
 
-    def __init__(self, max_size: int):
+    The buffer is stored as a flat table containing, for each pattern, its
+    dataset, its index in the dataset and its weight. After each update, the
+    buffer is rebuilt as a single subset of the concatenation of the
+    datasets it contains patterns from, so that its depth doesn't grow with
+    the number of updates.
+
+    If a storage is given, the patterns entering the buffer are snapshotted
+    into it, so that the buffer doesn't keep references to the original
+    datasets.
+    """
+
+    def __init__(self, max_size: int, storage: ExemplarStore = None):
         """
         :param max_size:
+        :param storage: the storage of the patterns. Defaults to None, which
+            means that the patterns of the original datasets are used.
         """
         # The algorithm follows
         # https://en.wikipedia.org/wiki/Reservoir_sampling
@@ -79,9 +112,19 @@ class ReservoirSamplingBuffer(ExemplarsBuffer):
         # This is equivalent to a random selection of `size_samples`
         # from the entire stream.
         super().__init__(max_size)
+        self.storage = storage
         # INVARIANT: _buffer_weights is always sorted.
         self._buffer_weights = torch.zeros(0)
 
+        self._datasets: List[AvalancheDataset] = []
+        """ The datasets containing the patterns of the buffer. """
+
+        self._dataset_ids = torch.zeros(0, dtype=torch.long)
+        """ The dataset (in `_datasets`) of each pattern of the buffer. """
+
+        self._dataset_indices = torch.zeros(0, dtype=torch.long)
+        """ The index of each pattern of the buffer in its dataset. """
+
     def update(self, strategy: "SupervisedTemplate", **kwargs):
         """Update buffer."""
         self.update_from_dataset(strategy.experience.dataset)
@@ -93,22 +136,74 @@ class ReservoirSamplingBuffer(ExemplarsBuffer):
         :return:
         """
         new_weights = torch.rand(len(new_data))
+        new_indices = torch.arange(len(new_data))
+        if 0 < self.max_size <= len(self._buffer_weights):
+            # Only the new patterns weighing more than the lightest pattern
+            # of the (full) buffer can enter it.
+            candidates = new_weights > self._buffer_weights[-1]
+            new_weights = new_weights[candidates]
+            new_indices = new_indices[candidates]
 
         cat_weights = torch.cat([new_weights, self._buffer_weights])
-        cat_data = AvalancheConcatDataset([new_data, self.buffer])
-        sorted_weights, sorted_idxs = cat_weights.sort(descending=True)
+        cat_ids = torch.cat(
+            [
+                torch.full(
+                    (len(new_weights),), len(self._datasets), dtype=torch.long
+                ),
+                self._dataset_ids,
+            ]
+        )
+        cat_indices = torch.cat([new_indices, self._dataset_indices])
+        top_weights, top = cat_weights.topk(
+            min(self.max_size, len(cat_weights))
+        )
 
-        buffer_idxs = sorted_idxs[: self.max_size]
-        self.buffer = AvalancheSubset(cat_data, buffer_idxs)
-        self._buffer_weights = sorted_weights[: self.max_size]
+        self._datasets.append(new_data)
+        self._set_table(cat_ids[top], cat_indices[top], top_weights)
 
     def resize(self, strategy, new_size):
         """Update the maximum size of the buffer."""
         self.max_size = new_size
         if len(self.buffer) <= self.max_size:
             return
-        self.buffer = AvalancheSubset(self.buffer, torch.arange(self.max_size))
-        self._buffer_weights = self._buffer_weights[: self.max_size]
+        self._set_table(
+            self._dataset_ids[: self.max_size],
+            self._dataset_indices[: self.max_size],
+            self._buffer_weights[: self.max_size],
+        )
+
+    def _set_table(
+        self, dataset_ids: Tensor, dataset_indices: Tensor, weights: Tensor
+    ):
+        """Sets the content of the buffer and rebuilds `self.buffer`.
+
+        Datasets without patterns in the buffer are dropped.
+        """
+        used_ids = torch.unique(dataset_ids)
+        new_ids = torch.full((len(self._datasets),), -1, dtype=torch.long)
+        new_ids[used_ids] = torch.arange(len(used_ids))
+        self._datasets = [self._datasets[i] for i in used_ids.tolist()]
+        self._dataset_ids = new_ids[dataset_ids]
+        self._dataset_indices = dataset_indices
+        self._buffer_weights = weights
+
+        if len(self._datasets) == 0:
+            self.buffer = AvalancheConcatDataset([])
+            return
+        if self.storage is not None:
+            self.buffer = self.storage.store(
+                self._datasets, self._dataset_ids, self._dataset_indices
+            )
+            self._datasets = [self.buffer]
+            self._dataset_ids = torch.zeros(len(self.buffer), dtype=torch.long)
+            self._dataset_indices = torch.arange(len(self.buffer))
+            return
+        lengths = torch.tensor([len(d) for d in self._datasets])
+        offsets = torch.cumsum(lengths, dim=0) - lengths
+        self.buffer = AvalancheSubset(
+            AvalancheConcatDataset(self._datasets),
+            offsets[self._dataset_ids] + self._dataset_indices,
+        )
 
 
 class BalancedExemplarsBuffer(ExemplarsBuffer):
@@ -120,20 +215,33 @@ class BalancedExemplarsBuffer(ExemplarsBuffer):
 
     `self.buffer_groups` is a dictionary that stores each group as a
     separate buffer. The buffers are updated by calling
-    `self.update(strategy)`.
+    `self.update(strategy)`. The concatenation of the groups returned by
+    `self.buffer` is cached until a group is added, removed or updated.
+
+    If a storage (see :class:`ExemplarStore`) is given, the exemplars are
+    snapshotted into it. If the storage has a byte budget, `max_size` is
+    computed from it at each update.
     """
 
     def __init__(
-        self, max_size: int, adaptive_size: bool = True, total_num_groups=None
+        self,
+        max_size: Optional[int],
+        adaptive_size: bool = True,
+        total_num_groups=None,
+        storage: ExemplarStore = None,
     ):
         """
         :param max_size: max number of input samples in the replay memory.
+            Ignored (and can be None) if `storage` has a byte budget.
         :param adaptive_size: True if max_size is divided equally over all
                               observed experiences (keys in replay_mem).
         :param total_num_groups: If adaptive size is False, the fixed number
                                 of groups to divide capacity over.
+        :param storage: the storage of the exemplars. Defaults to None, which
+            means that the patterns of the original datasets are used.
         """
         super().__init__(max_size)
+        self.storage = storage
         self.adaptive_size = adaptive_size
         self.total_num_groups = total_num_groups
         if not self.adaptive_size:
@@ -147,14 +255,31 @@ class BalancedExemplarsBuffer(ExemplarsBuffer):
                 "`adaptive_size=False`."
             )
 
-        self.buffer_groups: Dict[int, ExemplarsBuffer] = {}
-        """ Dictionary of buffers. """
+        self._cached_buffer: Optional[AvalancheDataset] = None
+        self.buffer_groups = {}
+
+    @property
+    def buffer_groups(self) -> Dict[int, ExemplarsBuffer]:
+        """Dictionary of buffers."""
+        return self._buffer_groups
+
+    @buffer_groups.setter
+    def buffer_groups(self, groups: Dict[int, ExemplarsBuffer]):
+        self._buffer_groups = _BufferGroups(self, groups)
+        self._invalidate_buffer()
 
     @property
     def buffer_datasets(self):
         """Return group buffers as a list of `AvalancheDataset`s."""
         return [g.buffer for g in self.buffer_groups.values()]
 
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used by the exemplars in the storage."""
+        return sum(
+            ExemplarStore.nbytes(g.buffer) for g in self.buffer_groups.values()
+        )
+
     def get_group_lengths(self, num_groups):
         """Compute groups lengths given the number of groups `num_groups`."""
         if self.adaptive_size:
@@ -172,9 +297,11 @@ class BalancedExemplarsBuffer(ExemplarsBuffer):
 
     @property
     def buffer(self):
-        return AvalancheConcatDataset(
-            [g.buffer for g in self.buffer_groups.values()]
-        )
+        if self._cached_buffer is None:
+            self._cached_buffer = AvalancheConcatDataset(
+                [g.buffer for g in self.buffer_groups.values()]
+            )
+        return self._cached_buffer
 
     @buffer.setter
     def buffer(self, new_buffer):
@@ -200,6 +327,85 @@ class BalancedExemplarsBuffer(ExemplarsBuffer):
         for ll, buffer in zip(lens, self.buffer_groups.values()):
             buffer.resize(strategy, ll)
 
+    def _invalidate_buffer(self):
+        self._cached_buffer = None
+        self._notify_parent()
+
+    def _has_byte_budget(self) -> bool:
+        return self.storage is not None and self.storage.max_bytes is not None
+
+    def _update_max_size(self, new_data: AvalancheDataset):
+        """Computes `max_size` from the byte budget of the storage, if any."""
+        if self._has_byte_budget():
+            self.max_size = self.storage.capacity(new_data)
+
+    def _fit_byte_budget(self, strategy: "SupervisedTemplate"):
+        """Shrinks the buffers until they fit in the byte budget of the
+        storage, if any. Needed when the size of the encoded patterns varies
+        (for instance, with JPEG encoding)."""
+        if not self._has_byte_budget():
+            return
+        while self.max_size > 0 and self.nbytes > self.storage.max_bytes:
+            excess = self.nbytes - self.storage.max_bytes
+            n_removed = math.ceil(excess / self.storage.bytes_per_pattern)
+            self.resize(strategy, max(0, self.max_size - n_removed))
+
+
+class _BufferGroups(dict):
+    """The groups of a :class:`BalancedExemplarsBuffer`.
+
+    Adding or removing a group invalidates the cached buffer of the owner.
+    The groups notify the owner when their content changes.
+    """
+
+    def __init__(self, owner: BalancedExemplarsBuffer, groups=()):
+        super().__init__()
+        self._owner = owner
+        self.update(groups)
+
+    def __setitem__(self, key, group: ExemplarsBuffer):
+        # When unpickling, the items are restored before the owner. The
+        # groups keep their own reference to the owner.
+        owner = getattr(self, "_owner", None)
+        if owner is None:
+            return super().__setitem__(key, group)
+
+        old_group = self.get(key, None)
+        if old_group is not None and old_group is not group:
+            old_group._parent = None
+        group._parent = owner
+        super().__setitem__(key, group)
+        owner._invalidate_buffer()
+
+    def __delitem__(self, key):
+        self[key]._parent = None
+        super().__delitem__(key)
+        self._owner._invalidate_buffer()
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        group = self[key]
+        del self[key]
+        return group
+
+    def popitem(self):
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def clear(self):
+        for key in list(self.keys()):
+            del self[key]
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, group in dict(*args, **kwargs).items():
+            self[key] = group
+
 
 class ExperienceBalancedBuffer(BalancedExemplarsBuffer):
     """Rehearsal buffer with samples balanced over experiences.
@@ -210,29 +416,37 @@ class ExperienceBalancedBuffer(BalancedExemplarsBuffer):
     """
 
     def __init__(
-        self, max_size: int, adaptive_size: bool = True, num_experiences=None
+        self,
+        max_size: Optional[int],
+        adaptive_size: bool = True,
+        num_experiences=None,
+        storage: ExemplarStore = None,
     ):
         """
         :param max_size: max number of total input samples in the replay
-            memory.
+            memory. Ignored (and can be None) if `storage` has a byte budget.
         :param adaptive_size: True if mem_size is divided equally over all
                               observed experiences (keys in replay_mem).
         :param num_experiences: If adaptive size is False, the fixed number
                                 of experiences to divide capacity over.
+        :param storage: the storage of the exemplars (see
+            :class:`ExemplarStore`). Defaults to None.
         """
-        super().__init__(max_size, adaptive_size, num_experiences)
+        super().__init__(max_size, adaptive_size, num_experiences, storage)
 
     def update(self, strategy: "SupervisedTemplate", **kwargs):
         new_data = strategy.experience.dataset
         num_exps = strategy.clock.train_exp_counter + 1
+        self._update_max_size(new_data)
         lens = self.get_group_lengths(num_exps)
 
-        new_buffer = ReservoirSamplingBuffer(lens[-1])
+        new_buffer = ReservoirSamplingBuffer(lens[-1], self.storage)
         new_buffer.update_from_dataset(new_data)
         self.buffer_groups[num_exps - 1] = new_buffer
 
         for ll, b in zip(lens, self.buffer_groups.values()):
             b.resize(strategy, ll)
+        self._fit_byte_budget(strategy)
 
 
 class ClassBalancedBuffer(BalancedExemplarsBuffer):
@@ -249,23 +463,27 @@ class ClassBalancedBuffer(BalancedExemplarsBuffer):
 
     def __init__(
         self,
-        max_size: int,
+        max_size: Optional[int],
         adaptive_size: bool = True,
         total_num_classes: int = None,
+        storage: ExemplarStore = None,
     ):
         """
-        :param max_size: The max capacity of the replay memory.
+        :param max_size: The max capacity of the replay memory. Ignored (and
+            can be None) if `storage` has a byte budget.
         :param adaptive_size: True if mem_size is divided equally over all
                             observed experiences (keys in replay_mem).
         :param total_num_classes: If adaptive size is False, the fixed number
                                   of classes to divide capacity over.
+        :param storage: the storage of the exemplars (see
+            :class:`ExemplarStore`). Defaults to None.
         """
         if not adaptive_size:
             assert (
                 total_num_classes > 0
             ), """When fixed exp mem size, total_num_classes should be > 0."""
 
-        super().__init__(max_size, adaptive_size, total_num_classes)
+        super().__init__(max_size, adaptive_size, total_num_classes, storage)
         self.adaptive_size = adaptive_size
         self.total_num_classes = total_num_classes
         self.seen_classes = set()
@@ -274,11 +492,7 @@ class ClassBalancedBuffer(BalancedExemplarsBuffer):
         new_data = strategy.experience.dataset
 
         # Get sample idxs per class
-        cl_idxs = {}
-        for idx, target in enumerate(new_data.targets):
-            if target not in cl_idxs:
-                cl_idxs[target] = []
-            cl_idxs[target].append(idx)
+        cl_idxs = new_data.statistics.indices_by_class()
 
         # Make AvalancheSubset per class
         cl_datasets = {}
@@ -289,6 +503,7 @@ class ClassBalancedBuffer(BalancedExemplarsBuffer):
         self.seen_classes.update(cl_datasets.keys())
 
         # associate lengths to classes
+        self._update_max_size(new_data)
         lens = self.get_group_lengths(len(self.seen_classes))
         class_to_len = {}
         for class_id, ll in zip(self.seen_classes, lens):
@@ -302,7 +517,7 @@ class ClassBalancedBuffer(BalancedExemplarsBuffer):
                 old_buffer_c.update_from_dataset(new_data_c)
                 old_buffer_c.resize(strategy, ll)
             else:
-                new_buffer = ReservoirSamplingBuffer(ll)
+                new_buffer = ReservoirSamplingBuffer(ll, self.storage)
                 new_buffer.update_from_dataset(new_data_c)
                 self.buffer_groups[class_id] = new_buffer
 
@@ -311,6 +526,7 @@ class ClassBalancedBuffer(BalancedExemplarsBuffer):
             self.buffer_groups[class_id].resize(
                 strategy, class_to_len[class_id]
             )
+        self._fit_byte_budget(strategy)
 
 
 class ParametricBuffer(BalancedExemplarsBuffer):
@@ -319,18 +535,22 @@ class ParametricBuffer(BalancedExemplarsBuffer):
 
     def __init__(
         self,
-        max_size: int,
+        max_size: Optional[int],
         groupby=None,
         selection_strategy: Optional["ExemplarsSelectionStrategy"] = None,
+        storage: ExemplarStore = None,
     ):
         """
-        :param max_size: The max capacity of the replay memory.
+        :param max_size: The max capacity of the replay memory. Ignored (and
+            can be None) if `storage` has a byte budget.
         :param groupby: Grouping mechanism. One of {None, 'class', 'task',
         'experience'}.
         :param selection_strategy: The strategy used to select exemplars to
                                    keep in memory when cutting it off.
+        :param storage: the storage of the exemplars (see
+            :class:`ExemplarStore`). Defaults to None.
         """
-        super().__init__(max_size)
+        super().__init__(max_size, storage=storage)
         assert groupby in {None, "task", "class", "experience"}, (
             "Unknown grouping scheme. Must be one of {None, 'task', "
             "'class', 'experience'}"
@@ -347,6 +567,7 @@ class ParametricBuffer(BalancedExemplarsBuffer):
         self.seen_groups.update(new_groups.keys())
 
         # associate lengths to classes
+        self._update_max_size(new_data)
         lens = self.get_group_lengths(len(self.seen_groups))
         group_to_len = {}
         for group_id, ll in zip(self.seen_groups, lens):
@@ -361,7 +582,7 @@ class ParametricBuffer(BalancedExemplarsBuffer):
                 old_buffer_g.resize(strategy, ll)
             else:
                 new_buffer = _ParametricSingleBuffer(
-                    ll, self.selection_strategy
+                    ll, self.selection_strategy, self.storage
                 )
                 new_buffer.update_from_dataset(strategy, new_data_g)
                 self.buffer_groups[group_id] = new_buffer
@@ -371,6 +592,7 @@ class ParametricBuffer(BalancedExemplarsBuffer):
             self.buffer_groups[group_id].resize(
                 strategy, group_to_len[group_id]
             )
+        self._fit_byte_budget(strategy)
 
     def _make_groups(self, strategy, data):
         """Split the data by group according to `self.groupby`."""
@@ -387,11 +609,7 @@ class ParametricBuffer(BalancedExemplarsBuffer):
 
     def _split_by_class(self, data):
         # Get sample idxs per class
-        class_idxs = {}
-        for idx, target in enumerate(data.targets):
-            if target not in class_idxs:
-                class_idxs[target] = []
-            class_idxs[target].append(idx)
+        class_idxs = data.statistics.indices_by_class()
 
         # Make AvalancheSubset per class
         new_groups = {}
@@ -422,15 +640,18 @@ class _ParametricSingleBuffer(ExemplarsBuffer):
         self,
         max_size: int,
         selection_strategy: Optional["ExemplarsSelectionStrategy"] = None,
+        storage: ExemplarStore = None,
     ):
         """
         :param max_size: The max capacity of the replay memory.
         :param selection_strategy: The strategy used to select exemplars to
                                    keep in memory when cutting it off.
+        :param storage: the storage of the exemplars. Defaults to None.
         """
         super().__init__(max_size)
         ss = selection_strategy or RandomExemplarsSelectionStrategy()
         self.selection_strategy = ss
+        self.storage = storage
         self._curr_strategy = None
 
     def update(self, strategy: "SupervisedTemplate", **kwargs):
@@ -438,15 +659,319 @@ class _ParametricSingleBuffer(ExemplarsBuffer):
         self.update_from_dataset(strategy, new_data)
 
     def update_from_dataset(self, strategy, new_data):
-        self.buffer = AvalancheConcatDataset([self.buffer, new_data])
-        self.resize(strategy, self.max_size)
+        old_buffer = self.buffer
+        self.buffer = AvalancheConcatDataset([old_buffer, new_data])
+        if self.storage is None:
+            self.resize(strategy, self.max_size)
+            return
+
+        # Stored exemplars are kept as they are, selected new patterns are
+        # snapshotted.
+        idxs = torch.as_tensor(self._select(strategy), dtype=torch.long)
+        is_new = (idxs >= len(old_buffer)).long()
+        self.buffer = self.storage.store(
+            [old_buffer, new_data], is_new, idxs - is_new * len(old_buffer)
+        )
 
     def resize(self, strategy, new_size: int):
         self.max_size = new_size
+        idxs = self._select(strategy)
+        if self.storage is None:
+            self.buffer = AvalancheSubset(self.buffer, idxs)
+        else:
+            self.buffer = self.storage.store(
+                [self.buffer], torch.zeros(len(idxs)), idxs
+            )
+
+    def _select(self, strategy) -> List[int]:
         idxs = self.selection_strategy.make_sorted_indices(
             strategy=strategy, data=self.buffer
         )
-        self.buffer = AvalancheSubset(self.buffer, idxs[: self.max_size])
+        return idxs[: self.max_size]
+
+
+class MemoryMappedBuffer(ExemplarsBuffer):
+    """Buffer whose patterns are stored in memory-mapped files.
+
+    The patterns (after the frozen transformations of the datasets), their
+    targets and their task labels are stored in a preallocated array of
+    `max_size` slots, in the format of :class:`MemoryMappedDataset`. The
+    buffer is updated with reservoir sampling, either on the whole buffer
+    or separately for each class (as in :class:`ClassBalancedBuffer`). An
+    update only overwrites the slots of the replaced patterns. Replayed
+    patterns are read from the page cache without copying them and only
+    the non-frozen transformations are applied on the fly. The
+    transformations are the ones of the last dataset used to update the
+    buffer.
+
+    The state of the buffer is stored in the same directory, so that a
+    buffer can be resumed from an existing directory.
+    """
+
+    WEIGHTS_FILE = "weights.npy"
+
+    def __init__(
+        self,
+        max_size: int,
+        path: str,
+        groupby: Optional[str] = None,
+        dtype: Optional[torch.dtype] = None,
+        batch_size: int = 256,
+        num_workers: int = 0,
+    ):
+        """
+        :param max_size: max number of input samples in the replay memory.
+        :param path: the directory containing the buffer files. If it
+            contains a buffer already, the buffer is resumed from it. In
+            this case, `max_size` can't exceed the size of the stored
+            buffer.
+        :param groupby: Grouping mechanism. One of {None, 'class'}. With
+            'class', the slots are equally divided over the observed
+            classes.
+        :param dtype: the dtype used to store the X values. Defaults to
+            None, which means that the dtype of the transformed X values
+            will be used.
+        :param batch_size: the number of patterns written at once.
+        :param num_workers: the number of processes used to load the
+            patterns written to the buffer.
+        """
+        super().__init__(max_size)
+        assert groupby in {None, "class"}, (
+            "Unknown grouping scheme. Must be one of {None, 'class'}"
+        )
+        self.path = path
+        self.groupby = groupby
+        self.dtype = dtype
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.seen_groups = set()
+        self._template: Optional[AvalancheDataset] = None
+
+        self._data: Optional[np.ndarray] = None
+        self._targets: Optional[np.ndarray] = None
+        self._task_labels: Optional[np.ndarray] = None
+        self._weights: Optional[np.ndarray] = None
+        """ The reservoir weight of each slot, -1 for empty slots. """
+
+        metadata = MemoryMappedDataset.read_metadata(path)
+        if metadata is not None:
+            self._resume(metadata)
+
+    def update(self, strategy: "SupervisedTemplate", **kwargs):
+        """Update buffer."""
+        self.update_from_dataset(strategy.experience.dataset)
+
+    def update_from_dataset(self, new_data: AvalancheDataset):
+        """Update the buffer using the given dataset.
+
+        :param new_data:
+        :return:
+        """
+        if len(new_data) == 0:
+            return
+        new_weights = torch.rand(len(new_data)).numpy()
+        if self.groupby == "class":
+            new_groups = as_int_array(new_data.targets)
+            if new_groups is None:
+                new_groups = np.asarray(list(new_data.targets))
+            new_groups = new_groups.astype(np.int64)
+        else:
+            new_groups = np.zeros(len(new_data), dtype=np.int64)
+        self.seen_groups.update(np.unique(new_groups).tolist())
+
+        if self._data is None:
+            self._allocate(new_data)
+
+        slots = (self._weights >= 0).nonzero()[0]
+        keep = self._select(
+            np.concatenate([self._slot_groups(slots), new_groups]),
+            np.concatenate([self._weights[slots], new_weights]),
+        )
+        keep_slots, keep_new = keep[: len(slots)], keep[len(slots):]
+        self._free(slots[~keep_slots])
+
+        new_indices = keep_new.nonzero()[0]
+        free_slots = (self._weights < 0).nonzero()[0][: len(new_indices)]
+        self._write(new_data, new_indices, free_slots)
+        self._weights[free_slots] = new_weights[new_indices]
+        self._template = new_data
+        self._flush()
+
+    def resize(self, strategy, new_size):
+        """Update the maximum size of the buffer."""
+        if self._data is not None and new_size > len(self._data):
+            raise ValueError(
+                "The buffer can't grow beyond {} patterns".format(
+                    len(self._data)
+                )
+            )
+        self.max_size = new_size
+        if self._data is None:
+            return
+        slots = (self._weights >= 0).nonzero()[0]
+        keep = self._select(self._slot_groups(slots), self._weights[slots])
+        self._free(slots[~keep])
+        self._flush()
+
+    def _group_quotas(self, groups: np.ndarray) -> np.ndarray:
+        """The number of slots of each (sorted) group."""
+        quotas = np.full(len(groups), self.max_size // len(groups))
+        quotas[: self.max_size - quotas.sum()] += 1
+        return quotas
+
+    def _select(self, groups: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Returns the mask of the patterns with the highest weights of each
+        group, according to the quotas of the groups."""
+        seen = np.array(sorted(self.seen_groups), dtype=np.int64)
+        quotas = self._group_quotas(seen)
+
+        # Sort by group and by decreasing weight, then rank each pattern
+        # within its group.
+        order = np.lexsort((-weights, groups))
+        sorted_groups = groups[order]
+        rank = np.arange(len(order)) - np.searchsorted(
+            sorted_groups, sorted_groups, side="left"
+        )
+        keep = np.zeros(len(order), dtype=bool)
+        keep[order] = rank < quotas[np.searchsorted(seen, sorted_groups)]
+        return keep
+
+    def _slot_groups(self, slots: np.ndarray) -> np.ndarray:
+        if self.groupby == "class":
+            return np.asarray(self._targets[slots], dtype=np.int64)
+        return np.zeros(len(slots), dtype=np.int64)
+
+    def _free(self, slots: np.ndarray):
+        # The removed slots are marked as empty on disk before being
+        # overwritten, so that an interrupted update leaves a consistent
+        # buffer.
+        self._weights[slots] = -1
+        self._weights.flush()
+
+    @torch.no_grad()
+    def _write(
+        self, dataset: AvalancheDataset, indices: np.ndarray, slots: np.ndarray
+    ):
+        if len(indices) == 0:
+            return
+        # Only the frozen transformations are applied
+        loader = DataLoader(
+            AvalancheSubset(dataset, indices.tolist()).replace_transforms(
+                None, None
+            ),
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            collate_fn=default_collate,
+        )
+        offset = 0
+        for mbatch in loader:
+            x = torch.as_tensor(mbatch[0]).numpy()
+            if x.shape[1:] != self._data.shape[1:]:
+                raise ValueError(
+                    "Patterns must have the same shape, found {} and "
+                    "{}".format(self._data.shape[1:], x.shape[1:])
+                )
+            batch_slots = slots[offset:offset + len(x)]
+            self._data[batch_slots] = x
+            self._targets[batch_slots] = torch.as_tensor(mbatch[1]).numpy()
+            self._task_labels[batch_slots] = torch.as_tensor(
+                mbatch[-1]
+            ).numpy()
+            offset += len(x)
+
+    def _flush(self):
+        self._data.flush()
+        self._targets.flush()
+        self._task_labels.flush()
+        self._weights.flush()
+        self._write_metadata()
+        self._refresh_buffer()
+
+    def _refresh_buffer(self):
+        slots = (self._weights >= 0).nonzero()[0]
+        if len(slots) == 0:
+            self.buffer = AvalancheConcatDataset([])
+            return
+        stored = MemoryMappedDataset(self.path)
+        if self._template is not None:
+            all_slots = self._template._with_stored_patterns(
+                stored, stored.targets, stored.targets_task_labels
+            )
+        else:
+            all_slots = AvalancheDataset(
+                stored,
+                targets=stored.targets,
+                task_labels=stored.targets_task_labels,
+            )
+        self.buffer = AvalancheSubset(all_slots, slots.tolist())
+
+    def _allocate(self, dataset: AvalancheDataset):
+        x = dataset.replace_transforms(None, None)[0][0]
+        x = torch.as_tensor(x)
+        dtype = x.dtype if self.dtype is None else self.dtype
+        os.makedirs(self.path, exist_ok=True)
+        self._data = np.lib.format.open_memmap(
+            os.path.join(self.path, MemoryMappedDataset.DATA_FILE),
+            mode="w+",
+            dtype=torch.empty((), dtype=dtype).numpy().dtype,
+            shape=(self.max_size,) + tuple(x.shape),
+        )
+        self._targets, self._task_labels, self._weights = [
+            np.lib.format.open_memmap(
+                os.path.join(self.path, file_name),
+                mode="w+",
+                dtype=np_dtype,
+                shape=(self.max_size,),
+            )
+            for file_name, np_dtype in [
+                (MemoryMappedDataset.TARGETS_FILE, np.int64),
+                (MemoryMappedDataset.TASK_LABELS_FILE, np.int64),
+                (MemoryMappedBuffer.WEIGHTS_FILE, np.float32),
+            ]
+        ]
+        self._weights[:] = -1
+
+    def _resume(self, metadata: dict):
+        if metadata.get("groupby", None) != self.groupby:
+            raise ValueError(
+                "The buffer in {} uses a different grouping".format(self.path)
+            )
+        if metadata["length"] < self.max_size:
+            raise ValueError(
+                "The buffer in {} can store only {} patterns".format(
+                    self.path, metadata["length"]
+                )
+            )
+        self._data, self._targets, self._task_labels, self._weights = [
+            np.load(os.path.join(self.path, file_name), mmap_mode="r+")
+            for file_name in [
+                MemoryMappedDataset.DATA_FILE,
+                MemoryMappedDataset.TARGETS_FILE,
+                MemoryMappedDataset.TASK_LABELS_FILE,
+                MemoryMappedBuffer.WEIGHTS_FILE,
+            ]
+        ]
+        self.seen_groups = set(metadata["seen_groups"])
+        if self.max_size < metadata["length"]:
+            self.resize(None, self.max_size)
+        else:
+            self._refresh_buffer()
+
+    def _write_metadata(self):
+        metadata = {
+            "length": len(self._data),
+            "shape": list(self._data.shape),
+            "dtype": self._data.dtype.str,
+            "fingerprint": None,
+            "groupby": self.groupby,
+            "seen_groups": sorted(self.seen_groups),
+        }
+        metadata_path = os.path.join(
+            self.path, MemoryMappedDataset.METADATA_FILE
+        )
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
 
 
 class ExemplarsSelectionStrategy(ABC):
@@ -478,23 +1003,104 @@ class RandomExemplarsSelectionStrategy(ExemplarsSelectionStrategy):
 
 
 class FeatureBasedExemplarsSelectionStrategy(ExemplarsSelectionStrategy, ABC):
-    """Base class to select exemplars from their features"""
+    """Base class to select exemplars from their features.
+
+    Features are extracted in mini-batches of `strategy.eval_mb_size`
+    patterns. They are cached as long as the model is not trained (that is,
+    until the number of training iterations of the strategy changes): the
+    features of subsets and concatenations of datasets whose features are
+    cached (such as the buffers resized by :class:`ParametricBuffer`) are not
+    extracted again.
+    """
 
     def __init__(self, model: Module, layer_name: str):
         self.feature_extractor = FeatureExtractorBackbone(model, layer_name)
 
+        self._features_cache: Dict[int, Tuple[Dataset, Tensor]] = dict()
+        """
+        The cached features, keyed by the id of the dataset (the dataset is
+        kept in the cache, so that its id is not reused).
+        """
+
+        self._features_cache_version = None
+
     @torch.no_grad()
     def make_sorted_indices(
         self, strategy: "SupervisedTemplate", data: AvalancheDataset
     ) -> List[int]:
+        features = self.get_features(strategy, data)
+        return self.make_sorted_indices_from_features(features)
+
+    @torch.no_grad()
+    def get_features(
+        self, strategy: "SupervisedTemplate", data: AvalancheDataset
+    ) -> Tensor:
+        """
+        Returns the features of the patterns of a dataset, using the cached
+        ones when possible.
+
+        :param strategy: the strategy, used to get the device and the
+            mini-batch size.
+        :param data: the dataset.
+        :return: the features, as a tensor with one row for each pattern.
+        """
+        version = (id(strategy), strategy.clock.train_iterations)
+        if version != self._features_cache_version:
+            self._features_cache = dict()
+            self._features_cache_version = version
+
+        features = self._cached_features(data)
+        if features is None and self._is_partially_cached(data):
+            # Only the datasets without cached features are processed
+            features = cat(
+                [self.get_features(strategy, d) for d in data._dataset_list]
+            )
+        if features is None:
+            features = self._extract_features(strategy, data)
+        self._features_cache[id(data)] = (data, features)
+        return features
+
+    def _cached_features(self, data) -> Optional[Tensor]:
+        entry = self._features_cache.get(id(data), None)
+        if entry is not None:
+            return entry[1]
+        if not _is_plain_view(data):
+            return None
+
+        if isinstance(data, AvalancheSubset):
+            features = self._cached_features(data._original_dataset)
+            if features is None or data._indices is None:
+                return features
+            indices = torch.as_tensor(
+                as_int_array(data._indices), device=features.device
+            )
+            return features[indices]
+
+        if isinstance(data, AvalancheConcatDataset):
+            features = [self._cached_features(d) for d in data._dataset_list]
+            if len(features) == 0 or any(f is None for f in features):
+                return None
+            return cat(features)
+        return None
+
+    def _is_partially_cached(self, data) -> bool:
+        return (
+            isinstance(data, AvalancheConcatDataset)
+            and _is_plain_view(data)
+            and any(
+                self._cached_features(d) is not None
+                for d in data._dataset_list
+            )
+        )
+
+    def _extract_features(self, strategy, data) -> Tensor:
         self.feature_extractor.eval()
-        features = cat(
+        return cat(
             [
                 self.feature_extractor(x.to(strategy.device))
                 for x, *_ in DataLoader(data, batch_size=strategy.eval_mb_size)
             ]
         )
-        return self.make_sorted_indices_from_features(features)
 
     @abstractmethod
     def make_sorted_indices_from_features(self, features: Tensor) -> List[int]:
@@ -511,28 +1117,12 @@ class HerdingSelectionStrategy(FeatureBasedExemplarsSelectionStrategy):
     It is a greedy algorithm, that select the remaining exemplar that get
     the center of already selected exemplars as close as possible as the
     center of all elements (in the feature space).
+
+    See :func:`herding_selection`.
     """
 
     def make_sorted_indices_from_features(self, features: Tensor) -> List[int]:
-        selected_indices = []
-
-        center = features.mean(dim=0)
-        current_center = center * 0
-
-        for i in range(len(features)):
-            # Compute distances with real center
-            candidate_centers = current_center * i / (i + 1) + features / (
-                i + 1
-            )
-            distances = pow(candidate_centers - center, 2).sum(dim=1)
-            distances[selected_indices] = inf
-
-            # Select best candidate
-            new_index = distances.argmin().tolist()
-            selected_indices.append(new_index)
-            current_center = candidate_centers[new_index]
-
-        return selected_indices
+        return herding_selection(features).tolist()
 
 
 class ClosestToCenterSelectionStrategy(FeatureBasedExemplarsSelectionStrategy):
@@ -546,6 +1136,62 @@ class ClosestToCenterSelectionStrategy(FeatureBasedExemplarsSelectionStrategy):
         return distances.argsort()
 
 
+def _is_plain_view(data) -> bool:
+    """Checks if the patterns of a dataset are the ones of the datasets it
+    wraps, that is if it doesn't have its own transformations."""
+    return isinstance(data, AvalancheDataset) and not (
+        data._has_own_transformations()
+    )
+
+
+@torch.no_grad()
+def herding_selection(
+    features: Tensor, n_selected: Optional[int] = None
+) -> Tensor:
+    """
+    Herding selection, as described in iCaRL.
+
+    Greedily selects the pattern that brings the mean of the features of the
+    selected patterns as close as possible to the mean of all the features.
+    Each pattern is selected at most once.
+
+    The squared distance obtained by adding the pattern `j` to the `i`
+    selected patterns (with sum `s`) is, up to terms that don't depend on
+    `j`, `||f_j||^2 + 2 <f_j, s - (i + 1) * center>`. The dot products with
+    `s` are updated with a matrix-vector product at each step, so that the
+    selection of `k` patterns costs O(n * k * d).
+
+    :param features: the features of the `n` patterns. Features with more
+        than one dimension are flattened.
+    :param n_selected: the number of patterns to select. Defaults to all the
+        patterns.
+    :return: the indices of the selected patterns, in order of selection.
+    """
+    features = features.flatten(start_dim=1)
+    n = len(features)
+    if n_selected is None:
+        n_selected = n
+    n_selected = min(n_selected, n)
+
+    center = features.mean(dim=0)
+    sq_norms = (features * features).sum(dim=1)
+    center_dots = features @ center
+    sum_dots = torch.zeros_like(sq_norms)
+    selected = torch.zeros(n, dtype=torch.bool, device=features.device)
+    order = torch.empty(n_selected, dtype=torch.long, device=features.device)
+
+    for i in range(n_selected):
+        scores = sq_norms + 2 * (sum_dots - (i + 1) * center_dots)
+        scores.masked_fill_(selected, inf)
+        # Indices are kept as tensors to avoid device synchronizations
+        new_index = scores.argmin().view(1)
+        order[i : i + 1] = new_index
+        selected.index_fill_(0, new_index, True)
+        sum_dots += features @ features.index_select(0, new_index)[0]
+
+    return order
+
+
 __all__ = [
     "ExemplarsBuffer",
     "ReservoirSamplingBuffer",
@@ -553,9 +1199,11 @@ __all__ = [
     "ExperienceBalancedBuffer",
     "ClassBalancedBuffer",
     "ParametricBuffer",
+    "MemoryMappedBuffer",
     "ExemplarsSelectionStrategy",
     "RandomExemplarsSelectionStrategy",
     "FeatureBasedExemplarsSelectionStrategy",
     "HerdingSelectionStrategy",
     "ClosestToCenterSelectionStrategy",
+    "herding_selection",
 ]
@@ -16,6 +16,7 @@ from avalanche.training.plugins import EvaluationPlugin
 from avalanche.training.plugins.evaluation import default_evaluator
 from avalanche.training.losses import ICaRLLossPlugin
 from avalanche.training.plugins.strategy_plugin import SupervisedPlugin
+from avalanche.training.storage_policy import herding_selection
 from torch.nn import Module
 from torch.utils.data import DataLoader
 from avalanche.training.templates.supervised import SupervisedTemplate
@@ -238,47 +239,45 @@ class _ICaRLPlugin(SupervisedPlugin):
         ]
 
         dataset = strategy.experience.dataset
-        targets = torch.tensor(dataset.targets)
+        statistics = dataset.statistics
         for iter_dico in range(nb_cl):
             cd = AvalancheSubset(
-                dataset, torch.where(targets == new_classes[iter_dico])[0]
-            )
-
-            class_patterns, _, _ = next(
-                iter(DataLoader(cd.eval(), batch_size=len(cd)))
-            )
-            class_patterns = class_patterns.to(strategy.device)
+                dataset, statistics.class_patterns(new_classes[iter_dico])
+            ).eval()
 
+            # features are extracted in mini-batches
             with torch.no_grad():
-                mapped_prototypes = strategy.model.feature_extractor(
-                    class_patterns
-                ).detach()
-            D = mapped_prototypes.T
-            D = D / torch.norm(D, dim=0)
-
-            mu = torch.mean(D, dim=1)
-            order = torch.zeros(class_patterns.shape[0])
-            w_t = mu
-
-            i, added, selected = 0, 0, []
-            while not added == nb_protos_cl and i < 1000:
-                tmp_t = torch.mm(w_t.unsqueeze(0), D)
-                ind_max = torch.argmax(tmp_t)
-
-                if ind_max not in selected:
-                    order[ind_max] = 1 + added
-                    added += 1
-                    selected.append(ind_max.item())
+                mapped_prototypes = torch.cat(
+                    [
+                        strategy.model.feature_extractor(
+                            x.to(strategy.device)
+                        ).detach()
+                        for x, *_ in DataLoader(
+                            cd, batch_size=strategy.eval_mb_size
+                        )
+                    ]
+                )
+            D = mapped_prototypes / torch.norm(
+                mapped_prototypes, dim=1, keepdim=True
+            )
 
-                w_t = w_t + mu - D[:, ind_max]
-                i += 1
+            selected = herding_selection(D, nb_protos_cl).cpu()
+            order = torch.zeros(len(cd))
+            order[selected] = torch.arange(1, len(selected) + 1).float()
 
-            pick = (order > 0) * (order < nb_protos_cl + 1) * 1.0
-            self.x_memory.append(class_patterns[torch.where(pick == 1)[0]])
-            self.y_memory.append(
-                [new_classes[iter_dico]] * len(torch.where(pick == 1)[0])
+            # only the selected patterns are loaded
+            pick = torch.where(order > 0)[0]
+            class_patterns, _, _ = next(
+                iter(
+                    DataLoader(
+                        AvalancheSubset(cd, pick.tolist()),
+                        batch_size=len(pick),
+                    )
+                )
             )
-            self.order.append(order[torch.where(pick == 1)[0]])
+            self.x_memory.append(class_patterns.to(strategy.device))
+            self.y_memory.append([new_classes[iter_dico]] * len(pick))
+            self.order.append(order[pick])
 
     def reduce_exemplar_set(self, strategy: SupervisedTemplate):
         tid = strategy.clock.train_exp_counter
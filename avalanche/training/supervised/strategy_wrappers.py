@@ -654,8 +654,9 @@ class EWC(SupervisedTemplate):
         :param keep_importance_data: if True, keep in memory both parameter
                 values and importances for all previous task, for all modes.
                 If False, keep only last parameter values and importances.
-                If mode is `separate`, the value of `keep_importance_data` is
-                set to be True.
+                If mode is `separate`, the penalties of previous experiences
+                are merged into a single one and parameter values and
+                importances are kept only if `keep_importance_data` is True.
         :param train_mb_size: The train minibatch size. Defaults to 1.
         :param train_epochs: The number of training epochs. Defaults to 1.
         :param eval_mb_size: The eval minibatch size. Defaults to 1.
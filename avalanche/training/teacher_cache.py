@@ -0,0 +1,194 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+Cache of the outputs of the frozen models used by distillation plugins.
+"""
+
+import os
+import tempfile
+from typing import Callable, Dict, List, Optional, TypeVar, TYPE_CHECKING
+
+import numpy as np
+import torch
+from torch import Tensor
+
+if TYPE_CHECKING:
+    from .templates.supervised import SupervisedTemplate
+
+TOutputs = TypeVar("TOutputs", Tensor, Dict[str, Tensor])
+
+
+class TeacherOutputCache:
+    """Cache of the outputs of a frozen (teacher) model.
+
+    Distillation plugins (:class:`LwFPlugin`, :class:`LFLPlugin`,
+    :class:`ICaRLLossPlugin`) compute the outputs of the model of the previous
+    experience on every mini-batch. That model doesn't change during an
+    experience, so its outputs can be computed in the first epoch and reused
+    in the following ones.
+
+    Outputs are keyed by the index of the patterns in the training data. The
+    indices are obtained by enabling the `return_indices` option of the data
+    loader of the strategy (see :class:`TaskBalancedDataLoader` and
+    :class:`ReplayDataLoader`). With other data loaders the outputs are
+    always recomputed.
+
+    Beware that, when using random augmentations, the cached outputs refer to
+    the augmented patterns of the first epoch, while the model being trained
+    receives different augmentations in the following epochs.
+    """
+
+    def __init__(
+        self, dtype: Optional[torch.dtype] = None, directory: str = None
+    ):
+        """
+        :param dtype: the type used to store the outputs (for instance,
+            `torch.float16` to halve the memory usage). Outputs are converted
+            back to their original type when retrieved. If None, the
+            original type is used.
+        :param directory: if not None, the outputs are stored in
+            memory-mapped files created in this directory. Otherwise, they
+            are kept in memory.
+        """
+        self.dtype = dtype
+        self.directory = directory
+
+        self._values: Dict[Optional[str], Tensor] = dict()
+        """
+        The stored outputs. Tensor outputs are stored with the None key.
+        """
+
+        self._dtypes: Dict[Optional[str], torch.dtype] = dict()
+        self._filled = torch.zeros(0, dtype=torch.bool)
+        self._files: List[str] = []
+
+    def reset(self):
+        """Empties the cache.
+
+        Must be called when the teacher model or the training data change.
+        """
+        self._values = dict()
+        self._dtypes = dict()
+        self._filled = torch.zeros(0, dtype=torch.bool)
+        for path in self._files:
+            if os.path.exists(path):
+                os.remove(path)
+        self._files = []
+
+    def enable(self, strategy: "SupervisedTemplate") -> bool:
+        """Asks the data loader of the strategy to add the indices of the
+        patterns to the mini-batches.
+
+        Must be called before iterating on the data loader (for instance, in
+        `before_training_epoch`).
+
+        :param strategy: the strategy.
+        :return: True if the data loader supports indices.
+        """
+        if not hasattr(strategy.dataloader, "return_indices"):
+            return False
+        strategy.dataloader.return_indices = True
+        return True
+
+    def get(
+        self,
+        strategy: "SupervisedTemplate",
+        compute_outputs: Callable[[], TOutputs],
+    ) -> TOutputs:
+        """Returns the teacher outputs on the current mini-batch.
+
+        :param strategy: the strategy.
+        :param compute_outputs: computes the outputs on the current
+            mini-batch. It's called only if the outputs of some patterns of
+            the mini-batch are not in the cache. It must return a Tensor or a
+            dictionary of Tensors.
+        :return: the outputs.
+        """
+        if not getattr(strategy.dataloader, "return_indices", False):
+            return compute_outputs()
+
+        # mini-batches have the form <x, y, ..., indices, t>
+        indices = strategy.mbatch[-2].cpu()
+        outputs = self._lookup(indices, strategy.device)
+        if outputs is None:
+            outputs = compute_outputs()
+            self._store(indices, outputs)
+        return outputs
+
+    def _lookup(self, indices: Tensor, device) -> Optional[TOutputs]:
+        if len(indices) == 0 or int(indices.max()) >= len(self._filled):
+            return None
+        if not bool(self._filled[indices].all()):
+            return None
+
+        outputs = {
+            key: values[indices].to(device, self._dtypes[key])
+            for key, values in self._values.items()
+        }
+        if None in outputs:
+            return outputs[None]
+        return outputs
+
+    @torch.no_grad()
+    def _store(self, indices: Tensor, outputs: TOutputs):
+        if isinstance(outputs, Tensor):
+            outputs = {None: outputs}
+
+        self._reserve(int(indices.max()) + 1, outputs)
+        for key, value in outputs.items():
+            self._values[key][indices] = value.detach().to(
+                "cpu", self._values[key].dtype
+            )
+        self._filled[indices] = True
+
+    def _reserve(self, size: int, outputs: Dict[Optional[str], Tensor]):
+        # The storage grows geometrically, as the number of patterns is not
+        # known in advance.
+        capacity = len(self._filled)
+        if size > capacity:
+            capacity = max(size, 2 * capacity)
+            filled = torch.zeros(capacity, dtype=torch.bool)
+            filled[: len(self._filled)] = self._filled
+            self._filled = filled
+
+        for key, value in outputs.items():
+            values = self._values.get(key, None)
+            if values is not None and len(values) == capacity:
+                continue
+
+            new_values = self._allocate(
+                (capacity, *value.shape[1:]),
+                value.dtype if self.dtype is None else self.dtype,
+            )
+            if values is not None:
+                new_values[: len(values)] = values
+            self._values[key] = new_values
+            self._dtypes[key] = value.dtype
+
+    def _allocate(self, shape, dtype: torch.dtype) -> Tensor:
+        if self.directory is None:
+            return torch.zeros(shape, dtype=dtype)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".npy", dir=self.directory)
+        os.close(fd)
+        self._files.append(path)
+        array = np.lib.format.open_memmap(
+            path,
+            mode="w+",
+            dtype=torch.zeros(0, dtype=dtype).numpy().dtype,
+            shape=shape,
+        )
+        return torch.from_numpy(array)
+
+
+__all__ = ["TeacherOutputCache"]
@@ -1,12 +1,17 @@
 import warnings
-from typing import Sequence, Optional, Union
+from typing import Callable, Dict, List, Sequence, Optional, Union
 
 import torch
 from torch.nn import Module
 
 from avalanche.benchmarks import Experience
-from avalanche.core import BasePlugin
-from avalanche.training.utils import trigger_plugins
+from avalanche.core import BasePlugin, BaseSGDPlugin, SupervisedPlugin
+from avalanche.training.utils import (
+    PluginList,
+    callback_functions,
+    implements_callback,
+    trigger_plugins,
+)
 
 
 class BaseTemplate:
@@ -43,6 +48,12 @@ class BaseTemplate:
         self.device = device
         """ PyTorch device where the model will be allocated. """
 
+        self._plugin_callbacks: Dict[str, List[Callable]] = dict()
+        """ Callbacks of each event (computed on first use). """
+
+        self._plugin_callbacks_version = -1
+        """ Version of the plugins list used to compute the callbacks. """
+
         self.plugins = [] if plugins is None else plugins
         """ List of `SupervisedPlugin`s. """
 
@@ -61,6 +72,51 @@ class BaseTemplate:
         self.current_eval_stream = None
         """ Current evaluation stream. """
 
+    @property
+    def plugins(self) -> "PluginList":
+        """List of `SupervisedPlugin`s.
+
+        The plugins are copied into a :class:`PluginList` (unless they are
+        already one), so changes to the sequence given to the strategy are
+        not seen by the strategy. Change `strategy.plugins` instead.
+        """
+        return self._plugins
+
+    @plugins.setter
+    def plugins(self, plugins: Sequence[BasePlugin]):
+        if not isinstance(plugins, PluginList):
+            plugins = PluginList(plugins)
+        self._plugins = plugins
+        # the version of a new list is not related to the cached one
+        self._plugin_callbacks = dict()
+        self._plugin_callbacks_version = -1
+
+    def get_plugin_callbacks(self, event: str) -> List[Callable]:
+        """Returns the callbacks of the plugins to be called on an event.
+
+        Only the plugins overriding the callback of the event are considered
+        (plugins inheriting the empty callback of their base class are
+        skipped). Callbacks are computed the first time an event is
+        triggered and computed again when the list of plugins changes.
+
+        :param event: The name of the event (such as "before_forward").
+        :return: The list of callbacks, as bound methods.
+        """
+        plugins = self._plugins
+        if self._plugin_callbacks_version != plugins.version:
+            self._plugin_callbacks = dict()
+            self._plugin_callbacks_version = plugins.version
+
+        callbacks = self._plugin_callbacks.get(event)
+        if callbacks is None:
+            callbacks = [
+                getattr(p, event)
+                for p in plugins
+                if implements_callback(p, event, _EMPTY_CALLBACKS)
+            ]
+            self._plugin_callbacks[event] = callbacks
+        return callbacks
+
     @property
     def is_eval(self):
         """True if the strategy is in evaluation mode."""
@@ -235,3 +291,9 @@ class BaseTemplate:
 
     def _after_eval_exp(self, **kwargs):
         trigger_plugins(self, "after_eval_exp", **kwargs)
+
+
+# The empty callbacks defined by the base plugin classes
+_EMPTY_CALLBACKS = callback_functions(
+    BasePlugin, BaseSGDPlugin, SupervisedPlugin
+)
@@ -4,6 +4,7 @@ from torch.nn import Module, CrossEntropyLoss
 from torch.optim import Optimizer
 from torch.utils.data import DataLoader
 
+from avalanche.benchmarks.utils import AvalancheDataset
 from avalanche.benchmarks.utils.data_loader import TaskBalancedDataLoader
 from avalanche.models import avalanche_forward
 from avalanche.models.dynamic_optimizers import reset_optimizer
@@ -244,9 +245,15 @@ class SupervisedTemplate(BaseSGDTemplate):
         This allows for arbitrary tensors between y and t.
         Keep in mind that in the most general case mb_task_id is a tensor
         which may contain different labels for each sample.
+        The batch transformations of the adapted dataset are applied
+        after moving the mini-batch to the device.
         """
         assert len(self.mbatch) >= 3
         super()._unpack_minibatch()
+        if isinstance(self.adapted_dataset, AvalancheDataset):
+            self.mbatch = self.adapted_dataset.apply_batch_transforms(
+                self.mbatch
+            )
 
     def eval_dataset_adaptation(self, **kwargs):
         """Initialize `self.adapted_dataset`."""
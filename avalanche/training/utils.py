@@ -15,7 +15,15 @@ General utility functions for pytorch.
 
 """
 from collections import defaultdict
-from typing import NamedTuple, List, Optional, Tuple, Callable
+from typing import (
+    NamedTuple,
+    List,
+    Optional,
+    Tuple,
+    Callable,
+    FrozenSet,
+    Sequence,
+)
 
 import torch
 from torch import Tensor
@@ -28,13 +36,103 @@ from avalanche.models.batch_renorm import BatchRenorm2D
 def trigger_plugins(strategy, event, **kwargs):
     """Call plugins on a specific callback
 
+    Strategies exposing a `get_plugin_callbacks` method (such as the ones
+    based on `BaseTemplate`) provide the precomputed list of callbacks of
+    the event. Otherwise, the callback is looked up on each plugin.
+
     :return:
     """
+    get_plugin_callbacks = getattr(strategy, "get_plugin_callbacks", None)
+    if get_plugin_callbacks is not None:
+        for callback in get_plugin_callbacks(event):
+            callback(strategy, **kwargs)
+        return
+
     for p in strategy.plugins:
         if hasattr(p, event):
             getattr(p, event)(strategy, **kwargs)
 
 
+def callback_functions(*classes) -> FrozenSet[Callable]:
+    """Returns the callbacks (methods whose name starts with "before" or
+    "after") defined by the given classes.
+
+    :param classes: The classes (plugins, metrics, ...).
+    :return: The set of callbacks, as functions.
+    """
+    return frozenset(
+        getattr(cls, name)
+        for cls in classes
+        for name in dir(cls)
+        if name.startswith("before") or name.startswith("after")
+    )
+
+
+def implements_callback(
+    obj, event: str, default_callbacks: FrozenSet[Callable] = frozenset()
+) -> bool:
+    """Checks if an object (plugin, metric, logger, ...) implements a
+    callback.
+
+    :param obj: The object.
+    :param event: The name of the callback (such as "before_forward").
+    :param default_callbacks: The callbacks that are not considered as
+        implemented, usually the empty callbacks of a base class (see
+        `callback_functions`).
+    :return: True if the object implements the callback.
+    """
+    callback = getattr(type(obj), event, None)
+    if callback is None or event in getattr(obj, "__dict__", ()):
+        # Callbacks set on the instance or created dynamically (as done by
+        # the EvaluationPlugin)
+        return hasattr(obj, event)
+    return callback not in default_callbacks
+
+
+class PluginList(list):
+    """A list of plugins (or metrics, loggers, ...) that keeps track of its
+    changes.
+
+    The version number is increased every time the list is changed, so that
+    strategies know when the callbacks of the plugins must be computed again.
+    """
+
+    def __init__(self, plugins: Sequence = ()):
+        super().__init__(plugins)
+        self.version = 0
+
+    def __reduce__(self):
+        return PluginList, (list(self),)
+
+
+def _make_tracking_method(method_name):
+    list_method = getattr(list, method_name)
+
+    def tracking_method(self, *args, **kwargs):
+        self.version += 1
+        return list_method(self, *args, **kwargs)
+
+    tracking_method.__name__ = method_name
+    return tracking_method
+
+
+for _method_name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+):
+    setattr(PluginList, _method_name, _make_tracking_method(_method_name))
+
+
 def load_all_dataset(dataset: Dataset, num_workers: int = 0):
     """
     Retrieves the contents of a whole dataset by using a DataLoader
@@ -0,0 +1,124 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+This simple profiler compares the task-balanced data loading based on one
+DataLoader per task (the previous implementation, reproduced here) with the
+current one, based on a single DataLoader and a balanced batch sampler.
+It reports the number of worker processes, the overall RSS (main process and
+workers) and the number of mini-batches per second.
+"""
+
+import argparse
+import time
+
+import psutil
+import torch
+from torch.utils.data import DataLoader
+
+from avalanche.benchmarks.utils import (
+    AvalancheConcatDataset,
+    AvalancheTensorDataset,
+)
+from avalanche.benchmarks.utils.data_loader import (
+    TaskBalancedDataLoader,
+    _default_collate_mbatches_fn,
+    _split_batch_size,
+)
+
+
+def per_task_loaders(data, batch_size, **kwargs):
+    """The previous implementation: one DataLoader per task."""
+    task_datasets = [data.task_set[t] for t in data.task_set]
+    batch_sizes = _split_batch_size(batch_size, len(task_datasets))
+    loaders = [
+        DataLoader(d, batch_size=bs, **kwargs)
+        for d, bs in zip(task_datasets, batch_sizes)
+    ]
+    iterators = [iter(dl) for dl in loaders]
+    for _ in range(max(len(dl) for dl in loaders)):
+        mbatches = []
+        for tid, it in enumerate(iterators):
+            try:
+                mbatches.append(next(it))
+            except StopIteration:
+                iterators[tid] = iter(loaders[tid])
+                mbatches.append(next(iterators[tid]))
+        yield _default_collate_mbatches_fn(mbatches)
+
+
+def measure(loader_iter):
+    process = psutil.Process()
+    start = time.perf_counter()
+    next(loader_iter)
+    workers = process.children(recursive=True)
+    rss = process.memory_info().rss + sum(
+        w.memory_info().rss for w in workers
+    )
+
+    n_batches = 1
+    for _ in loader_iter:
+        n_batches += 1
+    elapsed = time.perf_counter() - start
+    return len(workers), rss, n_batches / elapsed
+
+
+def main(args):
+    datasets = []
+    for task_label in range(args.n_tasks):
+        x = torch.rand(args.n_samples, 3, 32, 32)
+        y = torch.randint(0, 10, (args.n_samples,))
+        datasets.append(AvalancheTensorDataset(x, y, task_labels=task_label))
+    data = AvalancheConcatDataset(datasets)
+
+    kwargs = dict(num_workers=args.num_workers, shuffle=True)
+    results = {
+        "per-task loaders": measure(
+            per_task_loaders(data, args.batch_size, **kwargs)
+        ),
+        "single loader": measure(
+            iter(
+                TaskBalancedDataLoader(
+                    data, batch_size=args.batch_size, **kwargs
+                )
+            )
+        ),
+    }
+
+    for name, (n_workers, rss, batches_per_s) in results.items():
+        print(
+            f"{name}: {n_workers} worker processes, "
+            f"RSS {rss / 2 ** 20:.1f} MB, {batches_per_s:.1f} batches/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_tasks", type=int, default=10, help="Number of tasks."
+    )
+    parser.add_argument(
+        "--n_samples",
+        type=int,
+        default=5000,
+        help="Number of samples of each task.",
+    )
+    parser.add_argument(
+        "--batch_size", type=int, default=128, help="Mini-batch size."
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=4,
+        help="Number of DataLoader workers.",
+    )
+    args = parser.parse_args()
+    main(args)
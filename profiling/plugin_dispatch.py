@@ -0,0 +1,105 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+This simple profiler measures the per-iteration overhead of triggering
+plugin callbacks during training. A strategy with 10 plugins (each one
+overriding a single callback) is trained on a tiny MLP, first by looking up
+the callbacks on each plugin at each event ("before") and then by using the
+precomputed callbacks of the strategy ("after").
+"""
+
+import argparse
+import time
+
+import torch
+from torch.nn import CrossEntropyLoss
+from torch.optim import SGD
+
+from avalanche.benchmarks.generators import tensors_benchmark
+from avalanche.core import SupervisedPlugin
+from avalanche.models import SimpleMLP
+from avalanche.training.plugins import EvaluationPlugin
+from avalanche.training.supervised import Naive
+
+
+class CountingPlugin(SupervisedPlugin):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def after_training_iteration(self, strategy, **kwargs):
+        self.calls += 1
+
+
+def measure(strategy, experience, n_repeats):
+    best = float("inf")
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        strategy.train(experience)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    x = torch.rand(args.n_samples, 8)
+    y = torch.randint(0, 2, (args.n_samples,))
+    benchmark = tensors_benchmark(
+        train_tensors=[(x, y)], test_tensors=[(x, y)], task_labels=[0]
+    )
+    experience = benchmark.train_stream[0]
+    n_iterations = args.n_samples // args.mb_size
+
+    model = SimpleMLP(num_classes=2, input_size=8, hidden_size=8)
+    strategy = Naive(
+        model,
+        SGD(model.parameters(), lr=0.01),
+        CrossEntropyLoss(),
+        train_mb_size=args.mb_size,
+        plugins=[CountingPlugin() for _ in range(10)],
+        evaluator=EvaluationPlugin(loggers=[]),
+        eval_every=-1,
+    )
+
+    # Disables the precomputed callbacks
+    strategy.get_plugin_callbacks = None
+    before = measure(strategy, experience, args.n_repeats)
+    del strategy.get_plugin_callbacks
+    after = measure(strategy, experience, args.n_repeats)
+
+    print(f"Per-iteration time (before): "
+          f"{before / n_iterations * 1e6:.2f} us")
+    print(f"Per-iteration time (after): "
+          f"{after / n_iterations * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_samples",
+        type=int,
+        default=10000,
+        help="Number of training samples.",
+    )
+    parser.add_argument(
+        "--mb_size",
+        type=int,
+        default=10,
+        help="Training mini-batch size.",
+    )
+    parser.add_argument(
+        "--n_repeats",
+        type=int,
+        default=3,
+        help="Number of repetitions (the best one is reported).",
+    )
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,71 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+This simple profiler measures the time needed to split a large dataset in
+many small experiences, as done by `data_incremental_benchmark` and
+`fixed_size_experience_split_strategy`. Each experience is a subset of a
+(shuffled) subset of the original dataset, which is flattened by composing
+indices and class mappings.
+"""
+
+import argparse
+import time
+
+import torch
+
+from avalanche.benchmarks.utils import (
+    AvalancheDatasetType,
+    AvalancheSubset,
+    AvalancheTensorDataset,
+)
+
+
+def main(args):
+    dataset = AvalancheTensorDataset(
+        torch.zeros(args.n_samples, 1),
+        torch.randint(0, 100, (args.n_samples,)),
+        dataset_type=AvalancheDatasetType.CLASSIFICATION,
+    )
+    class_mapping = torch.randperm(100).tolist()
+
+    start = time.perf_counter()
+    shuffled = AvalancheSubset(
+        dataset,
+        indices=torch.randperm(args.n_samples),
+        class_mapping=class_mapping,
+    )
+    exp_size = args.n_samples // args.n_experiences
+    experiences = [
+        AvalancheSubset(shuffled, indices=range(first, first + exp_size))
+        for first in range(0, args.n_experiences * exp_size, exp_size)
+    ]
+    elapsed = time.perf_counter() - start
+
+    print(f"Created {len(experiences)} experiences in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_samples",
+        type=int,
+        default=1000000,
+        help="Number of samples in the dataset.",
+    )
+    parser.add_argument(
+        "--n_experiences",
+        type=int,
+        default=10000,
+        help="Number of experiences to create.",
+    )
+    args = parser.parse_args()
+    main(args)
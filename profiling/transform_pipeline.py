@@ -0,0 +1,117 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+This simple profiler measures the per-sample overhead of applying a pipeline
+of 3 transformations (2 of them frozen) to the patterns of an
+AvalancheDataset.
+
+The "before" timing replicates the previous approach, where new
+MultiParamTransform wrappers were created for the (nested) frozen Compose
+and for the current transformation on every sample. The "after" timings
+measure the pre-compiled TransformPipeline alone and the full
+AvalancheDataset item retrieval.
+"""
+
+import argparse
+import time
+
+import torch
+
+from avalanche.benchmarks.utils import (
+    AvalancheTensorDataset,
+    Compose,
+    MultiParamTransform,
+    TransformPipeline,
+)
+
+
+def plus_one(x):
+    return x + 1
+
+
+def times_two(x):
+    return x * 2
+
+
+def identity_xy(x, y):
+    return x, y
+
+
+def legacy_apply(frozen_transform, transform, element):
+    # Replicates the previous per-sample transformation procedure
+    element = list(element)
+    element = MultiParamTransform(frozen_transform)(*element)
+    element = MultiParamTransform(transform)(*element)
+    return element
+
+
+def measure(fn, n_samples, n_repeats):
+    best = float("inf")
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        for idx in range(n_samples):
+            fn(idx)
+        best = min(best, time.perf_counter() - start)
+    return best / n_samples
+
+
+def main(args):
+    tensor_x = torch.zeros(args.n_samples, 1)
+    tensor_y = torch.zeros(args.n_samples, dtype=torch.long)
+    elements = [(tensor_x[i], tensor_y[i]) for i in range(args.n_samples)]
+
+    frozen_transform = Compose([Compose([plus_one]), times_two])
+    pipeline = TransformPipeline([frozen_transform, identity_xy])
+
+    dataset = (
+        AvalancheTensorDataset(tensor_x, tensor_y, transform=plus_one)
+        .freeze_transforms()
+        .add_transforms(times_two)
+        .freeze_transforms()
+        .add_transforms(identity_xy)
+    )
+
+    before = measure(
+        lambda idx: legacy_apply(frozen_transform, identity_xy, elements[idx]),
+        args.n_samples,
+        args.n_repeats,
+    )
+    after_pipeline = measure(
+        lambda idx: pipeline(*elements[idx]), args.n_samples, args.n_repeats
+    )
+    after_dataset = measure(
+        lambda idx: dataset[idx], args.n_samples, args.n_repeats
+    )
+
+    print(f"Per-sample MultiParamTransform (before): {before * 1e6:.2f} us")
+    print(f"Pre-compiled TransformPipeline (after): "
+          f"{after_pipeline * 1e6:.2f} us")
+    print(f"AvalancheDataset item retrieval (after): "
+          f"{after_dataset * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_samples",
+        type=int,
+        default=10000,
+        help="Number of samples to transform.",
+    )
+    parser.add_argument(
+        "--n_repeats",
+        type=int,
+        default=5,
+        help="Number of repetitions (the best one is reported).",
+    )
+    args = parser.parse_args()
+    main(args)
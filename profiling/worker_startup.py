@@ -0,0 +1,80 @@
+################################################################################
+# Copyright (c) 2021 ContinualAI.                                              #
+# Copyrights licensed under the MIT License.                                   #
+# See the accompanying LICENSE file for terms.                                 #
+#                                                                              #
+# Date: 16-10-2026                                                             #
+# Author(s): ContinualAI                                                       #
+# E-mail: contact@continualai.org                                              #
+# Website: avalanche.continualai.org                                           #
+################################################################################
+
+"""
+This simple profiler measures the size of the payload sent to DataLoader
+workers and the time needed to obtain the first mini-batch when using the
+"spawn" start method, before and after moving an AvalancheTensorDataset
+backed by NumPy arrays to shared memory.
+"""
+
+import argparse
+import time
+from multiprocessing.reduction import ForkingPickler
+
+import numpy as np
+import torch.multiprocessing  # Registers the Tensor reductions
+from torch.utils.data import DataLoader
+
+from avalanche.benchmarks.utils import (
+    AvalancheDatasetType,
+    AvalancheSubset,
+    AvalancheTensorDataset,
+)
+
+
+def measure(dataset, num_workers):
+    payload_size = len(ForkingPickler.dumps(dataset))
+
+    start = time.perf_counter()
+    loader = DataLoader(
+        dataset,
+        batch_size=32,
+        num_workers=num_workers,
+        multiprocessing_context="spawn",
+    )
+    next(iter(loader))
+    return payload_size, time.perf_counter() - start
+
+
+def main(args):
+    array_x = np.random.rand(args.n_samples, 3, 32, 32).astype(np.float32)
+    array_y = np.random.randint(0, 100, args.n_samples)
+    dataset = AvalancheTensorDataset(
+        array_x, array_y, dataset_type=AvalancheDatasetType.CLASSIFICATION
+    )
+    dataset = AvalancheSubset(dataset, indices=range(args.n_samples // 2))
+
+    before = measure(dataset, args.num_workers)
+    after = measure(dataset.share_memory(), args.num_workers)
+
+    print(f"Pickled payload (before): {before[0] / 2 ** 20:.2f} MB, "
+          f"first batch after {before[1]:.2f} s")
+    print(f"Pickled payload (after): {after[0] / 2 ** 20:.2f} MB, "
+          f"first batch after {after[1]:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_samples",
+        type=int,
+        default=50000,
+        help="Number of samples in the dataset.",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=4,
+        help="Number of DataLoader workers.",
+    )
+    args = parser.parse_args()
+    main(args)
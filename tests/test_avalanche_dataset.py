@@ -1,4 +1,9 @@
+import os
+import pickle
+import tempfile
+import time
 import unittest
+from multiprocessing.reduction import ForkingPickler
 
 from os.path import expanduser
 
@@ -11,10 +16,17 @@ from avalanche.training.supervised import Naive
 from avalanche.benchmarks.generators import dataset_benchmark
 import PIL
 import torch
+import torch.multiprocessing  # Registers the Tensor reductions
 from PIL import ImageChops
 from PIL.Image import Image
 from torch import Tensor
-from torch.utils.data import TensorDataset, Subset, ConcatDataset
+from torch.utils.data import (
+    TensorDataset,
+    Subset,
+    ConcatDataset,
+    DataLoader,
+    Dataset,
+)
 from torchvision.datasets import MNIST
 from torchvision.transforms import (
     ToTensor,
@@ -37,7 +49,15 @@ from avalanche.benchmarks.utils import (
     AvalancheTensorDataset,
     concat_datasets_sequentially,
 )
-from avalanche.benchmarks.utils.dataset_utils import ConstantSequence
+from avalanche.benchmarks.utils.mmap_dataset import MemoryMappedDataset
+from avalanche.benchmarks.utils.sample_cache import (
+    SampleCache,
+    estimate_size,
+)
+from avalanche.benchmarks.utils.dataset_utils import (
+    ConstantSequence,
+    ArraySequence,
+)
 from avalanche.training.utils import load_all_dataset
 import random
 
@@ -1427,6 +1447,41 @@ class AvalancheDatasetTests(unittest.TestCase):
         self.assertFalse(pil_images_equal(x, x4))
         self.assertFalse(pil_images_equal(x2, x3))
 
+    def test_avalanche_subset_flattening_arrays(self):
+        tensor_x = torch.rand(100, 2)
+        tensor_y = torch.arange(100) % 5
+        dataset = AvalancheTensorDataset(
+            tensor_x, tensor_y, dataset_type=AvalancheDatasetType.CLASSIFICATION
+        )
+
+        class_mapping = [2, -1, 0, 1, 3]
+        class_mapping2 = [3, 2, 1, 0]
+        subset = AvalancheSubset(
+            dataset,
+            indices=torch.arange(99, -1, -1),
+            class_mapping=class_mapping,
+        )
+        nested = AvalancheSubset(
+            subset, indices=[0, 1, 2, 3, 50], class_mapping=class_mapping2
+        )
+
+        # Indices and class mappings are composed in compact arrays
+        self.assertIs(dataset, nested._original_dataset)
+        self.assertIsInstance(nested._indices, ArraySequence)
+        self.assertEqual([99, 98, 97, 96, 49], nested._indices)
+        self.assertEqual([1, -1, 3, 2, 0], nested._class_mapping)
+
+        for idx, original_idx in enumerate([99, 98, 97, 96, 49]):
+            x, y, _ = nested[idx]
+            self.assertTrue(torch.equal(tensor_x[original_idx], x))
+            original_y = int(tensor_y[original_idx])
+            self.assertEqual(
+                class_mapping2[class_mapping[original_y]]
+                if class_mapping[original_y] != -1 else -1,
+                y,
+            )
+            self.assertEqual(y, nested.targets[idx])
+
     def test_avalanche_avalanche_subset_concat_stack_overflow(self):
         d_sz = 25
         tensor_x = torch.rand(d_sz, 3, 28, 28)
@@ -1562,6 +1617,491 @@ class AvalancheDatasetTests(unittest.TestCase):
         # test for correctness
         self.assertEqual(classes_all, target_classes)
 
+    def test_avalanche_dataset_getitems(self):
+        tensor_x = torch.rand(200, 3, 28, 28)
+        tensor_y = torch.randint(0, 70, (200,))
+        tensor_t = torch.randint(0, 5, (200,))
+        tensor_x2 = torch.rand(100, 3, 28, 28)
+        tensor_y2 = torch.randint(0, 70, (100,))
+
+        dataset1 = AvalancheTensorDataset(
+            tensor_x, tensor_y, task_labels=tensor_t.tolist()
+        )
+        dataset2 = AvalancheDataset(
+            TensorDataset(tensor_x2, tensor_y2), task_labels=6
+        )
+        class_mapping = list(reversed(range(70)))
+        concat = AvalancheConcatDataset([dataset1, dataset2])
+        subset = AvalancheSubset(
+            concat,
+            indices=torch.randperm(300),
+            class_mapping=class_mapping,
+        )
+
+        for dataset in [dataset1, concat, subset]:
+            indices = [0, 199, 7, len(dataset) - 1, 7, 42]
+            elements = dataset.__getitems__(indices)
+            self.assertEqual(len(indices), len(elements))
+            for idx, element in zip(indices, elements):
+                x, y, t = dataset[idx]
+                x2, y2, t2 = element
+                self.assertTrue(torch.equal(x, x2))
+                self.assertEqual(int(y), int(y2))
+                self.assertEqual(t, t2)
+
+        # Slicing uses the batched path, too
+        x, y, t = subset[10:20]
+        for i, idx in enumerate(range(10, 20)):
+            x2, y2, t2 = subset[idx]
+            self.assertTrue(torch.equal(x[i], x2))
+            self.assertEqual(int(y[i]), int(y2))
+            self.assertEqual(int(t[i]), t2)
+
+        with self.assertRaises(IndexError):
+            concat.__getitems__([0, 300])
+        with self.assertRaises(IndexError):
+            concat.__getitems__([0, -301])
+
+        # Negative indices count from the end
+        elements = concat.__getitems__([0, -1, -101])
+        for idx, element in zip([0, 299, 199], elements):
+            x, y, t = concat[idx]
+            self.assertTrue(torch.equal(x, element[0]))
+            self.assertEqual(t, element[2])
+
+    def test_avalanche_dataset_getitems_transforms(self):
+        class CountingTransform:
+            def __init__(self, supports_batch):
+                self.supports_batch = supports_batch
+                self.calls = 0
+
+            def __call__(self, x):
+                self.calls += 1
+                return x * 2
+
+        tensor_x = torch.rand(50, 3, 28, 28)
+        tensor_y = torch.randint(0, 10, (50,))
+        batch_transform = CountingTransform(True)
+        sample_transform = CountingTransform(False)
+
+        dataset = AvalancheTensorDataset(
+            tensor_x, tensor_y, transform=batch_transform
+        ).freeze_transforms().add_transforms(sample_transform)
+
+        elements = dataset.__getitems__(list(range(10)))
+        self.assertEqual(1, batch_transform.calls)
+        self.assertEqual(10, sample_transform.calls)
+        for idx, (x, y, t) in enumerate(elements):
+            self.assertTrue(torch.allclose(tensor_x[idx] * 4, x))
+            self.assertEqual(int(tensor_y[idx]), int(y))
+            self.assertEqual(0, t)
+
+        mb_x, mb_y, mb_t = next(iter(DataLoader(dataset, batch_size=10)))
+        self.assertTrue(torch.allclose(tensor_x[:10] * 4, mb_x))
+        self.assertTrue(torch.equal(tensor_y[:10], mb_y))
+
+    def test_avalanche_dataset_index_plan(self):
+        tensor_x = torch.rand(200, 3, 28, 28)
+        tensor_y = torch.randint(0, 70, (200,))
+        tensor_t = torch.randint(0, 5, (200,))
+        tensor_x2 = torch.rand(100, 3, 28, 28)
+        tensor_y2 = torch.randint(0, 70, (100,))
+
+        dataset1 = AvalancheTensorDataset(
+            tensor_x,
+            tensor_y,
+            task_labels=tensor_t.tolist(),
+            transform=lambda x: x + 1,
+        ).freeze_transforms()
+        dataset2 = AvalancheDataset(
+            TensorDataset(tensor_x2, tensor_y2),
+            task_labels=6,
+            transform_groups=dict(
+                train=(lambda x: x * 2, None), eval=(lambda x: x * 3, None)
+            ),
+        )
+        class_mapping = list(reversed(range(70)))
+        concat = AvalancheConcatDataset(
+            [dataset1, Subset(dataset2, list(range(50))), dataset2]
+        )
+        subset = AvalancheSubset(
+            concat,
+            indices=torch.randperm(350)[:300],
+            class_mapping=class_mapping,
+            target_transform=lambda y: y + 100,
+        )
+        tree = AvalancheConcatDataset(
+            [subset, AvalancheSubset(dataset1, indices=range(10, 20))]
+        )
+
+        compiled = tree.compile_index_plan()
+        self.assertFalse(tree._use_index_plan)
+        self.assertEqual(len(tree), len(compiled.index_plan))
+        self.assertEqual(len(tree), len(compiled.index_plan.leaf_indices))
+        self.assertEqual(np.int64, compiled.index_plan.leaf_ids.dtype)
+
+        # Derived datasets (with a different plan) use a plan, too
+        derived = AvalancheSubset(compiled.eval(), indices=range(5, 250))
+        self.assertTrue(derived._use_index_plan)
+
+        for reference, dataset in [
+            (tree, compiled),
+            (tree.eval(), compiled.eval()),
+            (AvalancheSubset(tree.eval(), indices=range(5, 250)), derived),
+        ]:
+            indices = list(range(len(dataset)))
+            elements = dataset.__getitems__(indices)
+            for idx in indices:
+                x, y, t = reference[idx]
+                x2, y2, t2 = dataset[idx]
+                x3, y3, t3 = elements[idx]
+                self.assertTrue(torch.equal(x, x2))
+                self.assertTrue(torch.equal(x, x3))
+                self.assertEqual(int(y), int(y2))
+                self.assertEqual(int(y), int(y3))
+                self.assertEqual(t, t2)
+                self.assertEqual(t, t3)
+
+        with self.assertRaises(IndexError):
+            compiled[len(compiled)]
+
+    def test_avalanche_dataset_array_targets(self):
+        tensor_x = torch.rand(200, 3, 28, 28)
+        tensor_y = torch.randint(0, 70, (200,))
+        tensor_t = torch.randint(0, 5, (200,))
+        tensor_x2 = torch.rand(100, 3, 28, 28)
+        tensor_y2 = torch.randint(0, 70, (100,))
+
+        dataset1 = AvalancheTensorDataset(
+            tensor_x, tensor_y, task_labels=tensor_t.tolist()
+        )
+        dataset2 = AvalancheDataset(
+            TensorDataset(tensor_x2, tensor_y2), task_labels=6
+        )
+        class_mapping = list(reversed(range(70)))
+        indices = torch.randperm(300)[:250]
+        subset = AvalancheSubset(
+            AvalancheConcatDataset([dataset1, dataset2]),
+            indices=indices,
+            class_mapping=class_mapping,
+        )
+
+        self.assertIsInstance(subset.targets, ArraySequence)
+        self.assertIsInstance(subset.targets_task_labels, ArraySequence)
+
+        all_y = torch.cat([tensor_y, tensor_y2])
+        all_t = torch.cat([tensor_t, torch.full((100,), 6)])
+        expected_y = [class_mapping[int(all_y[idx])] for idx in indices]
+        expected_t = [int(all_t[idx]) for idx in indices]
+        self.assertListEqual(expected_y, list(subset.targets))
+        self.assertListEqual(expected_t, list(subset.targets_task_labels))
+        self.assertEqual(expected_y, subset.targets)
+        self.assertIsInstance(subset.targets[0], int)
+        self.assertEqual(expected_y[10:20], subset.targets[10:20])
+        self.assertEqual(max(expected_y), max(subset.targets))
+        self.assertSetEqual(set(expected_y), set(subset.targets))
+
+        # Zero-copy views
+        targets_array = subset.targets.numpy()
+        self.assertEqual(np.int64, targets_array.dtype)
+        self.assertIs(targets_array, np.asarray(subset.targets))
+        self.assertTrue(
+            torch.equal(torch.as_tensor(expected_y), subset.targets.tensor())
+        )
+
+        # Boolean masks select elements
+        mask = torch.as_tensor(expected_y) > 30
+        expected_masked = [y for y in expected_y if y > 30]
+        self.assertEqual(expected_masked, subset.targets[mask])
+        self.assertEqual(expected_masked, subset.targets[mask.numpy()])
+        self.assertEqual(expected_masked, subset.targets[mask.tolist()])
+
+        # Not hashable, like lists
+        with self.assertRaises(TypeError):
+            hash(subset.targets)
+
+        for task_label, task_indices in \
+                subset.tasks_pattern_indices.items():
+            self.assertListEqual(
+                [i for i, t in enumerate(expected_t) if t == task_label],
+                list(task_indices),
+            )
+        self.assertListEqual(
+            list(dict.fromkeys(expected_t)),
+            list(subset.tasks_pattern_indices.keys()),
+        )
+
+    def test_avalanche_dataset_statistics(self):
+        tensor_x = torch.rand(200, 3, 28, 28)
+        tensor_y = torch.randint(3, 70, (200,))
+        tensor_t = torch.randint(0, 5, (200,))
+        tensor_x2 = torch.rand(100, 3, 28, 28)
+        tensor_y2 = torch.randint(0, 50, (100,))
+
+        dataset1 = AvalancheTensorDataset(
+            tensor_x, tensor_y, task_labels=tensor_t.tolist()
+        )
+        dataset2 = AvalancheDataset(
+            TensorDataset(tensor_x2, tensor_y2), task_labels=6
+        )
+        subset = AvalancheSubset(dataset1, indices=torch.randperm(200)[:150])
+
+        # Statistics of concatenated datasets are merged
+        subset.statistics
+        dataset2.statistics
+        concat = AvalancheConcatDataset([subset, dataset2])
+
+        for dataset in [dataset1, subset, concat, concat.eval()]:
+            statistics = dataset.statistics
+            targets = list(dataset.targets)
+            task_labels = list(dataset.targets_task_labels)
+
+            self.assertEqual(min(targets), statistics.min_class)
+            self.assertEqual(max(targets), statistics.max_class)
+            self.assertEqual(len(set(targets)), statistics.n_classes)
+            self.assertListEqual(sorted(set(targets)), list(statistics.classes))
+
+            by_class = statistics.indices_by_class()
+            for class_id in set(targets):
+                expected = [i for i, y in enumerate(targets) if y == class_id]
+                self.assertListEqual(expected, list(by_class[class_id]))
+                self.assertListEqual(
+                    expected, list(statistics.class_patterns(class_id))
+                )
+                self.assertEqual(
+                    len(expected), statistics.class_counts_dict()[class_id]
+                )
+            self.assertEqual(0, len(statistics.class_patterns(1000)))
+
+            by_task = statistics.indices_by_task()
+            self.assertListEqual(sorted(set(task_labels)), list(by_task))
+            for task_label in set(task_labels):
+                expected = [
+                    i for i, t in enumerate(task_labels) if t == task_label
+                ]
+                self.assertListEqual(expected, list(by_task[task_label]))
+
+        # Statistics are shared with datasets with different transforms
+        self.assertIs(concat.statistics, concat.eval().statistics)
+
+    def test_avalanche_dataset_with_cache(self):
+        class CountingDataset(TensorDataset):
+            def __init__(self, *tensors):
+                super().__init__(*tensors)
+                self.loads = 0
+
+            def __getitem__(self, idx):
+                self.loads += 1
+                return super().__getitem__(idx)
+
+        tensor_x = torch.rand(50, 3, 4, 4)
+        tensor_y = torch.randint(0, 10, (50,))
+        leaf = CountingDataset(tensor_x, tensor_y)
+        dataset = AvalancheDataset(
+            leaf,
+            transform_groups=dict(
+                train=(lambda x: x + 1, None), eval=(lambda x: x * 2, None)
+            ),
+        )
+        cached = dataset.with_cache(max_bytes=10 ** 6)
+        self.assertIsNone(dataset.sample_cache)
+        self.assertIsInstance(cached.sample_cache, SampleCache)
+
+        for idx in range(50):
+            x, y, _ = cached[idx]
+            self.assertTrue(torch.equal(tensor_x[idx] + 1, x))
+        self.assertEqual(50, leaf.loads)
+        self.assertEqual(50, cached.sample_cache.misses)
+
+        # Transform groups, subsets and concatenations share the cache
+        cached_eval = cached.eval()
+        subset = AvalancheSubset(cached_eval, indices=range(10, 20))
+        concat = AvalancheConcatDataset([subset, cached])
+        self.assertIs(cached.sample_cache, concat.sample_cache)
+        for idx in range(10):
+            x, y, _ = subset[idx]
+            self.assertTrue(torch.equal(tensor_x[10 + idx] * 2, x))
+        concat.__getitems__([0, 15])
+        self.assertEqual(50, leaf.loads)
+        self.assertEqual(12, cached.sample_cache.hits)
+
+        # Workers receive an empty cache
+        mb_x, _, _ = next(
+            iter(DataLoader(subset, batch_size=10, num_workers=2))
+        )
+        self.assertTrue(torch.equal(tensor_x[10:20] * 2, mb_x))
+
+    def test_sample_cache_eviction(self):
+        pattern_size = estimate_size(torch.zeros(10))
+        for policy in ["lru", "clock"]:
+            cache = SampleCache(3 * pattern_size, policy=policy)
+            for idx in range(3):
+                self.assertTrue(cache.put(self, idx, torch.zeros(10)))
+            self.assertEqual(3 * pattern_size, cache.current_bytes)
+
+            self.assertIsNotNone(cache.get(self, 0))
+            cache.put(self, 3, torch.zeros(10))
+            self.assertEqual(1, cache.evictions)
+            self.assertEqual(3, len(cache))
+
+            # Pattern 0 was recently used: pattern 1 is evicted
+            self.assertIsNotNone(cache.get(self, 0))
+            self.assertIsNone(cache.get(self, 1))
+            self.assertEqual(2, cache.hits)
+            self.assertEqual(1, cache.misses)
+
+            self.assertFalse(cache.put(self, 4, torch.zeros(100)))
+
+            cache_copy = pickle.loads(pickle.dumps(cache))
+            self.assertEqual(0, len(cache_copy))
+            self.assertEqual(policy, cache_copy.policy)
+
+    def test_avalanche_dataset_materialize(self):
+        class Permute:
+            calls = 0
+
+            def __call__(self, x):
+                Permute.calls += 1
+                return x.flip(0)
+
+        permute = Permute()
+
+        tensor_x = torch.rand(40, 5)
+        tensor_y = torch.randint(0, 10, (40,))
+        dataset = AvalancheTensorDataset(
+            tensor_x,
+            tensor_y,
+            transform_groups=dict(
+                train=(permute, None), eval=(permute, None)
+            ),
+            targets=tensor_y,
+            dataset_type=AvalancheDatasetType.CLASSIFICATION,
+            task_labels=3,
+        ).freeze_transforms()
+        dataset = dataset.replace_transforms(lambda x: x + 1, None)
+        dataset = dataset.replace_transforms(
+            lambda x: x * 2, None, group="eval"
+        )
+        subset = AvalancheSubset(dataset, indices=list(range(10, 40)))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "materialized")
+            materialized = subset.materialize(
+                path, dtype=torch.float16, batch_size=7
+            )
+            self.assertEqual(30, Permute.calls)
+            self.assertEqual(30, len(materialized))
+            self.assertEqual(subset.targets, materialized.targets)
+            self.assertEqual(
+                [3] * 30, list(materialized.targets_task_labels)
+            )
+
+            expected_x = tensor_x[10:40].flip(1).half()
+            for idx in range(30):
+                x, y, t = materialized[idx]
+                self.assertEqual(torch.float16, x.dtype)
+                self.assertTrue(torch.equal(expected_x[idx] + 1, x))
+                self.assertEqual(int(tensor_y[10 + idx]), int(y))
+                self.assertEqual(3, t)
+
+            x, _, _ = materialized.eval()[5]
+            self.assertTrue(torch.equal(expected_x[5] * 2, x))
+
+            # The stored patterns are re-used
+            materialized = subset.materialize(path, dtype=torch.float16)
+            self.assertEqual(30, Permute.calls)
+            mb_x, mb_y, mb_t = next(
+                iter(DataLoader(materialized, batch_size=30, num_workers=2))
+            )
+            self.assertTrue(torch.equal(expected_x + 1, mb_x))
+
+            # Only the path is sent to other processes
+            stored_dataset = MemoryMappedDataset(path)
+            self.assertLess(len(pickle.dumps(stored_dataset)), 1000)
+
+            # A different dtype requires new patterns
+            subset.materialize(path, dtype=torch.float32)
+            self.assertEqual(60, Permute.calls)
+
+    def test_avalanche_dataset_materialize_content(self):
+        y = torch.zeros(20, dtype=torch.long)
+        dataset_a = AvalancheTensorDataset(torch.rand(20, 3), y)
+        dataset_b = AvalancheTensorDataset(torch.rand(20, 3), y)
+
+        class UnknownDataset(Dataset):
+            def __init__(self, x):
+                self.x = x
+
+            def __len__(self):
+                return len(self.x)
+
+            def __getitem__(self, idx):
+                return self.x[idx], 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "materialized")
+            materialized = dataset_a.materialize(path)
+            self.assertTrue(torch.equal(dataset_a[3][0], materialized[3][0]))
+
+            # Same type and length, different patterns
+            materialized = dataset_b.materialize(path)
+            self.assertTrue(torch.equal(dataset_b[3][0], materialized[3][0]))
+
+            # Datasets with unknown content are never re-used...
+            x = torch.rand(20, 3)
+            unknown = AvalancheDataset(UnknownDataset(x), targets=y)
+            unknown.materialize(path)
+            metadata = MemoryMappedDataset.read_metadata(path)
+            self.assertIsNone(metadata["fingerprint"])
+            x[3] = 0
+            materialized = unknown.materialize(path)
+            self.assertTrue(torch.equal(x[3], materialized[3][0]))
+
+            # ...unless an explicit fingerprint is given
+            unknown.materialize(path, fingerprint="v1")
+            x[3] = 1
+            materialized = unknown.materialize(path, fingerprint="v1")
+            self.assertTrue(torch.equal(torch.zeros(3), materialized[3][0]))
+
+    def test_avalanche_dataset_share_memory(self):
+        array_x = np.random.rand(500, 3, 16, 16).astype(np.float32)
+        array_y = np.random.randint(0, 10, 500)
+        dataset = AvalancheTensorDataset(
+            array_x,
+            array_y,
+            dataset_type=AvalancheDatasetType.CLASSIFICATION,
+        )
+        subset = AvalancheSubset(dataset, indices=list(range(100, 500)))
+        x_before, y_before, _ = subset[10]
+
+        # Without shared memory the arrays are copied in the payload
+        payload_size = len(ForkingPickler.dumps(subset))
+        self.assertGreater(payload_size, array_x.nbytes)
+
+        self.assertIs(subset, subset.share_memory())
+        payload_size = len(ForkingPickler.dumps(subset))
+        self.assertLess(payload_size, 64 * 1024)
+
+        x, y, _ = subset[10]
+        self.assertIsInstance(x, np.ndarray)
+        self.assertTrue(np.array_equal(x_before, x))
+        self.assertEqual(y_before, y)
+
+        start_time = time.time()
+        mb_x, mb_y, _ = next(
+            iter(
+                DataLoader(
+                    subset,
+                    batch_size=400,
+                    num_workers=1,
+                    multiprocessing_context="spawn",
+                )
+            )
+        )
+        self.assertLess(time.time() - start_time, 60)
+        self.assertTrue(torch.equal(torch.from_numpy(array_x[100:]), mb_x))
+        self.assertTrue(torch.equal(torch.from_numpy(array_y[100:]), mb_y))
+
 
 class TransformationSubsetTests(unittest.TestCase):
     def test_avalanche_subset_transform(self):
@@ -2025,6 +2565,105 @@ class AvalancheDatasetTransformOpsTests(unittest.TestCase):
         x2, *_ = dataset_frozen[0]
         self.assertIsInstance(x2, Image)
 
+    def test_transforms_compiled_pipeline(self):
+        def plus_one(x):
+            return x + 1
+
+        def times_two(x):
+            return x * 2
+
+        def swap_sign_if_label_2(x, y):
+            return (-x if y == 2 else x), y
+
+        tensor_x = torch.rand(20, 3, 4, 4)
+        tensor_y = torch.arange(20) % 5
+        dataset = (
+            AvalancheTensorDataset(tensor_x, tensor_y, transform=plus_one)
+            .freeze_transforms()
+            .add_transforms(times_two)
+            .freeze_transforms()
+            .add_transforms(swap_sign_if_label_2)
+        )
+
+        for idx in range(len(dataset)):
+            x, y, _ = dataset[idx]
+            expected_x = (tensor_x[idx] + 1) * 2
+            if int(tensor_y[idx]) == 2:
+                expected_x = -expected_x
+            self.assertTrue(torch.allclose(expected_x, x))
+            self.assertEqual(int(tensor_y[idx]), int(y))
+
+        # Nested Compose wrappers are flattened and the pipeline is compiled
+        # only once
+        x_pipeline, y_pipeline = dataset._get_transforms_pipelines()
+        self.assertListEqual(
+            [plus_one, times_two, swap_sign_if_label_2],
+            x_pipeline.transforms,
+        )
+        self.assertListEqual([(1, 1), (1, 1), (2, 2)], x_pipeline.param_def)
+        self.assertEqual(0, len(y_pipeline))
+        self.assertIs(x_pipeline, dataset._get_transforms_pipelines()[0])
+
+        # Changing the transformations triggers a new compilation
+        dataset.transform = None
+        x, *_ = dataset[2]
+        self.assertTrue(torch.allclose((tensor_x[2] + 1) * 2, x))
+        self.assertEqual(2, len(dataset._get_transforms_pipelines()[0]))
+
+    def test_batch_transforms(self):
+        def double_y(x, y):
+            return x, y * 2
+
+        tensor_x = torch.rand(20, 3)
+        tensor_y = torch.randint(0, 10, (20,))
+        dataset = AvalancheTensorDataset(tensor_x, tensor_y)
+        dataset = dataset.add_batch_transforms(lambda x: x + 1)
+        dataset = dataset.freeze_batch_transforms()
+        dataset = dataset.add_batch_transforms(
+            lambda x: x * 2, group="eval"
+        ).replace_batch_transforms(double_y, None)
+
+        # Patterns are not affected
+        x, y, t = dataset[0]
+        self.assertTrue(torch.equal(tensor_x[0], x))
+
+        mbatch = next(iter(DataLoader(dataset, batch_size=20)))
+        mb_x, mb_y, mb_t = dataset.apply_batch_transforms(mbatch)
+        self.assertTrue(torch.equal(tensor_x + 1, mb_x))
+        self.assertTrue(torch.equal(tensor_y * 2, mb_y))
+        self.assertTrue(torch.equal(torch.zeros(20, dtype=torch.long), mb_t))
+
+        # Groups and subsets
+        eval_subset = AvalancheSubset(dataset.eval(), indices=[3, 4])
+        mbatch = next(iter(DataLoader(eval_subset, batch_size=2)))
+        mb_x, mb_y, _ = eval_subset.apply_batch_transforms(mbatch)
+        self.assertTrue(torch.equal(tensor_x[3:5] * 2, mb_x))
+        self.assertTrue(torch.equal(tensor_y[3:5], mb_y))
+
+        # Frozen batch transformations can't be replaced
+        replaced = dataset.replace_batch_transforms(None, None)
+        mb_x, mb_y, _ = replaced.apply_batch_transforms(mbatch)
+        self.assertTrue(torch.equal(tensor_x[3:5] + 1, mb_x))
+
+        with self.assertRaises(ValueError):
+            AvalancheConcatDataset(
+                [dataset, AvalancheTensorDataset(tensor_x, tensor_y)]
+            )
+
+        # Missing groups and empty groups are equivalent
+        plain = AvalancheTensorDataset(tensor_x, tensor_y)
+        emptied = plain.replace_batch_transforms(None, None)
+        concat = AvalancheConcatDataset([plain, emptied])
+        self.assertEqual(40, len(concat))
+
+        # The pipeline of each group is compiled once
+        dataset.apply_batch_transforms(mbatch)
+        compiled = dataset._compiled_batch_transforms["train"][1]
+        dataset.apply_batch_transforms(mbatch)
+        self.assertIs(compiled, dataset._compiled_batch_transforms["train"][1])
+        forked = dataset.train()
+        self.assertEqual(dict(), forked._compiled_batch_transforms)
+
     def test_add_transforms(self):
         original_dataset = MNIST(
             root=default_dataset_location("mnist"), download=True
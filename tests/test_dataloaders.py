@@ -23,7 +23,10 @@ from torch.nn import CrossEntropyLoss
 from torch.utils.data import TensorDataset
 
 from avalanche.benchmarks.datasets import MNIST
-from avalanche.benchmarks.utils import AvalancheConcatDataset
+from avalanche.benchmarks.utils import (
+    AvalancheConcatDataset,
+    AvalancheTensorDataset,
+)
 from avalanche.logging import TextLogger
 from avalanche.models import SimpleMLP
 from avalanche.training.plugins import EvaluationPlugin, ReplayPlugin
@@ -150,6 +153,86 @@ class DataLoaderTests(unittest.TestCase):
                 self.assertLessEqual(sum(lengths), batch_size)
             cl_strategy.train(step)
 
+    def test_group_balanced_single_loader(self):
+        # Groups of different sizes, with group labels as targets
+        datasets = [
+            AvalancheTensorDataset(
+                torch.arange(n).float(), torch.full((n,), group)
+            )
+            for group, n in enumerate([10, 25, 7])
+        ]
+
+        dl = GroupBalancedDataLoader(datasets, batch_size=6, shuffle=True)
+        self.assertIsInstance(dl.dataloader, torch.utils.data.DataLoader)
+        self.assertEqual(13, len(dl))
+        seen = [[] for _ in datasets]
+        n_batches = 0
+        for x, y, t in dl:
+            n_batches += 1
+            counts = torch.bincount(y, minlength=3).tolist()
+            for group, count in enumerate(counts):
+                self.assertLessEqual(count, 2)
+                seen[group] += x[y == group].long().tolist()
+        self.assertEqual(13, n_batches)
+        # Each pattern is seen exactly once
+        for group, n in enumerate([10, 25, 7]):
+            self.assertEqual(list(range(n)), sorted(seen[group]))
+
+        # Smaller groups are oversampled
+        dl = GroupBalancedDataLoader(
+            datasets, oversample_small_groups=True, batch_size=6
+        )
+        for x, y, t in dl:
+            self.assertEqual([2, 2, 2], torch.bincount(y).tolist())
+
+        # Replay: the epoch ends with the current data
+        dl = ReplayDataLoader(
+            datasets[1],
+            datasets[2],
+            oversample_small_tasks=True,
+            batch_size=5,
+            batch_size_mem=3,
+        )
+        n_batches = 0
+        for x, y, t in dl:
+            n_batches += 1
+            self.assertEqual([5, 3], torch.bincount(y)[1:].tolist())
+        self.assertEqual(5, n_batches)
+
+    def test_return_indices(self):
+        x = torch.arange(20).float()
+        data = AvalancheConcatDataset(
+            [
+                AvalancheTensorDataset(x[:12], x[:12].long(), task_labels=0),
+                AvalancheTensorDataset(x[12:], x[12:].long(), task_labels=1),
+            ]
+        )
+
+        dl = TaskBalancedDataLoader(data, batch_size=4, shuffle=True)
+        self.assertFalse(dl.return_indices)
+        self.assertEqual(3, len(next(iter(dl))))
+
+        # Indices are inserted before the task labels and refer to data
+        dl.return_indices = True
+        seen = []
+        for mb_x, mb_y, mb_idx, mb_t in dl:
+            self.assertTrue(torch.equal(mb_x.long(), mb_idx))
+            seen += mb_idx.tolist()
+        self.assertEqual(list(range(20)), sorted(seen))
+
+        # Memory indices are offset by the length of the data
+        dl = ReplayDataLoader(
+            data,
+            data,
+            batch_size=4,
+            batch_size_mem=4,
+            task_balanced_dataloader=True,
+            return_indices=True,
+        )
+        for mb_x, mb_y, mb_idx, mb_t in dl:
+            self.assertTrue(torch.equal(mb_x[:4].long(), mb_idx[:4]))
+            self.assertTrue(torch.equal(mb_x[4:].long() + 20, mb_idx[4:]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for the lazy imports of Avalanche.
+
+Submodules and optional dependencies are imported lazily, so that scripts
+only pay for the parts of Avalanche they use.
+"""
+import subprocess
+import sys
+import unittest
+
+# Modules that "import avalanche" must not load.
+LAZY_MODULES = [
+    "avalanche.benchmarks",
+    "avalanche.evaluation",
+    "avalanche.logging",
+    "avalanche.models",
+    "avalanche.training",
+    "torch",
+]
+
+OPTIONAL_DEPENDENCIES = [
+    "tensorboard",
+    "wandb",
+    "matplotlib",
+    "pycocotools",
+    "lvis",
+    "pytorchcv",
+    "ctrl",
+    "gdown",
+]
+
+
+def _run_python(*args):
+    return subprocess.run(
+        [sys.executable] + list(args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_submodules_not_imported(self):
+        result = _run_python(
+            "-c",
+            "import sys, avalanche; "
+            "print(' '.join(m for m in {} if m in sys.modules))".format(
+                LAZY_MODULES
+            ),
+        )
+        self.assertEqual("", result.stdout.strip())
+
+    def test_lazy_submodules(self):
+        result = _run_python(
+            "-c",
+            "import sys, avalanche; "
+            "print('avalanche.training' in sys.modules); "
+            "avalanche.training; "
+            "print('avalanche.training' in sys.modules)",
+        )
+        self.assertEqual(["False", "True"], result.stdout.split())
+
+    def test_optional_dependencies_not_imported(self):
+        result = _run_python(
+            "-c",
+            "import sys; "
+            "from avalanche.benchmarks.classic import SplitMNIST; "
+            "from avalanche.training.supervised import Naive; "
+            "from avalanche.logging import InteractiveLogger; "
+            "print(' '.join(m for m in {} if m in sys.modules))".format(
+                OPTIONAL_DEPENDENCIES
+            ),
+        )
+        self.assertEqual("", result.stdout.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
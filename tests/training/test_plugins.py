@@ -1,3 +1,4 @@
+import copy
 import itertools
 import sys
 
@@ -18,19 +19,34 @@ from avalanche.benchmarks import (
     GenericCLScenario,
     benchmark_with_validation_stream,
 )
+from avalanche.benchmarks.utils import AvalancheTensorDataset
 from avalanche.benchmarks.utils.data_loader import TaskBalancedDataLoader
+from avalanche.evaluation import PluginMetric
 from avalanche.evaluation.metric_results import MetricValue
 from avalanche.evaluation.metrics import Mean
-from avalanche.logging import TextLogger
-from avalanche.models import BaseModel, SimpleMLP
+from avalanche.logging import BaseLogger, TextLogger
+from avalanche.models import (
+    BaseModel,
+    SimpleMLP,
+    MTSimpleMLP,
+    avalanche_forward,
+)
+from avalanche.models.utils import avalanche_model_adaptation
 from avalanche.training.plugins import (
+    AGEMPlugin,
     SupervisedPlugin,
     EvaluationPlugin,
     EarlyStoppingPlugin,
+    EWCPlugin,
+    GEMPlugin,
+    GSS_greedyPlugin,
+    LwFPlugin,
 )
 from avalanche.training.plugins.clock import Clock
 from avalanche.training.plugins.lr_scheduling import LRSchedulerPlugin
 from avalanche.training.supervised import Naive
+from avalanche.training.teacher_cache import TeacherOutputCache
+from tests.unit_tests_utils import get_fast_benchmark
 
 
 class MockPlugin(SupervisedPlugin):
@@ -131,6 +147,58 @@ class PluginTests(unittest.TestCase):
         strategy.eval([benchmark.test_stream[0]], num_workers=0)
         assert all(plug.activated)
 
+    def test_plugin_callbacks_dispatch(self):
+        class ForwardPlugin(SupervisedPlugin):
+            def before_forward(self, strategy, **kwargs):
+                pass
+
+        model = _PlainMLP(input_size=6, hidden_size=10)
+        optimizer = SGD(model.parameters(), lr=1e-3)
+        plug = ForwardPlugin()
+        strategy = Naive(model, optimizer, CrossEntropyLoss())
+        strategy.plugins = [plug, MockPlugin()]
+
+        # Only the plugins overriding the callback are called
+        callbacks = strategy.get_plugin_callbacks("before_forward")
+        self.assertEqual(2, len(callbacks))
+        self.assertIs(plug, callbacks[0].__self__)
+        callbacks = strategy.get_plugin_callbacks("before_eval_iteration")
+        self.assertEqual(1, len(callbacks))
+        self.assertIsInstance(callbacks[0].__self__, MockPlugin)
+        self.assertIs(
+            callbacks, strategy.get_plugin_callbacks("before_eval_iteration")
+        )
+
+        # Callbacks are computed again when the plugins change
+        strategy.plugins.pop()
+        self.assertEqual(
+            0, len(strategy.get_plugin_callbacks("before_eval_iteration"))
+        )
+        plug2 = ForwardPlugin()
+        strategy.plugins.append(plug2)
+        callbacks = strategy.get_plugin_callbacks("before_forward")
+        self.assertEqual([plug, plug2], [c.__self__ for c in callbacks])
+
+        # Plugins creating callbacks dynamically are supported
+        strategy.plugins = [EvaluationPlugin(loggers=[])]
+        self.assertEqual(
+            1, len(strategy.get_plugin_callbacks("before_eval_iteration"))
+        )
+
+        # Callbacks are computed again when the plugins are replaced
+        strategy.plugins = [MockPlugin()]
+        callbacks = strategy.get_plugin_callbacks("before_forward")
+        self.assertIsInstance(callbacks[0].__self__, MockPlugin)
+        strategy.plugins = [plug]
+        callbacks = strategy.get_plugin_callbacks("before_forward")
+        self.assertEqual([plug], [c.__self__ for c in callbacks])
+
+        # The sequence given to the strategy is copied
+        plugins = [plug]
+        strategy = Naive(model, optimizer, CrossEntropyLoss(), plugins=plugins)
+        self.assertEqual([plug], plugins)
+        self.assertIn(plug, strategy.plugins)
+
     @staticmethod
     def create_benchmark(task_labels=False, seed=None):
         n_samples_per_class = 20
@@ -665,6 +733,488 @@ class EvaluationPluginTest(unittest.TestCase):
         with self.assertRaises(AttributeError):
             evalp.asd(None)
 
+    def test_callbacks_dispatch(self):
+        # Metrics are only called on the callbacks they implement and
+        # loggers are updated only when new values have been emitted.
+        class IterationMetric(PluginMetric):
+            def __init__(self):
+                super().__init__()
+                self.calls = []
+
+            def result(self, **kwargs):
+                return None
+
+            def reset(self, **kwargs):
+                pass
+
+            def after_training_iteration(self, strategy):
+                self.calls.append("after_training_iteration")
+                return MetricValue(self, "iteration_metric", 1.0, 0)
+
+        class CountingLogger(BaseLogger, SupervisedPlugin):
+            def __init__(self):
+                super().__init__()
+                self.logged = []
+                self.epoch_callbacks = 0
+
+            def log_metrics(self, metric_values):
+                self.logged.append(list(metric_values))
+
+            def after_training_epoch(self, strategy, metric_values, **kwargs):
+                self.epoch_callbacks += 1
+
+        metric = IterationMetric()
+        logger = CountingLogger()
+        evalp = EvaluationPlugin(
+            metric, loggers=[logger], suppress_warnings=True
+        )
+
+        evalp.before_training_iteration(None)
+        evalp.after_training_epoch(None)
+        self.assertEqual([], metric.calls)
+        self.assertEqual([], logger.logged)
+        self.assertEqual(1, logger.epoch_callbacks)
+
+        evalp.after_training_iteration(None)
+        self.assertEqual(["after_training_iteration"], metric.calls)
+        self.assertEqual(1, len(logger.logged))
+        self.assertEqual("iteration_metric", logger.logged[0][0].name)
+
+        # Changes of the loggers are detected
+        other_logger = CountingLogger()
+        evalp.loggers.append(other_logger)
+        evalp.after_training_iteration(None)
+        self.assertEqual(2, len(logger.logged))
+        self.assertEqual(1, len(other_logger.logged))
+
+
+class AGEMPluginTest(unittest.TestCase):
+    def test_flat_gradient_projection(self):
+        class AGEMMockStrategy:
+            def __init__(self):
+                self.model = SimpleMLP(input_size=6, hidden_size=10)
+                self._criterion = CrossEntropyLoss()
+                self.device = "cpu"
+
+        torch.manual_seed(0)
+        strategy = AGEMMockStrategy()
+        plugin = AGEMPlugin(patterns_per_experience=20, sample_size=10)
+        for task_label in range(2):
+            dataset = AvalancheTensorDataset(
+                torch.randn(30, 6),
+                torch.randint(0, 10, (30,)),
+                task_labels=task_label,
+            )
+            plugin.update_memory(dataset)
+        self.assertEqual([20, 20], plugin.memory_sizes)
+        self.assertEqual((40, 6), tuple(plugin.memory_x.shape))
+        xref, yref, tid = plugin.sample_from_memory()
+        self.assertEqual([5, 5], torch.bincount(tid).tolist())
+
+        plugin.before_training_exp(strategy)
+        plugin.before_training_iteration(strategy)
+        reference = plugin.reference_gradients.clone()
+
+        # zero_grad(set_to_none=True) detaches the gradients from the buffer
+        strategy.model.zero_grad(set_to_none=True)
+        plugin.before_backward(strategy)
+        x = torch.randn(16, 6)
+        y = torch.randint(0, 10, (16,))
+        strategy._criterion(strategy.model(x), y).backward()
+        current = torch.cat(
+            [p.grad.flatten() for p in strategy.model.parameters()]
+        )
+        self.assertTrue(torch.equal(current, plugin._flat_grads))
+
+        plugin.after_backward(strategy)
+        dotg = torch.dot(current, reference)
+        expected = current
+        if dotg < 0:
+            expected = current - reference * dotg / reference.dot(reference)
+        projected = torch.cat(
+            [p.grad.flatten() for p in strategy.model.parameters()]
+        )
+        self.assertTrue(torch.allclose(expected, projected, atol=1e-6))
+        self.assertGreaterEqual(
+            torch.dot(projected, reference).item(), -1e-5
+        )
+
+    def test_multihead_old_heads_unchanged(self):
+        torch.manual_seed(0)
+        model = MTSimpleMLP(input_size=6, hidden_size=10)
+        plugin = AGEMPlugin(patterns_per_experience=20, sample_size=10)
+        strategy = Naive(
+            model,
+            SGD(model.parameters(), lr=0.01, momentum=0.9, weight_decay=0.1),
+            CrossEntropyLoss(),
+            train_mb_size=32,
+            train_epochs=2,
+            eval_mb_size=64,
+            plugins=[plugin],
+        )
+        benchmark = get_fast_benchmark(use_task_labels=True)
+        strategy.train(benchmark.train_stream[0])
+        old_head = copy.deepcopy(model.classifier.classifiers["0"])
+
+        strategy.train(benchmark.train_stream[1])
+        self.assertEqual([20, 20], plugin.memory_sizes)
+        for p, old_p in zip(
+            model.classifier.classifiers["0"].parameters(),
+            old_head.parameters(),
+        ):
+            self.assertTrue(torch.equal(p, old_p))
+
+
+class LwFPluginTest(unittest.TestCase):
+    def test_teacher_cache(self):
+        class LossPlugin(SupervisedPlugin):
+            def __init__(self):
+                super().__init__()
+                self.losses = []
+
+            def before_backward(self, strategy, **kwargs):
+                self.losses.append(float(strategy.loss))
+
+        benchmark = PluginTests.create_benchmark(seed=0)
+
+        def run(teacher_cache):
+            torch.manual_seed(0)
+            model = _PlainMLP(input_size=6, hidden_size=10)
+            lwf = LwFPlugin(teacher_cache=teacher_cache)
+            losses = LossPlugin()
+            strategy = Naive(
+                model,
+                SGD(model.parameters(), lr=0.01),
+                CrossEntropyLoss(),
+                train_mb_size=8,
+                train_epochs=3,
+                device="cpu",
+                plugins=[lwf, losses],
+            )
+            for experience in benchmark.train_stream[:2]:
+                strategy.train(experience)
+            return losses.losses
+
+        cache = TeacherOutputCache(dtype=torch.float64)
+        expected = run(None)
+        cached = run(cache)
+        self.assertEqual(len(expected), len(cached))
+        for loss, cached_loss in zip(expected, cached):
+            self.assertAlmostEqual(loss, cached_loss, places=5)
+
+        # The outputs of all the patterns of the second experience are cached
+        n_patterns = len(benchmark.train_stream[1].dataset)
+        self.assertTrue(bool(cache._filled[:n_patterns].all()))
+
+    def test_multihead_single_pass(self):
+        class LwFMockStrategy:
+            def __init__(self, model):
+                self.model = model
+
+        torch.manual_seed(0)
+        model = MTSimpleMLP(input_size=6, hidden_size=10)
+        for task_label in range(3):
+            avalanche_model_adaptation(
+                model,
+                AvalancheTensorDataset(
+                    torch.randn(10, 6),
+                    torch.arange(10) % (task_label + 2),
+                    task_labels=task_label,
+                ),
+            )
+        plugin = LwFPlugin(temperature=2)
+        plugin.prev_model = copy.deepcopy(model)
+        plugin.prev_classes = {"0": {0, 1}, "1": {0, 2}, "2": {1}}
+        with torch.no_grad():
+            for param in model.parameters():
+                param.add_(0.1 * torch.randn_like(param))
+        # no dropout, so that the outputs can be compared
+        model.eval()
+        plugin.prev_model.eval()
+
+        x = torch.randn(16, 6)
+        expected = 0
+        for task_id, classes in plugin.prev_classes.items():
+            au = sorted(classes)
+            log_p = torch.log_softmax(model(x, int(task_id)) / 2, dim=1)
+            q = torch.softmax(plugin.prev_model(x, int(task_id)) / 2, dim=1)
+            expected += torch.nn.functional.kl_div(
+                log_p[:, au], q[:, au], reduction="batchmean"
+            )
+
+        n_forwards = []
+        for m in (model, plugin.prev_model):
+            m.features.register_forward_hook(
+                lambda *args: n_forwards.append(1)
+            )
+        plugin.before_training_exp(LwFMockStrategy(model))
+        plugin.before_forward(None)
+        out = avalanche_forward(model, x, torch.full((16,), 2))
+        plugin.after_forward(None)
+        penalty = plugin.penalty(out, x, 1, model)
+
+        # one backbone forward for each model
+        self.assertEqual(2, len(n_forwards))
+        self.assertAlmostEqual(expected.item(), penalty.item(), places=5)
+        penalty.backward()
+        for task_id in plugin.prev_classes:
+            head = model.classifier.classifiers[task_id].classifier
+            self.assertGreater(head.weight.grad.abs().sum().item(), 0)
+
+        # the features are not captured outside of the training forward
+        with torch.no_grad():
+            avalanche_forward(model, x, torch.full((16,), 2))
+        self.assertEqual(1, len(plugin._curr_features))
+
+
+class EWCPluginTest(unittest.TestCase):
+    def test_separate_penalty_consolidation(self):
+        class EWCMockStrategy:
+            def __init__(self, model, exp_counter):
+                self.model = model
+                self.device = "cpu"
+                self.clock = Clock()
+                self.clock.train_exp_counter = exp_counter
+                self.loss = torch.tensor(0.0)
+
+        torch.manual_seed(0)
+        model = SimpleMLP(input_size=6, hidden_size=10)
+        plugin = EWCPlugin(ewc_lambda=0.5, mode="separate")
+        n_experiences = 4
+        saved_params, importances = [], []
+        for exp_counter in range(1, n_experiences + 1):
+            saved_params.append(
+                [
+                    (k, p.detach() + torch.randn_like(p))
+                    for k, p in model.named_parameters()
+                ]
+            )
+            # Some importances are zero in all the experiences
+            importances.append(
+                [
+                    (k, torch.rand_like(p) * (p.detach() > 0))
+                    for k, p in model.named_parameters()
+                ]
+            )
+            plugin.consolidate_penalty(importances[-1], saved_params[-1])
+
+            expected_penalty = torch.tensor(0.0)
+            for experience in range(exp_counter):
+                for (_, cur_param), (_, saved_param), (_, imp) in zip(
+                    model.named_parameters(),
+                    saved_params[experience],
+                    importances[experience],
+                ):
+                    expected_penalty += (
+                        imp * (cur_param - saved_param).pow(2)
+                    ).sum()
+            expected_penalty = 0.5 * expected_penalty
+            model.zero_grad()
+            expected_penalty.backward()
+            expected_grads = [p.grad.clone() for p in model.parameters()]
+
+            strategy = EWCMockStrategy(model, exp_counter)
+            model.zero_grad()
+            plugin.before_backward(strategy)
+            strategy.loss.backward()
+
+            self.assertTrue(
+                torch.allclose(
+                    expected_penalty, strategy.loss, rtol=1e-5, atol=1e-5
+                )
+            )
+            for expected_grad, p in zip(expected_grads, model.parameters()):
+                self.assertTrue(
+                    torch.allclose(expected_grad, p.grad, rtol=1e-4, atol=1e-5)
+                )
+
+        # the parameters and importances of each experience are not kept
+        self.assertEqual(0, len(plugin.saved_params))
+        self.assertEqual(0, len(plugin.importances))
+
+    def test_separate_growing_model(self):
+        # a new head is added at each experience
+        torch.manual_seed(0)
+        model = MTSimpleMLP(input_size=6, hidden_size=10)
+        plugin = EWCPlugin(ewc_lambda=0.5, mode="separate")
+        strategy = Naive(
+            model,
+            SGD(model.parameters(), lr=0.01),
+            CrossEntropyLoss(),
+            train_mb_size=32,
+            train_epochs=1,
+            eval_mb_size=64,
+            plugins=[plugin],
+        )
+        benchmark = get_fast_benchmark(use_task_labels=True)
+        for experience in benchmark.train_stream[:3]:
+            strategy.train(experience)
+            self.assertTrue(torch.isfinite(strategy.loss).item())
+
+        n_heads = sum(
+            1
+            for name in plugin.penalties
+            if name.endswith("classifier.weight")
+        )
+        self.assertEqual(3, n_heads)
+        self.assertEqual(0, len(plugin.saved_params))
+
+
+class GEMPluginTest(unittest.TestCase):
+    def test_reference_gradients(self):
+        class GEMMockStrategy:
+            def __init__(self):
+                self.model = SimpleMLP(input_size=6, hidden_size=10)
+                self._criterion = CrossEntropyLoss()
+                self.device = "cpu"
+
+        torch.manual_seed(0)
+        strategy = GEMMockStrategy()
+        strategy.model.eval()
+        plugin = GEMPlugin(patterns_per_experience=8, memory_strength=0.5)
+        for t, size in enumerate([8, 8, 5]):
+            plugin.memory_x[t] = torch.randn(size, 6)
+            plugin.memory_y[t] = torch.randint(0, 10, (size,))
+            plugin.memory_tid[t] = torch.zeros(size, dtype=torch.long)
+
+        G = plugin.compute_reference_gradients(strategy, 3)
+        self.assertEqual(3, G.size(0))
+        for t in range(3):
+            strategy.model.zero_grad()
+            loss = strategy._criterion(
+                strategy.model(plugin.memory_x[t]), plugin.memory_y[t]
+            )
+            loss.backward()
+            expected = torch.cat(
+                [p.grad.flatten() for p in strategy.model.parameters()]
+            )
+            self.assertTrue(torch.allclose(expected, G[t], atol=1e-6))
+
+    def test_reference_gradients_batch_norm(self):
+        class GEMMockStrategy:
+            def __init__(self):
+                self.model = nn.Sequential(
+                    nn.Linear(6, 10),
+                    nn.BatchNorm1d(10),
+                    nn.ReLU(),
+                    nn.Linear(10, 10),
+                )
+                self._criterion = CrossEntropyLoss()
+                self.device = "cpu"
+
+        torch.manual_seed(0)
+        strategy = GEMMockStrategy()
+        expected_model = copy.deepcopy(strategy.model)
+        plugin = GEMPlugin(patterns_per_experience=8, memory_strength=0.5)
+        for t in range(3):
+            # the statistics of each experience are different
+            plugin.memory_x[t] = torch.randn(8, 6) * (t + 1) + t
+            plugin.memory_y[t] = torch.randint(0, 10, (8,))
+            plugin.memory_tid[t] = torch.zeros(8, dtype=torch.long)
+
+        # the batch statistics are computed for each experience
+        G = plugin.compute_reference_gradients(strategy, 3)
+        for t in range(3):
+            expected_model.zero_grad()
+            loss = strategy._criterion(
+                expected_model(plugin.memory_x[t]), plugin.memory_y[t]
+            )
+            loss.backward()
+            expected = torch.cat(
+                [p.grad.flatten() for p in expected_model.parameters()]
+            )
+            self.assertTrue(torch.allclose(expected, G[t], atol=1e-5))
+        self.assertTrue(
+            torch.allclose(
+                expected_model[1].running_mean,
+                strategy.model[1].running_mean,
+            )
+        )
+
+    def test_qp_solver(self):
+        torch.manual_seed(0)
+        plugin = GEMPlugin(patterns_per_experience=8, memory_strength=0.5)
+        for n_experiences in [1, 3, 6]:
+            plugin.G = torch.randn(n_experiences, 50)
+            g = -plugin.G.sum(dim=0) + 0.1 * torch.randn(50)
+
+            expected = plugin.solve_quadprog(g)
+            v_star = plugin.solve_qp(g.clone())
+            self.assertIsNotNone(v_star)
+            self.assertTrue(torch.allclose(expected, v_star, atol=1e-4))
+            # The projected gradient doesn't increase the loss on previous
+            # experiences
+            self.assertTrue((torch.mv(plugin.G, v_star) >= -1e-4).all())
+
+
+class GSSPluginTest(unittest.TestCase):
+    def test_per_sample_grads(self):
+        class GSSMockStrategy:
+            def __init__(self):
+                self.model = SimpleMLP(input_size=6, hidden_size=10)
+                self._criterion = CrossEntropyLoss()
+                self.device = "cpu"
+
+        torch.manual_seed(0)
+        strategy = GSSMockStrategy()
+        strategy.model.eval()
+        # Frozen parameters have zero gradients
+        strategy.model.classifier.bias.requires_grad = False
+        grad_dims = [p.numel() for p in strategy.model.parameters()]
+        batch_x = torch.randn(8, 6)
+        batch_y = torch.randint(0, 10, (8,))
+
+        plugin = GSS_greedyPlugin(mem_size=10, input_size=[6])
+        batched_grads = plugin.get_per_sample_grads(
+            strategy, grad_dims, batch_x, batch_y
+        )
+        plugin._batched_grads = False
+        expected_grads = plugin.get_per_sample_grads(
+            strategy, grad_dims, batch_x, batch_y
+        )
+
+        self.assertEqual((8, sum(grad_dims)), batched_grads.shape)
+        self.assertTrue(
+            torch.allclose(expected_grads, batched_grads, atol=1e-6)
+        )
+
+        mem_grads = torch.randn(3, sum(grad_dims))
+        sim = plugin.get_each_batch_sample_sim(
+            strategy, grad_dims, mem_grads, batch_x, batch_y
+        )
+        for i in range(8):
+            expected_sim = max(
+                plugin.cosine_similarity(mem_grads, expected_grads[i : i + 1])
+            )
+            self.assertAlmostEqual(expected_sim.item(), sim[i].item(), 5)
+
+        # Out of memory errors split the batch, other errors disable the
+        # batched gradients
+        batched_per_sample_grads = plugin._batched_per_sample_grads
+
+        def out_of_memory(strategy, grad_dims, batch_x, batch_y, out):
+            if batch_x.size(0) > 3:
+                raise RuntimeError("CUDA out of memory.")
+            batched_per_sample_grads(strategy, grad_dims, batch_x, batch_y, out)
+
+        plugin._batched_grads = True
+        plugin._batched_per_sample_grads = out_of_memory
+        chunked_grads = plugin.get_per_sample_grads(
+            strategy, grad_dims, batch_x, batch_y
+        )
+        self.assertTrue(plugin._batched_grads)
+        self.assertTrue(torch.allclose(batched_grads, chunked_grads))
+
+        def not_vectorizable(*args):
+            raise RuntimeError("vmap: It looks like you're calling .item()")
+
+        plugin._batched_per_sample_grads = not_vectorizable
+        grads = plugin.get_per_sample_grads(
+            strategy, grad_dims, batch_x, batch_y
+        )
+        self.assertFalse(plugin._batched_grads)
+        self.assertTrue(torch.allclose(expected_grads, grads))
+
 
 class EarlyStoppingPluginTest(unittest.TestCase):
     def test_early_stop_epochs(self):
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from typing import List, Dict
 from unittest.mock import MagicMock
@@ -8,19 +9,30 @@ from torch.nn import CrossEntropyLoss, Module, Identity
 from torch.optim import SGD
 
 from avalanche.benchmarks.utils import (
+    AvalancheConcatDataset,
     AvalancheDataset,
     AvalancheDatasetType,
+    AvalancheSubset,
     AvalancheTensorDataset,
 )
 from avalanche.models import SimpleMLP
+from avalanche.training.exemplar_store import (
+    ExemplarStore,
+    Float16Codec,
+    ImageCodec,
+    Uint8Codec,
+)
 from avalanche.training.plugins import ReplayPlugin
 from avalanche.training.storage_policy import (
     ExperienceBalancedBuffer,
     ClassBalancedBuffer,
     ExemplarsSelectionStrategy,
     HerdingSelectionStrategy,
+    MemoryMappedBuffer,
     ClosestToCenterSelectionStrategy,
     ParametricBuffer,
+    ReservoirSamplingBuffer,
+    herding_selection,
 )
 from avalanche.training.supervised import Naive
 from avalanche.training.templates.supervised import SupervisedTemplate
@@ -100,6 +112,208 @@ class ReplayTest(unittest.TestCase):
             assert len_tot == policy.max_size
 
 
+class BalancedExemplarsBufferTest(unittest.TestCase):
+    def test_cached_buffer(self):
+        benchmark = get_fast_benchmark(use_task_labels=True)
+        policy = ExperienceBalancedBuffer(max_size=40)
+        for exp in benchmark.train_stream:
+            strategy = MagicMock(experience=exp)
+            strategy.clock.train_exp_counter = exp.current_experience
+            policy.update(strategy)
+
+            buffer = policy.buffer
+            self.assertIs(buffer, policy.buffer)
+            self.assertEqual(40, len(buffer))
+
+        # Resizing a group invalidates the cached buffer
+        policy.resize(None, 20)
+        self.assertIsNot(buffer, policy.buffer)
+        self.assertEqual(20, len(policy.buffer))
+
+        # So do adding and removing groups
+        buffer = policy.buffer
+        group = policy.buffer_groups.pop(0)
+        self.assertEqual(20 - len(group.buffer), len(policy.buffer))
+        policy.buffer_groups[0] = group
+        self.assertEqual(20, len(policy.buffer))
+        self.assertIsNot(buffer, policy.buffer)
+
+        # Removed groups don't affect the buffer anymore
+        del policy.buffer_groups[0]
+        buffer = policy.buffer
+        group.resize(None, 1)
+        self.assertIs(buffer, policy.buffer)
+
+
+class ReservoirSamplingBufferTest(unittest.TestCase):
+    def test_flat_buffer(self):
+        torch.manual_seed(0)
+        buffer = ReservoirSamplingBuffer(max_size=50)
+        n_experiences, n_samples = 300, 20
+        for exp_id in range(n_experiences):
+            # x contains the index of the pattern in the stream
+            x = torch.arange(exp_id * n_samples, (exp_id + 1) * n_samples)
+            buffer.update_from_dataset(
+                AvalancheTensorDataset(x.float(), zeros(n_samples))
+            )
+
+            self.assertEqual(
+                min(50, (exp_id + 1) * n_samples), len(buffer.buffer)
+            )
+            weights = buffer._buffer_weights
+            self.assertTrue(bool((weights[:-1] >= weights[1:]).all()))
+
+        # The buffer is a subset of the concatenation of the experiences
+        self.assertIsInstance(buffer.buffer, AvalancheSubset)
+        concat = buffer.buffer._original_dataset
+        self.assertIsInstance(concat, AvalancheConcatDataset)
+        self.assertLessEqual(len(concat._dataset_list), 50)
+        for dataset in concat._dataset_list:
+            self.assertIsInstance(dataset, AvalancheTensorDataset)
+
+        # Patterns are unique and match the table
+        stream_idxs = buffer.buffer[:][0].long()
+        self.assertEqual(50, len(set(stream_idxs.tolist())))
+
+        # Resizing keeps the patterns with the highest weights
+        buffer.resize(None, 10)
+        self.assertEqual(
+            stream_idxs[:10].tolist(), buffer.buffer[:][0].long().tolist()
+        )
+        self.assertEqual(10, len(buffer._buffer_weights))
+
+
+class ExemplarStoreTest(unittest.TestCase):
+    def test_codecs(self):
+        x = torch.rand(3, 8, 8)
+        data, info = Uint8Codec().encode(x)
+        self.assertEqual(torch.uint8, data.dtype)
+        self.assertEqual(3 * 8 * 8, len(data))
+        decoded = Uint8Codec().decode(data, info)
+        self.assertLessEqual(float((decoded - x).abs().max()), 0.5 / 255)
+
+        data, info = Float16Codec().encode(x)
+        self.assertEqual(3 * 8 * 8 * 2, len(data))
+        decoded = Float16Codec().decode(data, info)
+        self.assertEqual(torch.float32, decoded.dtype)
+        self.assertTrue(torch.allclose(x, decoded, atol=1e-3))
+
+        x_uint8 = (x * 255).to(torch.uint8)
+        codec = ImageCodec("PNG")
+        decoded = codec.decode(*codec.encode(x_uint8))
+        self.assertTrue(torch.equal(x_uint8, decoded))
+
+        codec = ImageCodec("JPEG", quality=50)
+        decoded = codec.decode(*codec.encode(x))
+        self.assertEqual(x.shape, decoded.shape)
+
+    def test_store(self):
+        x = torch.rand(20, 4)
+        dataset = AvalancheTensorDataset(x, torch.arange(20))
+        store = ExemplarStore("fp16")
+        stored = store.store([dataset], tensor([0, 0, 0]), tensor([5, 1, 7]))
+        self.assertTrue(ExemplarStore.is_stored(stored))
+        self.assertEqual([5, 1, 7], [int(y) for y in stored.targets])
+        self.assertTrue(torch.allclose(x[5], stored[0][0], atol=1e-3))
+
+        # Stored patterns are copied without encoding them again
+        n_encoded = store._encoded_patterns
+        merged = store.store(
+            [stored, dataset], tensor([0, 1, 0]), tensor([2, 3, 0])
+        )
+        self.assertEqual(n_encoded + 1, store._encoded_patterns)
+        self.assertEqual([7, 3, 5], [int(y) for y in merged.targets])
+        self.assertTrue(torch.equal(stored[2][0], merged[0][0]))
+
+    def test_byte_budget(self):
+        benchmark = get_fast_benchmark(use_task_labels=True)
+        pattern_bytes = benchmark.train_stream[0].dataset[0][0].numel() * 2
+        # 40 patterns, with their offsets, targets and task labels
+        max_bytes = 40 * (pattern_bytes + 4 * 8)
+        policies = [
+            ExperienceBalancedBuffer(
+                None, storage=ExemplarStore("fp16", max_bytes=max_bytes)
+            ),
+            ClassBalancedBuffer(
+                None, storage=ExemplarStore("fp16", max_bytes=max_bytes)
+            ),
+            ParametricBuffer(
+                None,
+                groupby="class",
+                storage=ExemplarStore("fp16", max_bytes=max_bytes),
+            ),
+        ]
+        for policy in policies:
+            for exp in benchmark.train_stream:
+                strategy = MagicMock(experience=exp)
+                strategy.clock.train_exp_counter = exp.current_experience
+                policy.update(strategy)
+
+                # the offsets of each group take a few more bytes
+                self.assertLessEqual(policy.nbytes, max_bytes)
+                self.assertGreater(policy.max_size, 30)
+                self.assertEqual(policy.max_size, len(policy.buffer))
+                for group in policy.buffer_groups.values():
+                    self.assertTrue(ExemplarStore.is_stored(group.buffer))
+
+    def test_replay_plugin_byte_budget(self):
+        benchmark = get_fast_benchmark(use_task_labels=True)
+        pattern_bytes = benchmark.train_stream[0].dataset[0][0].numel() * 2
+        max_bytes = 40 * (pattern_bytes + 4 * 8)
+        policy = ExperienceBalancedBuffer(
+            None, storage=ExemplarStore("fp16", max_bytes=max_bytes)
+        )
+        model = SimpleMLP(input_size=6, hidden_size=10)
+        plugin = ReplayPlugin(mem_size=None, storage_policy=policy)
+        strategy = Naive(
+            model,
+            SGD(model.parameters(), lr=0.001),
+            CrossEntropyLoss(),
+            train_mb_size=32,
+            train_epochs=1,
+            eval_mb_size=100,
+            plugins=[plugin],
+        )
+        for exp in benchmark.train_stream[:3]:
+            strategy.train(exp)
+            self.assertLessEqual(policy.nbytes, max_bytes)
+            self.assertEqual(policy.max_size, len(policy.buffer))
+            self.assertGreater(len(policy.buffer), 0)
+
+
+class MemoryMappedBufferTest(unittest.TestCase):
+    def test_class_balanced_slots(self):
+        torch.manual_seed(0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            buffer = MemoryMappedBuffer(30, tmp_dir, groupby="class")
+            for exp_id in range(3):
+                # two new classes for each experience, x contains the class
+                y = torch.arange(100) % 2 + 2 * exp_id
+                x = y.float().unsqueeze(1).repeat(1, 4)
+                buffer.update_from_dataset(AvalancheTensorDataset(x, y))
+
+                n_classes = 2 * (exp_id + 1)
+                self.assertEqual(30, len(buffer.buffer))
+                x_buf, y_buf = buffer.buffer[:][:2]
+                self.assertTrue(torch.equal(x_buf[:, 0].long(), y_buf))
+                counts = torch.bincount(y_buf, minlength=n_classes)
+                self.assertLessEqual(int(counts.max() - counts.min()), 1)
+
+            # The buffer is resumed from its directory
+            resumed = MemoryMappedBuffer(30, tmp_dir, groupby="class")
+            self.assertEqual(buffer.seen_groups, resumed.seen_groups)
+            self.assertTrue(
+                torch.equal(buffer.buffer[:][0], resumed.buffer[:][0])
+            )
+
+            resumed.resize(None, 12)
+            self.assertEqual(12, len(resumed.buffer))
+            counts = torch.bincount(resumed.buffer[:][1], minlength=6)
+            self.assertEqual([2] * 6, counts.tolist())
+            with self.assertRaises(ValueError):
+                resumed.resize(None, 31)
+
+
 class ParametricBufferTest(unittest.TestCase):
     def setUp(self) -> None:
         self.benchmark = get_fast_benchmark(use_task_labels=True)
@@ -163,6 +377,74 @@ class SelectionStrategyTest(unittest.TestCase):
             [1, 2, 0], closest_to_center.make_sorted_indices(strategy, dataset)
         )
 
+    def test_herding_selection(self):
+        torch.manual_seed(0)
+        features = torch.randn(50, 8)
+
+        # Reference: candidate centers are recomputed at each step
+        selected_indices = []
+        center = features.mean(dim=0)
+        current_center = center * 0
+        for i in range(len(features)):
+            candidate_centers = current_center * i / (i + 1) + features / (
+                i + 1
+            )
+            distances = pow(candidate_centers - center, 2).sum(dim=1)
+            distances[selected_indices] = float("inf")
+            new_index = distances.argmin().tolist()
+            selected_indices.append(new_index)
+            current_center = candidate_centers[new_index]
+
+        self.assertEqual(
+            selected_indices, herding_selection(features).tolist()
+        )
+        self.assertEqual(
+            selected_indices[:10], herding_selection(features, 10).tolist()
+        )
+
+    def test_features_cache(self):
+        model = AbsModel()
+        n_extracted = []
+        model.features.register_forward_hook(
+            lambda module, inputs, output: n_extracted.append(len(output))
+        )
+        herding = HerdingSelectionStrategy(model, "features")
+        strategy = MagicMock(device="cpu", eval_mb_size=8)
+        dataset = AvalancheTensorDataset(
+            torch.randn(20),
+            zeros(20),
+            dataset_type=AvalancheDatasetType.CLASSIFICATION,
+        )
+
+        indices = herding.make_sorted_indices(strategy, dataset)
+        self.assertEqual(20, sum(n_extracted))
+
+        # Features of subsets of cached datasets are not extracted again
+        subset = AvalancheSubset(dataset, indices[:10])
+        sub_indices = herding.make_sorted_indices(strategy, subset)
+        self.assertEqual(20, sum(n_extracted))
+        self.assertEqual(
+            herding_selection(dataset[indices[:10]][0].abs()[:, None])
+            .tolist(),
+            sub_indices,
+        )
+
+        # Only new data is extracted when concatenating
+        new_data = AvalancheTensorDataset(
+            torch.randn(5),
+            zeros(5),
+            dataset_type=AvalancheDatasetType.CLASSIFICATION,
+        )
+        herding.make_sorted_indices(
+            strategy, AvalancheConcatDataset([subset, new_data])
+        )
+        self.assertEqual(25, sum(n_extracted))
+
+        # The cache is emptied when the model is trained
+        strategy.clock.train_iterations = 1
+        herding.make_sorted_indices(strategy, subset)
+        self.assertEqual(35, sum(n_extracted))
+
 
 class AbsModel(Module):
     """Fake model, that simply compute the absolute value of the inputs"""